@@ -9,13 +9,16 @@ os.environ['PYTHONIOENCODING'] = 'utf-8'
 import re
 import logging
 import asyncio
+import heapq
 import sqlite3
 import io
 from datetime import datetime, timedelta
+from pathlib import Path
 from functools import wraps
 from typing import Optional, List, Dict, Any
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, InputFile
+from telegram import InputMediaPhoto, InputMediaVideo, InputMediaDocument
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -55,7 +58,9 @@ from mon_bot_telegram.conversation_states import (
     WAITING_SCHEDULE_TIME, WAITING_EDIT_TIME, WAITING_CUSTOM_USERNAME
 )
 from mon_bot_telegram.config import settings
+from mon_bot_telegram.config.settings import CLEANUP_INTERVAL
 from mon_bot_telegram.database.manager import DatabaseManager
+from mon_bot_telegram.database.persistence import SQLitePersistence
 from mon_bot_telegram.handlers.reaction_functions import (
     handle_reaction_input,
     handle_url_input,
@@ -77,7 +82,22 @@ from mon_bot_telegram.handlers.thumbnail_handler import (
     handle_add_thumbnail,
     handle_rename_input
 )
-from pyrogram import Client
+from mon_bot_telegram.utils.callback_codec import callback_codec, decode_callback, encode_callback
+from mon_bot_telegram.utils.callback_dedup import CallbackDeduplicator
+from mon_bot_telegram.utils.callback_router import CallbackRouter
+from mon_bot_telegram.utils.dispatch import OrderedDispatcher
+from mon_bot_telegram.utils.media_cache import MediaCache
+from mon_bot_telegram.utils.media_metadata import extract_media_metadata, get_metadata_file_size
+from mon_bot_telegram.utils.media_router import (
+    ROUTE_DISK, ROUTE_FILE_ID, ROUTE_TOO_LARGE, ROUTE_USERBOT, RoutingStats, route_media
+)
+from mon_bot_telegram.utils.preview_renderer import get_preview_refresher, preview_state
+from mon_bot_telegram.utils.menu_renderer import edit_menu, menu_markup, static_menu
+from mon_bot_telegram.utils.progress import DebouncedEditor, TransferProgress
+from mon_bot_telegram.utils.transfer_governor import TransferGovernor
+from mon_bot_telegram.utils.update_processor import PerUserUpdateProcessor
+from mon_bot_telegram.utils.userbot_pool import UserbotPool
+from mon_bot_telegram.utils.userbot_transfer import UserbotTransfer
 
 load_dotenv()
 
@@ -99,12 +119,47 @@ class Config:
         # Paramètres par défaut
         self.DOWNLOAD_FOLDER = os.getenv('DOWNLOAD_FOLDER', 'downloads/')
         self.SESSION_NAME = os.getenv('SESSION_NAME', 'uploader_session')
+        # Sessions userbot du pool (séparées par des virgules), SESSION_NAME par défaut
+        self.USERBOT_SESSIONS = [
+            name.strip() for name in os.getenv('USERBOT_SESSIONS', self.SESSION_NAME).split(',') if name.strip()
+        ]
+        # Attente maximum de la connexion du userbot par un transfert (secondes)
+        self.USERBOT_READY_TIMEOUT = float(os.getenv('USERBOT_READY_TIMEOUT', '60'))
         self.DB_PATH = os.getenv('DB_PATH', 'bot.db')
 
         # Limites
         self.BOT_MAX_MEDIA_SIZE = 50 * 1024 * 1024  # 50 Mo (limite des bots Telegram)
         self.USERBOT_MAX_MEDIA_SIZE = 2 * 1024 * 1024 * 1024  # 2 Go (limite d'utilisateur Telegram)
 
+        # Envoi : nombre de posts préparés en parallèle
+        self.DISPATCH_CONCURRENCY = int(os.getenv('DISPATCH_CONCURRENCY', '6'))
+        # Regroupement des médias consécutifs en albums (send_media_group)
+        self.ALBUM_MODE = os.getenv('ALBUM_MODE', 'false').lower() == 'true'
+        # Publication multi-canaux : messages max par canal et par période (secondes)
+        self.FANOUT_RATE_LIMIT = int(os.getenv('FANOUT_RATE_LIMIT', '20'))
+        self.FANOUT_RATE_PERIOD = int(os.getenv('FANOUT_RATE_PERIOD', '60'))
+
+        # Chat relais partagé entre le bot et le userbot pour les fichiers > 50 Mo
+        relay_chat_id = os.getenv('RELAY_CHAT_ID')
+        self.RELAY_CHAT_ID = int(relay_chat_id) if relay_chat_id else None
+        # Mémoire maximum du relais en flux téléchargement -> upload (octets)
+        self.RELAY_BUFFER_SIZE = int(os.getenv('RELAY_BUFFER_SIZE', str(8 * 1024 * 1024)))
+        # Connexions MTProto parallèles pour les uploads du userbot
+        self.USERBOT_UPLOAD_CONNECTIONS = int(os.getenv('USERBOT_UPLOAD_CONNECTIONS', '4'))
+        # Budget disque du cache des médias téléchargés (octets)
+        self.MEDIA_CACHE_SIZE = int(os.getenv('MEDIA_CACHE_SIZE', str(1000 * 1024 * 1024)))
+        # Transferts simultanés : octets en vol et espace disque réservé maximum
+        self.TRANSFER_MAX_BYTES_IN_FLIGHT = int(os.getenv('TRANSFER_MAX_BYTES_IN_FLIGHT', str(4 * 1024 * 1024 * 1024)))
+        self.TRANSFER_MAX_DISK_BYTES = int(os.getenv('TRANSFER_MAX_DISK_BYTES', str(1000 * 1024 * 1024)))
+        # Délai minimum entre deux modifications du message de progression (secondes)
+        self.PROGRESS_EDIT_INTERVAL = float(os.getenv('PROGRESS_EDIT_INTERVAL', '4'))
+        # Fenêtre pendant laquelle un second appui sur le même bouton est ignoré (secondes)
+        self.CALLBACK_DEDUP_WINDOW = float(os.getenv('CALLBACK_DEDUP_WINDOW', '2'))
+        # Updates traitées simultanément (toujours une à la fois par utilisateur et par chat)
+        self.MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '64'))
+        # Intervalle d'écriture des brouillons et états de conversation en base (secondes)
+        self.PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', '30'))
+
         # Défaut
         self.DEFAULT_CHANNEL = os.getenv('DEFAULT_CHANNEL', 'https://t.me/sheweeb')
 
@@ -339,12 +394,6 @@ async def retry_operation(operation, max_retries=3, delay=1):
 # Stockage des réactions
 reaction_counts = {}
 
-# Variable globale pour le userbot
-userbot = None
-
-# Ensemble pour stocker les callbacks déjà traités
-processed_callbacks = set()
-
 # Filtres personnalisés
 class WaitingForUrlFilter(filters.MessageFilter):
     def filter(self, message):
@@ -379,26 +428,33 @@ reply_keyboard_filter = ReplyKeyboardFilter()
 
 # Initialisation du gestionnaire de planification
 scheduler_manager = SchedulerManager(db_manager)
+dispatcher = OrderedDispatcher(config.DISPATCH_CONCURRENCY)
+# Budget partagé des transferts de gros fichiers (send_large_file et send_post_now)
+transfer_governor = TransferGovernor(config.TRANSFER_MAX_BYTES_IN_FLIGHT, config.TRANSFER_MAX_DISK_BYTES)
+# Compteurs de routage des médias reçus (octets évités par les renvois file_id)
+routing_stats = RoutingStats()
+# Anti-doublon des appuis sur les boutons inline (exécuté avant tout autre handler)
+callback_deduplicator = CallbackDeduplicator(config.CALLBACK_DEDUP_WINDOW)
 
 
-# Fonction pour initialiser le client Telethon
-async def start_telethon_client():
-    """Initialise le client Telethon"""
-    try:
-        client = TelegramClient(config.SESSION_NAME, config.API_ID, config.API_HASH)
-        await client.start()
-        logger.info("Client Telethon démarré avec succès")
-        return client
-    except Exception as e:
-        logger.error(f"Erreur lors du démarrage du client Telethon: {e}")
-        return None
+async def start_userbot_pool(application):
+    """
+    Lance la connexion des sessions userbot en tâche de fond (post_init)
+
+    Le bot commence à répondre immédiatement ; les transferts qui ont besoin
+    du userbot attendent que le pool soit prêt.
+    """
+    pool = application.bot_data.get('userbot_pool')
+    if pool:
+        pool.start()
+        logger.info(f"Connexion de {len(pool)} session(s) Telethon en arrière-plan")
 
 
-async def init_userbot():
-    """Initialise le userbot au démarrage du bot"""
-    global userbot
-    userbot = await start_telethon_client()
-    return userbot
+async def stop_userbot_pool(application):
+    """Arrête la supervision et déconnecte les sessions userbot (post_shutdown)"""
+    pool = application.bot_data.get('userbot_pool')
+    if pool:
+        await pool.stop()
 
 
 def log_conversation_state(update, context, function_name, state_return):
@@ -421,38 +477,54 @@ def log_conversation_state(update, context, function_name, state_return):
     return state_return
 
 
-async def start(update, context):
-    """Point d'entrée principal du bot"""
-    keyboard = [
-        [InlineKeyboardButton("📝 Nouvelle publication", callback_data="create_publication")],
-        [InlineKeyboardButton("📅 Publications planifiées", callback_data="planifier_post")],
-        [InlineKeyboardButton("📊 Statistiques", callback_data="channel_stats")],
-        [InlineKeyboardButton("⚙️ Paramètres", callback_data="settings")]
-    ]
-    reply_keyboard = [
+# Menus fixes (construits une seule fois, voir utils/menu_renderer.py)
+MAIN_MENU_ROWS = (
+    (("📝 Nouvelle publication", "create_publication"),),
+    (("📅 Publications planifiées", "planifier_post"),),
+    (("📊 Statistiques", "channel_stats"),),
+    (("⚙️ Paramètres", "settings"),),
+)
+SETTINGS_MENU_ROWS = (
+    (("🌐 Gérer mes canaux", "manage_channels"),),
+    (("⏰ Fuseau horaire", "timezone"),),
+    (("🎨 Custom", "custom_settings"),),
+    (("🏠 Retour au menu principal", "main_menu"),),
+)
+NO_CHANNEL_MENU_ROWS = (
+    (("➕ Ajouter un canal", "add_channel"),),
+    (("🔄 Utiliser le canal par défaut", "use_default_channel"),),
+    (("↩️ Menu principal", "main_menu"),),
+)
+QUICK_ACTIONS_KEYBOARD = ReplyKeyboardMarkup(
+    [
         [KeyboardButton("Tout supprimer"), KeyboardButton("Aperçu")],
         [KeyboardButton("Annuler"), KeyboardButton("Envoyer")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(
-        reply_keyboard,
-        resize_keyboard=True,
-        one_time_keyboard=False
-    )
+    ],
+    resize_keyboard=True,
+    one_time_keyboard=False
+)
+
+
+async def start(update, context):
+    """Point d'entrée principal du bot"""
+    main_markup = static_menu("main_menu", MAIN_MENU_ROWS)
+    reply_markup = QUICK_ACTIONS_KEYBOARD
 
     try:
         if update.message:
             await update.message.reply_text(
                 "Bienvenue sur le Publisher Bot!\nQue souhaitez-vous faire ?",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=main_markup,
             )
             await update.message.reply_text(
                 "Actions rapides :",
                 reply_markup=reply_markup
             )
         else:
-            await update.callback_query.edit_message_text(
+            await edit_menu(
+                update.callback_query,
                 "Bienvenue sur le Publisher Bot!\nQue souhaitez-vous faire ?",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=main_markup,
             )
             await update.callback_query.message.reply_text(
                 "Actions rapides :",
@@ -467,10 +539,6 @@ async def start(update, context):
 async def create_publication(update, context):
     """Affiche la liste des canaux disponibles pour créer une publication"""
     try:
-        # Vérification pour éviter les modifications redondantes
-        if update.callback_query and hasattr(update.callback_query, '_answered') and update.callback_query._answered:
-            return WAITING_CHANNEL_SELECTION
-
         user_id = update.effective_user.id  # Récupération de l'ID utilisateur
         logger.info(f"create_publication appelé par l'utilisateur {user_id}")
 
@@ -484,11 +552,7 @@ async def create_publication(update, context):
 
         # Si aucun canal n'est configuré, proposer d'en ajouter un ou d'utiliser le canal par défaut
         if not channels:
-            keyboard = [
-                [InlineKeyboardButton("➕ Ajouter un canal", callback_data="add_channel")],
-                [InlineKeyboardButton("🔄 Utiliser le canal par défaut", callback_data="use_default_channel")],
-                [InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]
-            ]
+            reply_markup = static_menu("no_channel", NO_CHANNEL_MENU_ROWS)
 
             message_text = (
                 "⚠️ Aucun canal configuré\n\n"
@@ -500,15 +564,9 @@ async def create_publication(update, context):
 
             try:
                 if update.callback_query:
-                    await update.callback_query.edit_message_text(
-                        message_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard)
-                    )
+                    await edit_menu(update.callback_query, message_text, reply_markup=reply_markup)
                 else:
-                    await update.message.reply_text(
-                        message_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard)
-                    )
+                    await update.message.reply_text(message_text, reply_markup=reply_markup)
             except Exception as msg_error:
                 logger.error(f"Erreur lors de l'envoi du message 'aucun canal': {msg_error}")
                 # Si on ne peut même pas envoyer ce message, essayer un message plus simple
@@ -523,29 +581,14 @@ async def create_publication(update, context):
 
             return WAITING_CHANNEL_SELECTION
 
-        # Construction du clavier avec 2 canaux par ligne
-        keyboard = []
-        current_row = []
-
-        for i, channel in enumerate(channels):
-            # Ajoute un bouton pour chaque canal avec callback data contenant l'username
-            current_row.append(InlineKeyboardButton(
-                channel['name'],
-                callback_data=f"select_channel_{channel['username']}"
-            ))
-
-            # Crée une nouvelle ligne tous les 2 boutons
-            if len(current_row) == 2 or i == len(channels) - 1:
-                keyboard.append(current_row)
-                current_row = []
-
-        # Ajout des boutons d'action
-        keyboard.append([
-            InlineKeyboardButton("➕ Ajouter un canal", callback_data="add_channel")
-        ])
-        keyboard.append([
-            InlineKeyboardButton("️↩️ Menu principal", callback_data="main_menu")
-        ])
+        # Construction du clavier avec 2 canaux par ligne (mémorisé selon la liste des canaux)
+        channel_buttons = tuple(
+            (channel['name'], encode_callback("select_channel", channel['username'])) for channel in channels
+        )
+        reply_markup = menu_markup(
+            tuple(channel_buttons[i:i + 2] for i in range(0, len(channel_buttons), 2))
+            + ((("➕ Ajouter un canal", "add_channel"),), (("️↩️ Menu principal", "main_menu"),))
+        )
 
         message_text = (
             "📝 Sélectionnez un canal pour votre publication :\n\n"
@@ -555,15 +598,9 @@ async def create_publication(update, context):
 
         try:
             if update.callback_query:
-                await update.callback_query.edit_message_text(
-                    message_text,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
+                await edit_menu(update.callback_query, message_text, reply_markup=reply_markup)
             else:
-                await update.message.reply_text(
-                    message_text,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
+                await update.message.reply_text(message_text, reply_markup=reply_markup)
         except Exception as msg_error:
             logger.error(f"Erreur lors de l'affichage du sélecteur de canal: {msg_error}")
             # Tenter une approche plus simple en cas d'erreur
@@ -613,11 +650,464 @@ async def create_publication(update, context):
 # planifier_post maintenant importé de schedule_handler
 
 
+async def _get_post_file_size(context, post):
+    """
+    Retourne la taille du fichier d'un post.
+
+    La taille capturée à la réception du média est utilisée en priorité ;
+    get_file() n'est appelé que pour les anciens posts sans métadonnées.
+
+    Returns:
+        Optional[int]: Taille en octets, None si inconnue
+    """
+    file_size = get_metadata_file_size(post)
+    if file_size is not None:
+        return file_size
+    try:
+        file_obj = await context.bot.get_file(post["content"])
+        return file_obj.file_size
+    except Exception as file_error:
+        if "File is too big" in str(file_error):
+            logger.info(f"Fichier trop volumineux pour get_file() (>20 Mo), taille inconnue")
+        else:
+            logger.error(f"Erreur lors de la récupération du fichier: {file_error}")
+        return None
+
+
+def _build_post_keyboard(post, post_index):
+    """Construit le clavier d'un post (réactions + boutons URL)"""
+    keyboard = []
+    # Réactions (max 4 par ligne)
+    reactions = post.get("reactions", [])
+    if reactions:
+        current_row = []
+        for reaction in reactions:
+            current_row.append(InlineKeyboardButton(f"{reaction}", callback_data=encode_callback("react", post_index, reaction)))
+            if len(current_row) == 4:
+                keyboard.append(current_row)
+                current_row = []
+        if current_row:
+            keyboard.append(current_row)
+    # Boutons URL
+    buttons = post.get("buttons", [])
+    for btn in buttons:
+        keyboard.append([InlineKeyboardButton(btn['text'], url=btn['url'])])
+    return InlineKeyboardMarkup(keyboard) if keyboard else None
+
+
+def _apply_custom_text(context, caption, channel_username):
+    """Ajoute à la légende le texte custom défini pour le canal"""
+    caption = caption or ""
+    custom_usernames = context.user_data.get('custom_usernames', {}) if context.user_data is not None else {}
+    custom_text = custom_usernames.get(channel_username)
+    if custom_text:
+        if caption:
+            caption = f"{caption}\n{custom_text}"
+        else:
+            caption = custom_text
+    return caption
+
+
+async def _prepare_post(context, post, post_index):
+    """
+    Prépare un post pour l'envoi : légende, clavier, thumbnail et taille du fichier.
+    Ne fait aucun envoi, peut donc être exécuté en parallèle pour tous les posts.
+    """
+    prepared = {
+        'type': post.get("type"),
+        'content': post.get("content"),
+        'base_caption': post.get("caption") or "",
+        'caption': _apply_custom_text(context, post.get("caption"), post.get("channel")),
+        'reply_markup': _build_post_keyboard(post, post_index),
+        'thumbnail': post.get('thumbnail'),
+        'filename': post.get("filename"),
+        'file_unique_id': (post.get("metadata") or {}).get("file_unique_id") or post.get("file_unique_id"),
+        'file_size': 0,
+        'size_known': False
+    }
+
+    if prepared['type'] in ("video", "document"):
+        # Taille du fichier pour décider de la méthode d'envoi
+        file_size = await _get_post_file_size(context, post)
+        if file_size is not None:
+            prepared['file_size'] = file_size
+            prepared['size_known'] = True
+            logger.info(f"DEBUG: Taille du fichier {prepared['type']}: {file_size} bytes ({file_size / (1024 * 1024):.1f} Mo)")
+
+    return prepared
+
+
+async def _send_media_with_bot(context, channel, prepared):
+    """Envoie une vidéo ou un document via l'API bot"""
+    post_type = prepared['type']
+    kwargs = {
+        'chat_id': channel,
+        post_type: prepared['content'],
+        'caption': prepared['caption'] if prepared['caption'] else None,
+        'reply_markup': prepared['reply_markup']
+    }
+    if prepared['thumbnail']:
+        kwargs['thumbnail'] = prepared['thumbnail']
+    if post_type == "video":
+        return await context.bot.send_video(**kwargs)
+    else:  # document
+        return await context.bot.send_document(**kwargs)
+
+
+def _queue_notifier(context, chat_id):
+    """Affiche la position dans la file des transferts dans un seul message, mis à jour"""
+    status = {}
+
+    async def notify(position):
+        if position is None:
+            # Transfert admis : le message de file d'attente n'a plus lieu d'être
+            if 'message' in status:
+                await status.pop('message').delete()
+            return
+        text = f"⏳ Transfert en file d'attente (position {position})"
+        if 'message' in status:
+            await status['message'].edit_text(text)
+        else:
+            status['message'] = await context.bot.send_message(chat_id=chat_id, text=text)
+
+    return notify
+
+
+async def _run_on_userbot(context, size, operation, admission=None):
+    """
+    Exécute un transfert sur la session userbot la moins chargée du pool
+
+    Chaque nouvelle tentative choisit à nouveau une session : un compte en
+    FloodWait ou déconnecté est évité au profit des autres.
+
+    Args:
+        size: Octets transférés (répartition de la charge)
+        operation: Coroutine appelée avec le PooledClient réservé
+        admission: Fabrique du contexte d'admission (transfer_governor.admit),
+            entré une fois la session réservée : la place dans le budget de
+            transfert n'est pas occupée pendant l'attente d'un userbot
+    """
+    pool = context.application.bot_data.get('userbot_pool')
+    # Au démarrage, les sessions se connectent encore en arrière-plan
+    await pool.wait_ready(config.USERBOT_READY_TIMEOUT)
+
+    async def attempt():
+        async with pool.lease(size) as leased:
+            if admission is None:
+                return await operation(leased)
+            async with admission():
+                return await operation(leased)
+
+    return await retry_operation(attempt)
+
+
+def _userbot_transfer(leased):
+    """UserbotTransfer pour une session du pool"""
+    return UserbotTransfer(
+        leased.client, config.RELAY_CHAT_ID, config.RELAY_BUFFER_SIZE, config.USERBOT_UPLOAD_CONNECTIONS,
+        checkpoint_store=db_manager
+    )
+
+
+def _checkpoint_key(leased, file_unique_id):
+    """Les parts uploadées appartiennent au compte : un point de reprise par session"""
+    return f"{leased.name}:{file_unique_id}" if file_unique_id else None
+
+
+async def _send_with_userbot(context, channel, prepared):
+    """Envoie le fichier via le userbot (récupéré par le chat relais, sans l'API bot)"""
+    logger.info(f"DEBUG: Envoi via userbot vers {channel}")
+    owner_chat = prepared.get('owner_chat')
+    notify = _queue_notifier(context, owner_chat) if owner_chat else None
+    # Une nouvelle tentative reprend l'upload à la première part non acquittée
+    message = await _run_on_userbot(
+        context,
+        prepared['file_size'],
+        lambda leased: _userbot_transfer(leased).send(
+            context.bot,
+            channel,
+            prepared['type'],
+            prepared['content'],
+            caption=prepared['caption'],
+            file_name=prepared['filename'],
+            file_unique_id=_checkpoint_key(leased, prepared['file_unique_id'])
+        ),
+        admission=lambda: transfer_governor.admit(
+            prepared.get('owner') or channel, prepared['file_size'], on_wait=notify
+        )
+    )
+    logger.info("DEBUG: Envoi userbot réussi")
+    return message
+
+
+async def _send_prepared_post(context, channel, prepared, sent_records=None):
+    """
+    Envoie un post préparé par _prepare_post
+
+    Args:
+        sent_records: Liste complétée avec les messages envoyés (pour la publication multi-canaux)
+
+    Returns:
+        bool: False si les envois suivants doivent être interrompus
+    """
+    post_type = prepared['type']
+    limit_bytes = config.BOT_MAX_MEDIA_SIZE
+    message = None
+
+    if post_type == "photo":
+        message = await context.bot.send_photo(
+            chat_id=channel,
+            photo=prepared['content'],
+            caption=prepared['caption'] if prepared['caption'] else None,
+            reply_markup=prepared['reply_markup']
+        )
+    elif post_type == "video" or post_type == "document":
+        if prepared['size_known'] and prepared['file_size'] <= limit_bytes:
+            logger.info(f"DEBUG ENVOI: Type={post_type}, utilisation du bot normal (fichier <= 50 Mo)")
+            message = await _send_media_with_bot(context, channel, prepared)
+        elif prepared['size_known']:
+            # Fichier > 50 Mo, utiliser le userbot
+            logger.info(f"DEBUG ENVOI: Type={post_type}, utilisation du userbot (fichier > 50 Mo)")
+            if not context.application.bot_data.get('userbot_pool'):
+                logger.error("DEBUG: Userbot non initialisé dans bot_data!")
+                await context.bot.send_message(
+                    chat_id=channel,
+                    text="❌ Userbot non initialisé. Impossible d'envoyer le fichier volumineux."
+                )
+                return False
+            message = await _send_with_userbot(context, channel, prepared)
+        else:
+            # Si on ne peut pas récupérer la taille, essayer d'abord avec le bot
+            try:
+                logger.info(f"DEBUG ENVOI: Type={post_type}, tentative avec bot normal (taille inconnue)")
+                message = await _send_media_with_bot(context, channel, prepared)
+            except Exception as bot_error:
+                if "File is too big" in str(bot_error) or "too large" in str(bot_error).lower():
+                    logger.info("DEBUG: Fichier trop volumineux pour le bot, basculement vers userbot")
+                    # Basculer vers userbot si le fichier est trop gros
+                    if not context.application.bot_data.get('userbot_pool'):
+                        raise Exception("Userbot non initialisé et fichier trop volumineux pour le bot")
+                    # Télécharger et envoyer via userbot
+                    message = await _send_with_userbot(context, channel, prepared)
+                else:
+                    raise bot_error
+    elif post_type == "text":
+        message = await context.bot.send_message(
+            chat_id=channel,
+            text=prepared['caption'] or prepared['content'],
+            reply_markup=prepared['reply_markup']
+        )
+    if sent_records is not None and message is not None:
+        # message_id pour l'API bot, id pour un message Telethon
+        message_id = getattr(message, 'message_id', None) or getattr(message, 'id', None)
+        sent_records.append({'prepared': prepared, 'message_id': message_id})
+    return True
+
+
+# Taille maximum d'un album Telegram
+MAX_ALBUM_SIZE = 10
+
+
+def _album_family(post_type):
+    """Photos et vidéos peuvent partager un album, les documents uniquement entre eux"""
+    if post_type in ("photo", "video"):
+        return "visual"
+    if post_type == "document":
+        return "document"
+    return None
+
+
+def _group_posts_for_album(posts):
+    """Regroupe les posts consécutifs compatibles (listes d'index, 10 maximum)"""
+    groups = []
+    current_family = None
+    for post_index, post in enumerate(posts):
+        family = _album_family(post.get("type"))
+        if (groups and family is not None and family == current_family
+                and len(groups[-1]) < MAX_ALBUM_SIZE):
+            groups[-1].append(post_index)
+        else:
+            groups.append([post_index])
+        current_family = family
+    return groups
+
+
+def _is_album_eligible(prepared):
+    """Un média peut rejoindre un album s'il est envoyable par le bot"""
+    if prepared['type'] == "photo":
+        return True
+    if prepared['type'] in ("video", "document"):
+        return prepared['size_known'] and prepared['file_size'] <= config.BOT_MAX_MEDIA_SIZE
+    return False
+
+
+async def _send_album(context, channel, album, sent_records=None):
+    """Envoie un album, puis le clavier des éléments qui en ont un"""
+    media = []
+    for prepared in album:
+        caption = prepared['caption'] if prepared['caption'] else None
+        if prepared['type'] == "photo":
+            media.append(InputMediaPhoto(media=prepared['content'], caption=caption))
+        elif prepared['type'] == "video":
+            media.append(InputMediaVideo(media=prepared['content'], caption=caption,
+                                         thumbnail=prepared['thumbnail'] or None))
+        else:
+            media.append(InputMediaDocument(media=prepared['content'], caption=caption,
+                                            thumbnail=prepared['thumbnail'] or None))
+    messages = await context.bot.send_media_group(chat_id=channel, media=media)
+    logger.info(f"Album de {len(media)} médias envoyé vers {channel}")
+    if sent_records is not None:
+        sent_records.append({'album': album})
+
+    # Les albums ne peuvent pas porter de clavier : message séparé en réponse
+    for message, prepared in zip(messages, album):
+        if prepared['reply_markup']:
+            await context.bot.send_message(
+                chat_id=channel,
+                text="⬆️",
+                reply_markup=prepared['reply_markup'],
+                reply_to_message_id=message.message_id
+            )
+
+
+async def _send_prepared_group(context, channel, prepared_group, sent_records=None):
+    """
+    Envoie un groupe de posts préparés : les médias éligibles partent en album,
+    les autres (gros fichiers, taille inconnue) individuellement, dans l'ordre
+
+    Returns:
+        bool: False si les envois suivants doivent être interrompus
+    """
+    album = []
+
+    async def flush():
+        sent = True
+        if len(album) == 1:
+            sent = await _send_prepared_post(context, channel, album[0], sent_records) is not False
+        elif album:
+            await _send_album(context, channel, list(album), sent_records)
+        album.clear()
+        return sent
+
+    for _, prepared in prepared_group:
+        if _is_album_eligible(prepared):
+            album.append(prepared)
+            if len(album) == MAX_ALBUM_SIZE and not await flush():
+                return False
+            continue
+        if not await flush():
+            return False
+        if await _send_prepared_post(context, channel, prepared, sent_records) is False:
+            return False
+    return await flush()
+
+
+def _normalize_chat(channel):
+    """Ajoute @ si besoin pour les canaux publics"""
+    if isinstance(channel, str) and not channel.startswith('@') and not channel.startswith('-100'):
+        return '@' + channel
+    return channel
+
+
+async def _wait_fanout_slot(chat_id):
+    """Attend que le canal puisse recevoir un nouveau message (limite par canal)"""
+    while not await rate_limiter.can_send_message(
+        chat_id, 0, limit=config.FANOUT_RATE_LIMIT, per_seconds=config.FANOUT_RATE_PERIOD
+    ):
+        await asyncio.sleep(0.5)
+
+
+async def _fan_out_records(context, source_chat, targets, sent_records):
+    """
+    Republie sur d'autres canaux les messages déjà envoyés au canal source.
+
+    Les messages simples sont copiés avec copy_message (aucun transfert de
+    fichier, même pour ceux envoyés par le userbot) ; les albums sont renvoyés
+    avec leurs file_id. Les canaux sont traités en parallèle, dans l'ordre
+    du brouillon pour chacun.
+    """
+    items = [(target, record) for target in targets for record in sent_records]
+
+    async def prepare(index, item):
+        return item
+
+    async def send(index, item):
+        target, record = item
+        target_chat = _normalize_chat(target)
+        await _wait_fanout_slot(target_chat)
+        if 'album' in record:
+            album = [
+                {**prepared, 'caption': _apply_custom_text(context, prepared['base_caption'], target)}
+                for prepared in record['album']
+            ]
+            await _send_album(context, target_chat, album)
+            return True
+        prepared = record['prepared']
+        caption = _apply_custom_text(context, prepared['base_caption'], target)
+        if prepared['type'] == "text":
+            await context.bot.send_message(
+                chat_id=target_chat,
+                text=caption or prepared['content'],
+                reply_markup=prepared['reply_markup']
+            )
+        else:
+            await context.bot.copy_message(
+                chat_id=target_chat,
+                from_chat_id=source_chat,
+                message_id=record['message_id'],
+                caption=caption if caption != prepared['caption'] else None,
+                reply_markup=prepared['reply_markup']
+            )
+        return True
+
+    return await dispatcher.dispatch(items, prepare, send, channel_of=lambda index, item: item[0])
+
+
+async def handle_fanout_menu(update, context):
+    """Affiche les canaux sur lesquels republier le brouillon (bascule par canal)"""
+    query = update.callback_query
+    posts = context.user_data.get("posts", [])
+    if not posts:
+        await query.edit_message_text("❌ Il n'y a pas encore de fichiers à envoyer.")
+        return WAITING_PUBLICATION_CONTENT
+
+    primary = posts[0].get("channel", config.DEFAULT_CHANNEL)
+    selected = context.user_data.setdefault('fanout_channels', [])
+    decoded = decode_callback(query.data, "fanout_toggle")
+    if decoded is None and query.data.startswith("fanout_toggle_"):
+        decoded = (query.data[len("fanout_toggle_"):],)
+    if decoded is not None:
+        username = decoded[0]
+        if username in selected:
+            selected.remove(username)
+        else:
+            selected.append(username)
+
+    channels = [
+        channel for channel in db_manager.list_channels(update.effective_user.id)
+        if channel['username'].lstrip('@') != str(primary).lstrip('@')
+    ]
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{'✅' if channel['username'] in selected else '⬜'} {channel['name']}",
+            callback_data=encode_callback("fanout_toggle", channel['username'])
+        )]
+        for channel in channels
+    ]
+    keyboard.append([InlineKeyboardButton(f"🚀 Publier ({len(selected) + 1} canaux)", callback_data="send_now")])
+    keyboard.append([InlineKeyboardButton("↩️ Retour", callback_data="main_menu")])
+    await query.edit_message_text(
+        f"Canal principal : {primary}\n\nSélectionnez les autres canaux où republier ce post :",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return SEND_OPTIONS
+
+
 async def send_post_now(update, context, scheduled_post=None):
     # Initialiser les variables pour éviter les erreurs de référence
     file_size = 0
     file_size_mb = 0.0
-    limit_bytes = 50 * 1024 * 1024  # 50 Mo en bytes
+    limit_bytes = config.BOT_MAX_MEDIA_SIZE
     
     try:
         if scheduled_post:
@@ -634,181 +1124,57 @@ async def send_post_now(update, context, scheduled_post=None):
             channel = posts[0].get("channel", config.DEFAULT_CHANNEL)
 
         # Correction : ajouter @ si besoin pour les canaux publics
-        if isinstance(channel, str) and not channel.startswith('@') and not channel.startswith('-100'):
-            channel = '@' + channel
-
-        for post_index, post in enumerate(posts):
-            post_type = post.get("type")
-            content = post.get("content")
-            caption = post.get("caption") or ""
-            filename = post.get("filename")
-            # Ajout du texte custom si défini pour ce canal
-            custom_usernames = context.user_data.get('custom_usernames', {})
-            channel_username = post.get("channel")
-            custom_text = custom_usernames.get(channel_username)
-            if custom_text:
-                if caption:
-                    caption = f"{caption}\n{custom_text}"
-                else:
-                    caption = custom_text
+        channel = _normalize_chat(channel)
+
+        # Canaux supplémentaires (publication multi-canaux)
+        fanout_targets = []
+        if not scheduled_post:
+            fanout_targets = [
+                target for target in context.user_data.get('fanout_channels', [])
+                if _normalize_chat(target) != channel
+            ]
+        sent_records = [] if fanout_targets else None
+
+        # Préparation concurrente des posts, envois dans l'ordre du brouillon
+        prepared_posts = {}
+        if config.ALBUM_MODE:
+            groups = _group_posts_for_album(posts)
+        else:
+            groups = [[post_index] for post_index in range(len(posts))]
+
+        owner = update.effective_user.id if update and update.effective_user else None
+        owner_chat = update.effective_chat.id if update and update.effective_chat else None
+
+        async def prepare(group_index, group):
+            prepared = await asyncio.gather(*(_prepare_post(context, posts[i], i) for i in group))
+            for item in prepared:
+                item['owner'] = owner
+                item['owner_chat'] = owner_chat
+            prepared_posts.update(zip(group, prepared))
+            return list(zip(group, prepared))
+
+        async def send(group_index, prepared_group):
+            return await _send_prepared_group(context, channel, prepared_group, sent_records)
+
+        result = await dispatcher.dispatch(groups, prepare, send)
+        if result.errors:
+            failed_index = groups[min(result.errors)][0]
+            if failed_index in prepared_posts:
+                file_size = prepared_posts[failed_index]['file_size']
+                file_size_mb = file_size / (1024 * 1024)
+            raise result.first_error
+        if result.stopped:
+            return MAIN_MENU
+
+        # Republication sur les autres canaux à partir des messages envoyés
+        if fanout_targets:
+            fanout_result = await _fan_out_records(context, channel, fanout_targets, sent_records)
+            if fanout_result.errors:
+                raise fanout_result.first_error
 
-            # --- Construction du clavier (réactions + boutons URL) ---
-            keyboard = []
-            # Réactions (max 4 par ligne)
-            reactions = post.get("reactions", [])
-            if reactions:
-                current_row = []
-                for reaction in reactions:
-                    current_row.append(InlineKeyboardButton(f"{reaction}", callback_data=f"react_{post_index}_{reaction}"))
-                    if len(current_row) == 4:
-                        keyboard.append(current_row)
-                        current_row = []
-                if current_row:
-                    keyboard.append(current_row)
-            # Boutons URL
-            buttons = post.get("buttons", [])
-            for btn in buttons:
-                keyboard.append([InlineKeyboardButton(btn['text'], url=btn['url'])])
-            reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
-
-            # Préparer le thumbnail si disponible
-            thumbnail = post.get('thumbnail')
-
-            # --- Envoi du fichier selon son type ---
-            if post_type == "photo":
-                await context.bot.send_photo(
-                    chat_id=channel,
-                    photo=content,
-                    caption=caption if caption else None,
-                    reply_markup=reply_markup
-                )
-            elif post_type == "video" or post_type == "document":
-                # Vérifier d'abord la taille du fichier pour décider de la méthode d'envoi
-                try:
-                    file_obj = await context.bot.get_file(content)
-                    file_size = file_obj.file_size
-                    file_size_mb = file_size / (1024 * 1024)
-                    logger.info(f"DEBUG: Taille du fichier {post_type}: {file_size} bytes ({file_size_mb:.1f} Mo)")
-                    
-                    # Si le fichier est <= 50 Mo, utiliser le bot normal
-                    if file_size <= limit_bytes:
-                        logger.info(f"DEBUG ENVOI: Type={post_type}, utilisation du bot normal (fichier <= 50 Mo)")
-                        
-                        if post_type == "video":
-                            kwargs = {
-                                'chat_id': channel,
-                                'video': content,
-                                'caption': caption if caption else None,
-                                'reply_markup': reply_markup
-                            }
-                            if thumbnail:
-                                kwargs['thumbnail'] = thumbnail
-                            await context.bot.send_video(**kwargs)
-                        else:  # document
-                            kwargs = {
-                                'chat_id': channel,
-                                'document': content,
-                                'caption': caption if caption else None,
-                                'reply_markup': reply_markup
-                            }
-                            if thumbnail:
-                                kwargs['thumbnail'] = thumbnail
-                            await context.bot.send_document(**kwargs)
-                    
-                    else:
-                        # Fichier > 50 Mo, utiliser le userbot
-                        logger.info(f"DEBUG ENVOI: Type={post_type}, utilisation du userbot (fichier > 50 Mo)")
-                        
-                        # Récupérer le userbot depuis bot_data
-                        userbot = context.application.bot_data.get('userbot')
-                        if not userbot:
-                            logger.error("DEBUG: Userbot non initialisé dans bot_data!")
-                            await context.bot.send_message(
-                                chat_id=channel,
-                                text="❌ Userbot non initialisé. Impossible d'envoyer le fichier volumineux."
-                            )
-                            return MAIN_MENU
-                        
-                        # Télécharger le fichier
-                        file_path = await file_obj.download_to_drive()
-                        logger.info(f"DEBUG: Téléchargement vers {file_path}")
-                        
-                        # Envoyer via userbot
-                        logger.info(f"DEBUG: Envoi via userbot vers {channel}")
-                        try:
-                            if post_type == "video":
-                                await userbot.send_file(channel, file_path, caption=caption)
-                            else:  # document
-                                await userbot.send_file(channel, file_path, caption=caption)
-                            
-                            logger.info("DEBUG: Envoi userbot réussi")
-                        finally:
-                            # Nettoyer le fichier temporaire
-                            try:
-                                os.remove(file_path)
-                                logger.info(f"DEBUG: Fichier temporaire supprimé: {file_path}")
-                            except Exception as cleanup_error:
-                                logger.warning(f"Impossible de supprimer le fichier temporaire: {cleanup_error}")
-                                
-                except Exception as file_error:
-                    if "File is too big" in str(file_error):
-                        logger.info(f"Fichier trop volumineux pour get_file() (>20 Mo), tentative avec bot normal")
-                    else:
-                        logger.error(f"Erreur lors de la récupération du fichier: {file_error}")
-                    # Si on ne peut pas récupérer la taille, essayer d'abord avec le bot
-                    try:
-                        logger.info(f"DEBUG ENVOI: Type={post_type}, tentative avec bot normal (taille inconnue)")
-                        if post_type == "video":
-                            kwargs = {
-                                'chat_id': channel,
-                                'video': content,
-                                'caption': caption if caption else None,
-                                'reply_markup': reply_markup
-                            }
-                            if thumbnail:
-                                kwargs['thumbnail'] = thumbnail
-                            await context.bot.send_video(**kwargs)
-                        else:  # document
-                            kwargs = {
-                                'chat_id': channel,
-                                'document': content,
-                                'caption': caption if caption else None,
-                                'reply_markup': reply_markup
-                            }
-                            if thumbnail:
-                                kwargs['thumbnail'] = thumbnail
-                            await context.bot.send_document(**kwargs)
-                    except Exception as bot_error:
-                        if "File is too big" in str(bot_error) or "too large" in str(bot_error).lower():
-                            logger.info("DEBUG: Fichier trop volumineux pour le bot, basculement vers userbot")
-                            # Basculer vers userbot si le fichier est trop gros
-                            userbot = context.application.bot_data.get('userbot')
-                            if not userbot:
-                                raise Exception("Userbot non initialisé et fichier trop volumineux pour le bot")
-                            
-                            # Re-télécharger et envoyer via userbot
-                            file_obj = await context.bot.get_file(content)
-                            file_path = await file_obj.download_to_drive()
-                            try:
-                                if post_type == "video":
-                                    await userbot.send_file(channel, file_path, caption=caption)
-                                else:
-                                    await userbot.send_file(channel, file_path, caption=caption)
-                            finally:
-                                try:
-                                    os.remove(file_path)
-                                except:
-                                    pass
-                        else:
-                            raise bot_error
-            elif post_type == "text":
-                await context.bot.send_message(
-                    chat_id=channel,
-                    text=caption or content,
-                    reply_markup=reply_markup
-                )
         # Nettoyage du contexte
         if not scheduled_post:
+            context.user_data.pop("fanout_channels", None)
             context.user_data.pop("posts", None)
             context.user_data.pop("preview_messages", None)
             context.user_data.pop("current_scheduled_post", None)
@@ -858,344 +1224,385 @@ async def handle_send_now(update, context):
 # -----------------------------------------------------------------------------
 # GESTIONNAIRE DE CALLBACKS
 # -----------------------------------------------------------------------------
+callback_router = CallbackRouter()
+
+
 async def handle_callback(update, context):
-    """Gère les callbacks des boutons inline."""
+    """Gère les callbacks des boutons inline (routes enregistrées dans callback_router)."""
     try:
-        # Cas 1: Callback query - Sélection d'un canal
         if update.callback_query:
             query = update.callback_query
             await query.answer()
+
+        return await callback_router.dispatch(update, context)
+    except Exception as e:
+        logger.error(f"Erreur dans handle_callback: {e}")
+        await update.callback_query.message.reply_text(
+            "❌ Une erreur est survenue. Veuillez réessayer.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+        )
+        return MAIN_MENU
+
+
+@callback_router.fallback
+async def _cb_unknown(update, context):
+    """Bouton sans route (ancien message ou action retirée)"""
+    await update.callback_query.message.reply_text(
+        "⚠️ Cette action n'est plus disponible.",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+    )
+    return MAIN_MENU
+
+
+@callback_router.prefix("edit_file_", param="post_index", convert=int)
+async def _cb_edit_file(update, context, post_index):
+    """Sous-menu d'édition d'un fichier du brouillon"""
+    query = update.callback_query
+    context.user_data['current_post_index'] = post_index
+    
+    # Récupérer le post à modifier
+    if 'posts' not in context.user_data or post_index >= len(context.user_data['posts']):
+        await query.message.reply_text(
+            "❌ Post introuvable.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+        )
+        return MAIN_MENU
         
-        if query.data == "settings":
-            return await settings(update, context)
-        elif query.data == "custom_settings":
-            return await handle_custom_settings(update, context)
-        elif query.data == "create_publication":
-            return await create_publication(update, context)
-        elif query.data == "planifier_post":
-            return await planifier_post(update, context)
-        elif query.data == "main_menu":
-            return await start(update, context)
-        elif query.data == "channels":
-            return await channels(update, context)
-        elif query.data == "timezone":
-            return await handle_timezone(update, context)
-        elif query.data == "scheduled_posts":
-            return await scheduled_posts(update, context)
-        elif query.data == "delete_scheduled_post":
-            return await handle_delete_scheduled_post(update, context)
-        elif query.data.startswith("confirm_delete_post_"):
-            return await handle_confirm_delete_post(update, context)
-        elif query.data.startswith("schedule_"):
-            return await handle_schedule_time(update, context)
-        elif query.data.startswith("edit_time_"):
-            return await handle_edit_time(update, context)
-        elif query.data.startswith("cancel_post_"):
-            return await handle_cancel_post(update, context)
-        elif query.data.startswith("select_channel_"):
-            return await handle_channel_selection(update, context)
-        elif query.data.startswith("edit_file_"):
-            post_index = int(query.data.split('_')[-1])
-            context.user_data['current_post_index'] = post_index
-            
-            # Récupérer le post à modifier
-            if 'posts' not in context.user_data or post_index >= len(context.user_data['posts']):
-                await query.message.reply_text(
-                    "❌ Post introuvable.",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
-                )
-                return MAIN_MENU
-                
-            post = context.user_data['posts'][post_index]
-            
-            # Créer le sous-menu avec les options selon le type de fichier
-            keyboard = []
-            
-            # Pour les fichiers média (photo, video, document), afficher les options thumbnail
-            if post['type'] in ['photo', 'video', 'document']:
-                keyboard.extend([
-                    [InlineKeyboardButton("📎 Upload Thumbnail", callback_data=f"upload_thumbnail_{post_index}")],
-                    [InlineKeyboardButton("🖼️✏️ Set Thumbnail + Rename", callback_data=f"set_thumbnail_rename_{post_index}")],
-                    [InlineKeyboardButton("✏️ Rename", callback_data=f"rename_post_{post_index}")],
-                ])
-            else:  # Pour les textes, seulement rename
-                keyboard.append([InlineKeyboardButton("✏️ Rename", callback_data=f"rename_post_{post_index}")])
-            
-            # Option de retour (SANS le bouton Supprimer car il est déjà disponible)
-            keyboard.append([InlineKeyboardButton("↩️ Retour", callback_data="main_menu")])
-            
-            # Répondre au callback et envoyer un nouveau message
-            await query.answer("Options de modification...")
-            
-            file_type_text = {
-                'photo': 'photo',
-                'video': 'vidéo', 
-                'document': 'document',
-                'text': 'texte'
-            }.get(post['type'], 'fichier')
-            
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=f"✏️ Édition du {file_type_text}\n\nChoisissez une option de modification :",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return WAITING_PUBLICATION_CONTENT
-        elif query.data.startswith("add_thumbnail_"):
-            post_index = int(query.data.split('_')[-1])
-            # Vérifier si une miniature existe déjà pour ce post
-            post = context.user_data['posts'][post_index]
-            if post.get('thumbnail'):
-                await query.message.reply_text(
-                    "❌ Ce fichier a déjà une miniature. Supprimez-la d'abord avant d'en ajouter une autre.",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
-                )
-                return WAITING_PUBLICATION_CONTENT
-            # Chercher la miniature enregistrée pour le canal
-            channel_username = post.get('channel')
-            user_id = update.effective_user.id
-            clean_username = channel_username.lstrip('@') if channel_username else None
-            thumbnail_file_id = db_manager.get_thumbnail(clean_username, user_id)
-            if not thumbnail_file_id:
-                await query.message.reply_text(
-                    "❌ Aucune miniature enregistrée pour ce canal. Utilisez le menu custom du canal pour en ajouter une.",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
-                )
-                return WAITING_PUBLICATION_CONTENT
-            # Ajouter la miniature au post
-            post['thumbnail'] = thumbnail_file_id
-            # Envoyer l'aperçu à jour
-            await send_preview_file(update, context, post_index)
+    post = context.user_data['posts'][post_index]
+    
+    # Créer le sous-menu avec les options selon le type de fichier (mémorisé par post et type)
+    rows = []
+    
+    # Pour les fichiers média (photo, video, document), afficher les options thumbnail
+    if post['type'] in ['photo', 'video', 'document']:
+        rows.extend([
+            (("📎 Upload Thumbnail", f"upload_thumbnail_{post_index}"),),
+            (("🖼️✏️ Set Thumbnail + Rename", f"set_thumbnail_rename_{post_index}"),),
+            (("✏️ Rename", f"rename_post_{post_index}"),),
+        ])
+    else:  # Pour les textes, seulement rename
+        rows.append((("✏️ Rename", f"rename_post_{post_index}"),))
+    
+    # Option de retour (SANS le bouton Supprimer car il est déjà disponible)
+    rows.append((("↩️ Retour", "main_menu"),))
+    
+    # Répondre au callback et envoyer un nouveau message
+    await query.answer("Options de modification...")
+    
+    file_type_text = {
+        'photo': 'photo',
+        'video': 'vidéo', 
+        'document': 'document',
+        'text': 'texte'
+    }.get(post['type'], 'fichier')
+    
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text=f"✏️ Édition du {file_type_text}\n\nChoisissez une option de modification :",
+        reply_markup=menu_markup(tuple(rows))
+    )
+    return WAITING_PUBLICATION_CONTENT
+
+
+@callback_router.prefix("add_thumbnail_", param="post_index", convert=int)
+async def _cb_add_thumbnail(update, context, post_index):
+    """Ajoute au post la miniature enregistrée pour son canal"""
+    query = update.callback_query
+    # Vérifier si une miniature existe déjà pour ce post
+    post = context.user_data['posts'][post_index]
+    if post.get('thumbnail'):
+        await query.message.reply_text(
+            "❌ Ce fichier a déjà une miniature. Supprimez-la d'abord avant d'en ajouter une autre.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
+        )
+        return WAITING_PUBLICATION_CONTENT
+    # Chercher la miniature enregistrée pour le canal
+    channel_username = post.get('channel')
+    user_id = update.effective_user.id
+    clean_username = channel_username.lstrip('@') if channel_username else None
+    thumbnail_file_id = db_manager.get_thumbnail(clean_username, user_id)
+    if not thumbnail_file_id:
+        await query.message.reply_text(
+            "❌ Aucune miniature enregistrée pour ce canal. Utilisez le menu custom du canal pour en ajouter une.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
+        )
+        return WAITING_PUBLICATION_CONTENT
+    # Ajouter la miniature au post
+    post['thumbnail'] = thumbnail_file_id
+    # Envoyer l'aperçu à jour
+    await send_preview_file(update, context, post_index)
+    await query.message.reply_text(
+        "✅ Miniature du canal ajoutée à ce fichier !",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
+    )
+    return WAITING_PUBLICATION_CONTENT
+
+
+@callback_router.prefix("add_thumbnail_rename_", param="post_index", convert=int)
+async def _cb_add_thumbnail_rename(update, context, post_index):
+    """Demande une miniature puis un nouveau nom pour le post"""
+    query = update.callback_query
+    context.user_data['waiting_for_thumbnail'] = True
+    context.user_data['waiting_for_rename'] = True
+    context.user_data['thumbnail_rename_mode'] = True
+    context.user_data['current_post_index'] = post_index
+    await query.message.reply_text(
+        "Envoie-moi la miniature (image) pour ce fichier :",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
+    )
+    return WAITING_THUMBNAIL
+
+
+@callback_router.prefix("add_reactions_", param="post_index", convert=int)
+async def _cb_add_reactions(update, context, post_index):
+    """Demande les réactions du post"""
+    query = update.callback_query
+    context.user_data['waiting_for_reactions'] = True
+    context.user_data['current_post_index'] = post_index
+    try:
+        await query.edit_message_text(
+            "Entrez les réactions séparées par des / (ex: 👍/❤️/🔥)\nMaximum 8 réactions.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
+        )
+    except Exception as e:
+        if "Message is not modified" not in str(e):
             await query.message.reply_text(
-                "✅ Miniature du canal ajoutée à ce fichier !",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
+                "Entrez les réactions séparées par des / (ex: 👍/❤️/🔥)\nMaximum 8 réactions.",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
             )
-            return WAITING_PUBLICATION_CONTENT
-        elif query.data.startswith("add_thumbnail_rename_"):
-            post_index = int(query.data.split('_')[-1])
-            context.user_data['waiting_for_thumbnail'] = True
-            context.user_data['waiting_for_rename'] = True
-            context.user_data['thumbnail_rename_mode'] = True
-            context.user_data['current_post_index'] = post_index
+    return WAITING_REACTION_INPUT
+
+
+@callback_router.prefix("add_url_button_", param="post_index", convert=int)
+async def _cb_add_url_button(update, context, post_index):
+    """Demande le bouton URL du post"""
+    query = update.callback_query
+    context.user_data['waiting_for_url'] = True
+    context.user_data['current_post_index'] = post_index
+    try:
+        await query.edit_message_text(
+            "Entrez le texte et l'URL du bouton au format :\nTexte du bouton | URL\nExemple : Visiter le site | https://example.com",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
+        )
+    except Exception as e:
+        if "Message is not modified" not in str(e):
             await query.message.reply_text(
-                "Envoie-moi la miniature (image) pour ce fichier :",
+                "Entrez le texte et l'URL du bouton au format :\nTexte du bouton | URL\nExemple : Visiter le site | https://example.com",
                 reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
             )
-            return WAITING_THUMBNAIL
-        # Nouveaux callbacks pour les réactions
-        elif query.data.startswith("add_reactions_"):
-            post_index = int(query.data.split('_')[-1])
-            context.user_data['waiting_for_reactions'] = True
-            context.user_data['current_post_index'] = post_index
-            try:
-                await query.edit_message_text(
-                    "Entrez les réactions séparées par des / (ex: 👍/❤️/🔥)\nMaximum 8 réactions.",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
-                )
-            except Exception as e:
-                if "Message is not modified" not in str(e):
-                    await query.message.reply_text(
-                        "Entrez les réactions séparées par des / (ex: 👍/❤️/🔥)\nMaximum 8 réactions.",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
-                    )
-            return WAITING_REACTION_INPUT
-        elif query.data.startswith("remove_reactions_"):
-            return await remove_reactions(update, context)
-        # Nouveaux callbacks pour les boutons URL
-        elif query.data.startswith("add_url_button_"):
-            post_index = int(query.data.split('_')[-1])
-            context.user_data['waiting_for_url'] = True
-            context.user_data['current_post_index'] = post_index
-            try:
-                await query.edit_message_text(
-                    "Entrez le texte et l'URL du bouton au format :\nTexte du bouton | URL\nExemple : Visiter le site | https://example.com",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
-                )
-            except Exception as e:
-                if "Message is not modified" not in str(e):
-                    await query.message.reply_text(
-                        "Entrez le texte et l'URL du bouton au format :\nTexte du bouton | URL\nExemple : Visiter le site | https://example.com",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
-                    )
-            return WAITING_URL_INPUT
-        elif query.data.startswith("remove_url_buttons_"):
-            return await remove_url_buttons(update, context)
-        # Nouveau callback pour la suppression
-        elif query.data.startswith("delete_post_"):
-            post_index = int(query.data.split('_')[-1])
-            if 'posts' in context.user_data and post_index < len(context.user_data['posts']):
-                context.user_data['posts'].pop(post_index)
-            try:
-                await query.edit_message_text(
-                    "✅ Post supprimé avec succès !",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
-                )
-            except Exception as e:
-                if "Message is not modified" not in str(e):
-                    await query.message.reply_text(
-                        "✅ Post supprimé avec succès !",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
-                    )
-            return MAIN_MENU
-        # Nouveau callback pour le renommage
-        elif query.data.startswith("rename_post_"):
-            post_index = int(query.data.split('_')[-1])
-            context.user_data['waiting_for_rename'] = True
-            context.user_data['current_post_index'] = post_index
-            
-            # Répondre au callback et envoyer un nouveau message
-            await query.answer("Préparation du renommage...")
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="✏️ Renommer le fichier\n\nEnvoie-moi le nouveau nom pour ce fichier (avec l'extension).\nPar exemple: mon_document.pdf",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("❌ Annuler", callback_data="main_menu")]])
+    return WAITING_URL_INPUT
+
+
+@callback_router.prefix("delete_post_", param="post_index", convert=int)
+async def _cb_delete_post(update, context, post_index):
+    """Supprime un post du brouillon"""
+    query = update.callback_query
+    if 'posts' in context.user_data and post_index < len(context.user_data['posts']):
+        context.user_data['posts'].pop(post_index)
+    try:
+        await query.edit_message_text(
+            "✅ Post supprimé avec succès !",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+        )
+    except Exception as e:
+        if "Message is not modified" not in str(e):
+            await query.message.reply_text(
+                "✅ Post supprimé avec succès !",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+            )
+    return MAIN_MENU
+
+
+@callback_router.prefix("rename_post_", param="post_index", convert=int)
+async def _cb_rename_post(update, context, post_index):
+    """Demande le nouveau nom du post"""
+    query = update.callback_query
+    context.user_data['waiting_for_rename'] = True
+    context.user_data['current_post_index'] = post_index
+    
+    # Répondre au callback et envoyer un nouveau message
+    await query.answer("Préparation du renommage...")
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text="✏️ Renommer le fichier\n\nEnvoie-moi le nouveau nom pour ce fichier (avec l'extension).\nPar exemple: mon_document.pdf",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("❌ Annuler", callback_data="main_menu")]])
+    )
+    return WAITING_RENAME_INPUT
+
+
+@callback_router.prefix("cancel_rename_", param="post_index", convert=int)
+async def _cb_cancel_rename(update, context, post_index):
+    """Annule le renommage en cours"""
+    query = update.callback_query
+    context.user_data.pop('waiting_for_rename', None)
+    context.user_data.pop('current_post_index', None)
+    try:
+        await query.edit_message_text("❌ Renommage annulé.")
+    except Exception as e:
+        if "Message is not modified" not in str(e):
+            await query.message.reply_text("❌ Renommage annulé.")
+    return WAITING_PUBLICATION_CONTENT
+
+
+@callback_router.exact("confirm_large_thumbnail")
+async def _cb_confirm_large_thumbnail(update, context):
+    """Enregistre le thumbnail de canal malgré sa taille"""
+    query = update.callback_query
+    thumbnail = context.user_data.pop('temp_thumbnail', None)
+    clean_username = (context.user_data.get('selected_channel', {}).get('username') or '').lstrip('@')
+    if not thumbnail or not clean_username:
+        await query.message.reply_text(
+            "❌ Aucun thumbnail en attente.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="thumbnail_menu")]])
+        )
+        return SETTINGS
+
+    if db_manager.save_thumbnail(clean_username, update.effective_user.id, thumbnail):
+        context.user_data['waiting_for_channel_thumbnail'] = False
+        text = f"✅ Thumbnail enregistré avec succès pour @{clean_username}!"
+    else:
+        text = "❌ Erreur lors de l'enregistrement du thumbnail."
+    await query.edit_message_text(
+        text,
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("↩️ Retour", callback_data=f"custom_channel_{clean_username}")
+        ]])
+    )
+    return SETTINGS
+
+
+@callback_router.exact("auto_destruction")
+async def _cb_auto_destruction(update, context):
+    """L'auto-destruction des posts n'est pas encore disponible"""
+    await update.callback_query.message.reply_text(
+        "⏱️ L'auto-destruction n'est pas encore disponible. Choisissez un autre mode d'envoi."
+    )
+    return SEND_OPTIONS
+
+
+@callback_router.exact("channel_stats")
+async def _cb_channel_stats(update, context):
+    """Les statistiques des canaux ne sont pas encore disponibles"""
+    await edit_menu(
+        update.callback_query,
+        "📊 Les statistiques ne sont pas encore disponibles.",
+        reply_markup=static_menu("stats_back", ((("↩️ Menu principal", "main_menu"),),))
+    )
+    return MAIN_MENU
+
+
+@callback_router.exact("use_default_channel")
+async def _cb_use_default_channel(update, context):
+    """Sélectionne le canal par défaut pour la publication"""
+    channel_username = normalize_channel_username(config.DEFAULT_CHANNEL.rstrip('/').rsplit('/', 1)[-1])
+    context.user_data['selected_channel'] = {'username': channel_username, 'name': channel_username}
+    await edit_menu(
+        update.callback_query,
+        f"✅ Canal sélectionné : {channel_username}\n\n"
+        f"Envoyez-moi le contenu que vous souhaitez publier (texte, photo, vidéo ou document).\n\n"
+        f"Vous pouvez envoyer jusqu'à 24 fichiers pour ce post.",
+        reply_markup=static_menu("cancel_publication", ((("❌ Annuler", "main_menu"),),))
+    )
+    return WAITING_PUBLICATION_CONTENT
+
+
+@callback_router.exact("cancel_schedule")
+async def _cb_cancel_schedule(update, context):
+    """Annule la planification en cours"""
+    query = update.callback_query
+    try:
+        await query.edit_message_text(
+            "❌ Planification annulée.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
+        )
+    except Exception as e:
+        if "Message is not modified" not in str(e):
+            await query.message.reply_text(
+                "❌ Planification annulée.",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
             )
-            return WAITING_RENAME_INPUT
-        elif query.data == "cancel_schedule":
-            try:
-                await query.edit_message_text(
-                    "❌ Planification annulée.",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
-                )
-            except Exception as e:
-                if "Message is not modified" not in str(e):
-                    await query.message.reply_text(
-                        "❌ Planification annulée.",
-                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
-                    )
-            return MAIN_MENU
-        elif query.data == "add_channel":
-            try:
-                await query.edit_message_text(
-                    "Veuillez entrer le nom du canal et son @username au format :\nNom du canal | @username",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
-                )
-            except Exception:
-                await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text="Veuillez entrer le nom du canal et son @username au format :\nNom du canal | @username",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
-                )
-            return WAITING_CHANNEL_INFO
-        elif query.data == "send_now":
-            await send_post_now(update, context)
-            return ConversationHandler.END
-        elif query.data.startswith("custom_channel_"):
-            return await handle_custom_channel(update, context)
-        elif query.data == "add_username":
-            channel_username = context.user_data.get('custom_channel')
-            custom_usernames = context.user_data.get('custom_usernames', {})
-            if channel_username and custom_usernames.get(channel_username):
-                await query.edit_message_text(
-                    "❌ Un texte/username est déjà enregistré pour ce canal. Supprimez-le d'abord avant d'en ajouter un autre.",
-                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="settings")]])
-                )
-                return SETTINGS
+    return MAIN_MENU
+
+
+@callback_router.exact("add_channel")
+async def _cb_add_channel(update, context):
+    """Demande les informations du canal à ajouter"""
+    query = update.callback_query
+    try:
+        await query.edit_message_text(
+            "Veuillez entrer le nom du canal et son @username au format :\nNom du canal | @username",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
+        )
+    except Exception:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="Veuillez entrer le nom du canal et son @username au format :\nNom du canal | @username",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="main_menu")]])
+        )
+    return WAITING_CHANNEL_INFO
+
+
+@callback_router.exact("send_now")
+async def _cb_send_now(update, context):
+    """Envoie immédiatement le brouillon"""
+    await send_post_now(update, context)
+    return ConversationHandler.END
+
+
+@callback_router.exact("add_username")
+async def _cb_add_username(update, context):
+    """Demande le texte/username à ajouter au canal"""
+    query = update.callback_query
+    channel_username = context.user_data.get('custom_channel')
+    custom_usernames = context.user_data.get('custom_usernames', {})
+    if channel_username and custom_usernames.get(channel_username):
+        await query.edit_message_text(
+            "❌ Un texte/username est déjà enregistré pour ce canal. Supprimez-le d'abord avant d'en ajouter un autre.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="settings")]])
+        )
+        return SETTINGS
+    await query.edit_message_text(
+        "Veuillez envoyer le texte ou username à ajouter (entre crochets, ex: [@MONUSERNAME] ou [🔥 Ma chaîne]) :",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="settings")]])
+    )
+    return WAITING_CUSTOM_USERNAME
+
+
+@callback_router.exact("delete_username")
+async def _cb_delete_username(update, context):
+    """Supprime le texte/username du canal sélectionné"""
+    query = update.callback_query
+    channel_username = context.user_data.get('custom_channel')
+    if channel_username:
+        user_id = update.effective_user.id
+        # Utiliser la fonction de normalisation
+        clean_username = normalize_channel_username(channel_username)
+        
+        # Supprimer le tag de la base de données
+        success = db_manager.set_channel_tag(clean_username, user_id, None)
+        
+        if success:
             await query.edit_message_text(
-                "Veuillez envoyer le texte ou username à ajouter (entre crochets, ex: [@MONUSERNAME] ou [🔥 Ma chaîne]) :",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Annuler", callback_data="settings")]])
+                f"✅ Tag supprimé pour @{clean_username}",
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton("↩️ Retour", callback_data=f"custom_channel_{clean_username}")
+                ]])
             )
-            return WAITING_CUSTOM_USERNAME
-        elif query.data == "manage_channels":
-            return await manage_channels(update, context)
-        elif query.data == "add_thumbnail":
-            # Rediriger vers le bon handler dans thumbnail_handler.py
-            return await handle_add_thumbnail(update, context)
-        elif query.data.startswith("select_thumb_channel_"):
-            return await handle_select_thumb_channel(update, context)
-        elif query.data.startswith("select_username_channel_"):
-            return await handle_select_username_channel(update, context)
-        elif query.data.startswith("custom_select_channel_"):
-            return await handle_custom_select_channel(update, context)
-
-        # ---------- GESTION DES THUMBNAILS ----------
-        elif query.data == "thumbnail_menu":
-            return await handle_thumbnail_functions(update, context)
-
-        elif query.data == "view_thumbnail":
-            return await handle_view_thumbnail(update, context)
-
-        elif query.data == "delete_thumbnail":
-            return await handle_delete_thumbnail(update, context)
-
-        elif query.data.startswith("upload_thumbnail_"):
-            # Upload Thumbnail - applique automatiquement le thumbnail enregistré
-            return await handle_add_thumbnail_to_post(update, context)
-
-        elif query.data.startswith("set_thumbnail_rename_"):
-            # Set Thumbnail + Rename - applique le thumbnail ET demande le nouveau nom
-            return await handle_set_thumbnail_and_rename(update, context)
-
-        elif query.data == "edit_username":
-            return await handle_add_username(update, context)
-
-        elif query.data == "delete_username":
-            channel_username = context.user_data.get('custom_channel')
-            if channel_username:
-                user_id = update.effective_user.id
-                # Utiliser la fonction de normalisation
-                clean_username = normalize_channel_username(channel_username)
-                
-                # Supprimer le tag de la base de données
-                success = db_manager.set_channel_tag(clean_username, user_id, None)
-                
-                if success:
-                    await query.edit_message_text(
-                        f"✅ Tag supprimé pour @{clean_username}",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("↩️ Retour", callback_data=f"custom_channel_{clean_username}")
-                        ]])
-                    )
-                else:
-                    await query.edit_message_text(
-                        "❌ Erreur lors de la suppression du tag.",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("↩️ Retour", callback_data=f"custom_channel_{clean_username}")
-                        ]])
-                    )
-            else:
-                await query.edit_message_text(
-                    "❌ Aucun canal sélectionné.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("↩️ Retour", callback_data="custom_settings")
-                    ]])
-                )
-            return SETTINGS
-
-        # Modifier le cas add_thumbnail pour qu'il corresponde à votre logique
-        elif query.data == "add_thumbnail":
-            # Vérifier si on est dans le contexte d'un canal sélectionné
-            selected_channel = context.user_data.get('selected_channel', {})
-            if selected_channel:
-                channel_username = selected_channel.get('username')
-                await query.edit_message_text(
-                    f"🖼️ Enregistrer un thumbnail pour @{channel_username}\n\n"
-                    f"Envoyez-moi une image pour l'utiliser comme thumbnail par défaut.\n\n"
-                    f"• Le thumbnail doit être une image (JPEG ou PNG recommandé)\n"
-                    f"• Taille maximale : 200 KB\n"
-                    f"• Dimensions recommandées : 320x320 px",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("❌ Annuler", callback_data="thumbnail_menu")
-                    ]])
-                )
-                context.user_data['waiting_for_channel_thumbnail'] = True
-                return WAITING_THUMBNAIL
-            else:
-                # Si pas de canal sélectionné, demander de choisir
-                await query.edit_message_text(
-                    "❌ Veuillez d'abord sélectionner un canal via le bouton Custom.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("↩️ Retour", callback_data="custom_settings")
-                    ]])
-                )
-                return SETTINGS
-            
-    except Exception as e:
-        logger.error(f"Erreur dans handle_callback: {e}")
-        await update.callback_query.message.reply_text(
-            "❌ Une erreur est survenue. Veuillez réessayer.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+        else:
+            await query.edit_message_text(
+                "❌ Erreur lors de la suppression du tag.",
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton("↩️ Retour", callback_data=f"custom_channel_{clean_username}")
+                ]])
+            )
+    else:
+        await query.edit_message_text(
+            "❌ Aucun canal sélectionné.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("↩️ Retour", callback_data="custom_settings")
+            ]])
         )
-        return MAIN_MENU
+    return SETTINGS
 
 
 async def handle_post_content(update, context):
@@ -1214,7 +1621,7 @@ async def handle_post_content(update, context):
             "⚠️ Vous avez atteint la limite de 24 fichiers pour ce post.\nVeuillez d'abord envoyer ce post avant d'en ajouter d'autres."
         )
         keyboard = [
-            [InlineKeyboardButton("✏️ Edit File", callback_data="edit_file")],
+            [InlineKeyboardButton("✏️ Edit File", callback_data=f"edit_file_{len(context.user_data['posts']) - 1}")],
             [InlineKeyboardButton("❌ Annuler", callback_data="main_menu")]
         ]
         await message.reply_text(
@@ -1258,6 +1665,8 @@ async def handle_post_content(update, context):
     else:
         await message.reply_text("❌ Type de contenu non pris en charge.")
         return WAITING_PUBLICATION_CONTENT
+    # Métadonnées du média (taille, type MIME, durée, dimensions), capturées une seule fois
+    post_data["metadata"] = extract_media_metadata(message)
     # Ajouter le post à la liste
     context.user_data['posts'].append(post_data)
     post_index = len(context.user_data['posts']) - 1
@@ -1275,17 +1684,13 @@ async def handle_post_content(update, context):
         # Essayer d'abord l'aperçu normal, puis basculer si nécessaire
         file_too_large = False
         actual_file_size = None
+        preview_text = None
         
         if post_data["type"] in ["video", "document"]:
-            try:
-                file_obj = await context.bot.get_file(post_data["content"])
-                actual_file_size = file_obj.file_size
-                if file_obj.file_size > 50 * 1024 * 1024:  # 50 Mo
-                    file_too_large = True
-                    logger.info(f"Fichier trop volumineux pour aperçu: {file_obj.file_size} bytes")
-            except Exception as size_error:
-                # Si on ne peut pas récupérer la taille, on va quand même essayer l'aperçu
-                logger.info(f"Impossible de vérifier la taille du fichier ({size_error}), tentative d'aperçu normal")
+            actual_file_size = post_data["metadata"]["file_size"]
+            if actual_file_size and actual_file_size > config.BOT_MAX_MEDIA_SIZE:
+                file_too_large = True
+                logger.info(f"Fichier trop volumineux pour aperçu: {actual_file_size} bytes")
         
         # Essayer d'envoyer l'aperçu d'abord (même si on ne connaît pas la taille)
         sent_message = None
@@ -1342,12 +1747,17 @@ async def handle_post_content(update, context):
                 reply_markup=InlineKeyboardMarkup(keyboard)
             )
         if sent_message:
-            # Sauvegarder les informations du message d'aperçu
+            # Sauvegarder les informations du message d'aperçu (et son état, pour les modifications en place)
             if 'preview_messages' not in context.user_data:
                 context.user_data['preview_messages'] = {}
             context.user_data['preview_messages'][post_index] = {
                 'message_id': sent_message.message_id,
-                'chat_id': message.chat_id
+                'chat_id': message.chat_id,
+                'state': preview_state(
+                    post_data,
+                    InlineKeyboardMarkup(keyboard),
+                    placeholder=preview_text
+                )
             }
         # Afficher le nombre de fichiers restants
         remaining_files = 24 - len(context.user_data['posts'])
@@ -1395,7 +1805,7 @@ async def handle_url_input(update, context):
             for reaction in context.user_data['posts'][post_index]['reactions']:
                 current_row.append(InlineKeyboardButton(
                     f"{reaction}",
-                    callback_data=f"react_{post_index}_{reaction}"
+                    callback_data=encode_callback("react", post_index, reaction)
                 ))
                 if len(current_row) == 4:
                     keyboard.append(current_row)
@@ -1411,77 +1821,13 @@ async def handle_url_input(update, context):
             [InlineKeyboardButton("❌ Supprimer", callback_data=f"delete_post_{post_index}")]
         ])
         reply_markup = InlineKeyboardMarkup(keyboard)
-        preview_info = context.user_data.get('preview_messages', {}).get(post_index)
-        if preview_info:
-            try:
-                await context.bot.delete_message(
-                    chat_id=preview_info['chat_id'],
-                    message_id=preview_info['message_id']
-                )
-            except Exception:
-                pass
-        post = context.user_data['posts'][post_index]
-        sent_message = None
-        
-        # Vérifier si le fichier est trop volumineux pour l'aperçu
-        file_too_large = False
-        if post["type"] in ["video", "document"]:
-            try:
-                file_obj = await context.bot.get_file(post["content"])
-                if file_obj.file_size > 50 * 1024 * 1024:  # 50 Mo
-                    file_too_large = True
-            except Exception:
-                file_too_large = True  # Par sécurité
-        
-        if file_too_large:
-            # Pour les gros fichiers, envoyer un message texte au lieu de l'aperçu
-            file_type_text = "vidéo" if post["type"] == "video" else "document"
-            preview_text = f"📁 {file_type_text.capitalize()} (fichier volumineux)\n"
-            if post.get("caption"):
-                preview_text += f"📝 Légende: {post['caption']}\n"
-            preview_text += "\n⚠️ Aperçu non disponible (fichier > 50 Mo)\n✅ Le fichier sera envoyé via userbot lors de la publication"
-            
-            sent_message = await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=preview_text,
-                reply_markup=reply_markup
-            )
-        else:
-            # Pour les fichiers normaux, envoyer l'aperçu habituel
-            if post["type"] == "photo":
-                sent_message = await context.bot.send_photo(
-                    chat_id=update.effective_chat.id,
-                    photo=post["content"],
-                    caption=post.get("caption"),
-                    reply_markup=reply_markup
-                )
-            elif post["type"] == "video":
-                sent_message = await context.bot.send_video(
-                    chat_id=update.effective_chat.id,
-                    video=post["content"],
-                    caption=post.get("caption"),
-                    reply_markup=reply_markup
-                )
-            elif post["type"] == "document":
-                sent_message = await context.bot.send_document(
-                    chat_id=update.effective_chat.id,
-                    document=post["content"],
-                    caption=post.get("caption"),
-                    reply_markup=reply_markup
-                )
-            elif post["type"] == "text":
-                sent_message = await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=post["content"],
-                    reply_markup=reply_markup
-                )
-        if sent_message:
-            if 'preview_messages' not in context.user_data:
-                context.user_data['preview_messages'] = {}
-            context.user_data['preview_messages'][post_index] = {
-                'message_id': sent_message.message_id,
-                'chat_id': update.effective_chat.id
-            }
+
+        async def build():
+            post = context.user_data['posts'][post_index]
+            return reply_markup, await _large_file_placeholder(context, post)
+
+        # Seul le clavier change : modification en place de l'aperçu, après les modifications rapprochées
+        get_preview_refresher().schedule(context, update.effective_chat.id, post_index, build)
         await update.message.reply_text(
             "✅ Bouton URL ajouté avec succès !\nVous pouvez continuer à m'envoyer des messages."
         )
@@ -1757,7 +2103,17 @@ async def handle_channel_selection(update, context):
             await query.answer()
             
             # Extraire le nom d'utilisateur du canal du callback_data
-            channel_username = query.data.replace("select_channel_", "")
+            decoded = decode_callback(query.data, "select_channel")
+            if decoded is not None:
+                channel_username = decoded[0]
+            elif query.data.startswith("select_channel_"):
+                channel_username = query.data[len("select_channel_"):]
+            else:
+                await query.edit_message_text(
+                    "⌛ Ce menu a expiré, veuillez recommencer.",
+                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]])
+                )
+                return WAITING_CHANNEL_SELECTION
             user_id = update.effective_user.id
             
             # Récupérer les informations du canal depuis la base de données
@@ -1872,7 +2228,7 @@ async def handle_reply_keyboard(update, context):
             keyboard = [
                 [InlineKeyboardButton("Régler temps d'auto destruction", callback_data="auto_destruction")],
                 [InlineKeyboardButton("Maintenant", callback_data="send_now")],
-                [InlineKeyboardButton("Planifier", callback_data="schedule_send")],
+                [InlineKeyboardButton("📡 Publier sur plusieurs canaux", callback_data="fanout_menu")],
                 [InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]
             ]
             await update.message.reply_text(
@@ -1885,6 +2241,7 @@ async def handle_reply_keyboard(update, context):
             return WAITING_PUBLICATION_CONTENT
         elif user_text == "annuler":
             context.user_data.pop("posts", None)
+            context.user_data.pop("fanout_channels", None)
             context.user_data.pop("preview_messages", None)
             context.user_data.pop("current_scheduled_post", None)
             await update.message.reply_text("Publication annulée. Retour au menu principal.")
@@ -1914,7 +2271,8 @@ async def handle_reply_keyboard(update, context):
 
 
 async def diagnostic(update, context):
-    await update.message.reply_text("Diagnostic non implémenté.")
+    """Affiche les compteurs de routage des médias (octets évités)"""
+    await update.message.reply_text(f"📊 Routage des médias\n{routing_stats.summary()}")
     return MAIN_MENU
 
 
@@ -1933,13 +2291,15 @@ async def handle_reaction_click(update, context):
     await query.answer()
     try:
         # Extraire l'index du post et l'emoji
-        data = query.data  # ex: react_0_👍
-        parts = data.split('_')
-        if len(parts) < 3:
-            await query.answer("Erreur de format de réaction")
-            return MAIN_MENU
-        post_index = int(parts[1])
-        emoji = '_'.join(parts[2:])
+        decoded = decode_callback(query.data, "react")
+        if decoded is None:
+            # Ancien format des messages déjà publiés : react_0_👍
+            parts = query.data.split('_')
+            if len(parts) < 3 or parts[0] != "react":
+                await query.answer("Erreur de format de réaction")
+                return MAIN_MENU
+            decoded = (int(parts[1]), '_'.join(parts[2:]))
+        post_index, emoji = decoded
 
         # Stockage des réactions en mémoire (par chat, post, emoji)
         chat_id = query.message.chat_id
@@ -1965,7 +2325,7 @@ async def handle_reaction_click(update, context):
             k = (chat_id, message_id, post_index, r)
             c = reaction_counts.get(k, 0)
             label = f"{r} {c}" if c > 0 else r
-            current_row.append(InlineKeyboardButton(label, callback_data=f"react_{post_index}_{r}"))
+            current_row.append(InlineKeyboardButton(label, callback_data=encode_callback("react", post_index, r)))
             if len(current_row) == 4:
                 keyboard.append(current_row)
                 current_row = []
@@ -1993,13 +2353,7 @@ async def settings(update, context):
     """Affiche le menu des paramètres du bot."""
     try:
         user_id = update.effective_user.id
-        keyboard = [
-            [InlineKeyboardButton("🌐 Gérer mes canaux", callback_data='manage_channels')],
-            [InlineKeyboardButton("⏰ Fuseau horaire", callback_data='timezone')],
-            [InlineKeyboardButton("🎨 Custom", callback_data='custom_settings')],
-            [InlineKeyboardButton("🏠 Retour au menu principal", callback_data='main_menu')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = static_menu("settings", SETTINGS_MENU_ROWS)
         if update.message:
             await update.message.reply_text(
                 "⚙️ *Paramètres*\n\nConfigurez vos préférences et gérez vos canaux Telegram ici.",
@@ -2007,7 +2361,8 @@ async def settings(update, context):
                 parse_mode='Markdown'
             )
         else:
-            await update.callback_query.edit_message_text(
+            await edit_menu(
+                update.callback_query,
                 "⚙️ *Paramètres*\n\nConfigurez vos préférences et gérez vos canaux Telegram ici.",
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
@@ -2022,28 +2377,45 @@ async def settings(update, context):
             await update.callback_query.edit_message_text("❌ Erreur lors de l'affichage des paramètres.")
         return MAIN_MENU
 
+async def handle_delete_channel(update, context):
+    """Supprime un canal puis réaffiche la liste"""
+    decoded = decode_callback(update.callback_query.data, "delete_channel")
+    if decoded is None:
+        await update.callback_query.edit_message_text(
+            "⌛ Ce menu a expiré, veuillez recommencer.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="settings")]])
+        )
+        return SETTINGS
+    channel_username = decoded[0]
+    if db_manager.delete_channel(channel_username, update.effective_user.id):
+        logger.info(f"Canal @{channel_username} supprimé par {update.effective_user.id}")
+    else:
+        logger.warning(f"Suppression du canal @{channel_username} impossible")
+    return await manage_channels(update, context)
+
+
 async def manage_channels(update, context):
     """Affiche la liste des canaux de l'utilisateur avec option de suppression."""
     try:
         user_id = update.effective_user.id
         channels = db_manager.list_channels(user_id)
         if not channels:
-            await update.callback_query.edit_message_text(
+            await edit_menu(
+                update.callback_query,
                 "Vous n'avez pas encore ajouté de canaux.",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="settings")]])
+                reply_markup=static_menu("settings_back", ((("↩️ Retour", "settings"),),))
             )
             return SETTINGS
         message = "🌐 *Vos canaux* :\n\n"
-        keyboard = []
+        rows = []
         for channel in channels:
             message += f"• {channel['name']} (@{channel['username']})\n"
-            keyboard.append([
-                InlineKeyboardButton(f"❌ Supprimer {channel['name']}", callback_data=f"delete_channel_{channel['username']}")
-            ])
-        keyboard.append([InlineKeyboardButton("↩️ Retour", callback_data="settings")])
-        await update.callback_query.edit_message_text(
+            rows.append(((f"❌ Supprimer {channel['name']}", encode_callback("delete_channel", channel['username'])),))
+        rows.append((("↩️ Retour", "settings"),))
+        await edit_menu(
+            update.callback_query,
             message,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=menu_markup(tuple(rows)),
             parse_mode='Markdown'
         )
         return SETTINGS
@@ -2063,13 +2435,28 @@ async def cleanup(application):
             application.scheduler_manager.stop()
             logger.info("Scheduler arrêté avec succès")
         
-        # Déconnecter le client Telethon
-        if hasattr(application, 'bot_data') and 'userbot' in application.bot_data:
-            await application.bot_data['userbot'].disconnect()
-            logger.info("Client Telethon déconnecté avec succès")
+        # Déconnecter les sessions Telethon
+        if hasattr(application, 'bot_data') and 'userbot_pool' in application.bot_data:
+            await application.bot_data['userbot_pool'].stop()
+            logger.info("Sessions Telethon déconnectées avec succès")
     except Exception as e:
         logger.error(f"Erreur lors du nettoyage: {e}")
 
+def _transfer_progress(status_message, label="Upload"):
+    """Progression d'un transfert affichée dans un message de statut (modifications espacées)"""
+    editor = DebouncedEditor(status_message.edit_text, config.PROGRESS_EDIT_INTERVAL)
+    return TransferProgress(editor, label)
+
+
+async def _send_by_file_id(context, chat_id, file_type, file_id):
+    """Renvoie un média déjà connu de Telegram par son file_id (aucun transfert)"""
+    if file_type == "photo":
+        return await context.bot.send_photo(chat_id=chat_id, photo=file_id)
+    if file_type == "video":
+        return await context.bot.send_video(chat_id=chat_id, video=file_id)
+    return await context.bot.send_document(chat_id=chat_id, document=file_id)
+
+
 async def send_large_file(update: Update, context):
     """Gère l'envoi de fichiers volumineux via le userbot."""
     try:
@@ -2095,52 +2482,93 @@ async def send_large_file(update: Update, context):
             await message.reply_text("❌ Type de fichier non supporté pour l'envoi de gros fichiers.")
             return
 
-        # Télécharger le fichier dans le dossier de téléchargement
-        download_path = os.path.join(config.DOWNLOAD_FOLDER, file_name)
-        file_obj = await file.get_file()
-        await file_obj.download_to_drive(download_path)
-
-        file_size = os.path.getsize(download_path)
         max_bot_size = getattr(config, 'BOT_MAX_MEDIA_SIZE', 50 * 1024 * 1024)
         max_userbot_size = getattr(config, 'USERBOT_MAX_MEDIA_SIZE', 2 * 1024 * 1024 * 1024)
 
-        # Si le fichier est trop gros pour le userbot
-        if file_size > max_userbot_size:
-            await message.reply_text("❌ Fichier trop volumineux pour être envoyé (limite 2 Go)")
-            os.remove(download_path)
-            return
+        # Route choisie d'après la taille connue dès la réception
+        route = route_media(file_type, file.file_size, max_bot_size, max_userbot_size)
 
-        # Si le fichier est petit, l'envoyer avec le bot
-        if file_size <= max_bot_size:
-            if file_type == "document":
-                await context.bot.send_document(chat_id=message.chat_id, document=download_path)
-            elif file_type == "video":
-                await context.bot.send_video(chat_id=message.chat_id, video=download_path)
-            elif file_type == "photo":
-                await context.bot.send_photo(chat_id=message.chat_id, photo=download_path)
-            await message.reply_text("✅ Fichier envoyé via le bot !")
-            os.remove(download_path)
+        if route == ROUTE_TOO_LARGE:
+            await message.reply_text("❌ Fichier trop volumineux pour être envoyé (limite 2 Go)")
             return
 
-        # Sinon, utiliser Telethon (userbot)
-        try:
-            await message.reply_text("⏳ Upload du fichier en cours...")
-            userbot = context.application.bot_data.get('userbot')
-            if not userbot:
+        if route == ROUTE_FILE_ID:
+            # Telegram possède déjà le fichier : renvoi par file_id, sans téléchargement ni upload
+            try:
+                await _send_by_file_id(context, message.chat_id, file_type, file.file_id)
+                routing_stats.record(ROUTE_FILE_ID, file.file_size)
+                await message.reply_text("✅ Fichier envoyé via le bot !")
+                return
+            except Exception as e:
+                if file.file_size is not None:
+                    raise
+                # Taille inconnue : dernier recours par le disque
+                logger.info(f"Renvoi par file_id impossible ({e}), passage par le disque")
+                routing_stats.record_fallback()
+                route = ROUTE_DISK
+
+        # Au-delà de la limite du bot, l'API bot ne peut pas télécharger le fichier :
+        # le userbot le récupère via le chat relais
+        if route == ROUTE_USERBOT:
+            if not context.application.bot_data.get('userbot_pool'):
                 await message.reply_text("❌ Userbot non initialisé. Impossible d'envoyer le fichier volumineux.")
                 return
-
-            await retry_operation(
-                lambda: userbot.send_file(
+            status_message = await message.reply_text("⏳ Upload du fichier en cours...")
+            progress = _transfer_progress(status_message)
+            notify = _queue_notifier(context, message.chat_id)
+            await _run_on_userbot(
+                context,
+                file.file_size,
+                lambda leased: _userbot_transfer(leased).send(
+                    context.bot,
                     message.chat_id,
-                    download_path,
-                    caption="📤 Voici votre fichier !"
+                    file_type,
+                    file.file_id,
+                    caption="📤 Voici votre fichier !",
+                    file_unique_id=_checkpoint_key(leased, file.file_unique_id),
+                    progress_callback=progress
+                ),
+                admission=lambda: transfer_governor.admit(
+                    update.effective_user.id, file.file_size, on_wait=notify
                 )
             )
-            await message.reply_text("✅ Fichier envoyé via le userbot !")
-        finally:
-            if os.path.exists(download_path):
-                os.remove(download_path)
+            routing_stats.record(ROUTE_USERBOT, file.file_size)
+            await progress.finish("✅ Fichier envoyé via le userbot !")
+            return
+
+        # Reste le repli par le disque d'un média de taille inconnue : l'API bot
+        # ne télécharge pas au-delà de sa limite, l'envoi se fait donc par le bot.
+        # Le média est servi depuis le cache local (adressé par file_unique_id) :
+        # pas de collision entre noms identiques ni de nouveau téléchargement
+        async def fetch(path):
+            if not resource_manager.ensure_space(file.file_size or 0):
+                raise IOError("Espace disque insuffisant dans le dossier de téléchargement")
+            file_obj = await file.get_file()
+            await file_obj.download_to_drive(path)
+
+        # Téléchargement (si absent du cache) et envoi admis selon le budget de transfert.
+        # Aucune session userbot n'est réservée ici : les transferts du userbot sont
+        # admis par _run_on_userbot, une fois la session obtenue
+        disk_bytes = 0 if media_cache.contains(file.file_unique_id) else (file.file_size or 0)
+        async with transfer_governor.admit(
+            update.effective_user.id,
+            file.file_size or 0,
+            disk_bytes=disk_bytes,
+            on_wait=_queue_notifier(context, message.chat_id)
+        ):
+            async with media_cache.acquire(
+                file.file_unique_id, fetch, suffix=os.path.splitext(file_name)[1]
+            ) as download_path:
+                file_size = os.path.getsize(download_path)
+                local_file = Path(download_path)
+                if file_type == "document":
+                    await context.bot.send_document(chat_id=message.chat_id, document=local_file, filename=file_name)
+                elif file_type == "video":
+                    await context.bot.send_video(chat_id=message.chat_id, video=local_file, filename=file_name)
+                elif file_type == "photo":
+                    await context.bot.send_photo(chat_id=message.chat_id, photo=local_file)
+                routing_stats.record(ROUTE_DISK, file_size)
+                await message.reply_text("✅ Fichier envoyé via le bot !")
 
     except Exception as e:
         logger.error(f"Erreur lors de l'envoi du fichier : {e}")
@@ -2152,41 +2580,156 @@ async def send_large_file(update: Update, context):
             loop.run_until_complete(cleanup(application))
 
 class ResourceManager:
+    """
+    Comptabilité incrémentale du dossier de téléchargement
+
+    Le total en octets et l'index des fichiers par âge sont mis à jour à chaque
+    écriture et suppression (track_file / untrack_file) : la vérification du
+    quota est en O(1) et l'éviction retire directement le plus ancien fichier.
+    Le balayage périodique (sweep) resynchronise l'index avec le disque.
+    """
+
     def __init__(self, download_folder: str, max_storage_mb: int = 1000):
         self.download_folder = download_folder
         self.max_storage_bytes = max_storage_mb * 1024 * 1024
+        self.total_bytes = 0
+        # Chemin -> (date de modification, taille)
+        self._files: Dict[str, tuple] = {}
+        # Tas (date, chemin) ; les entrées périmées sont ignorées au dépilage
+        self._by_age: List[tuple] = []
+        # Fichiers à ne pas supprimer (ex: média en cours d'envoi)
+        self.is_pinned = lambda path: False
+        # Cache des médias : ses fichiers sont supprimés par lui, pour que son
+        # index et son budget restent à jour
+        self.cache = None
         os.makedirs(download_folder, exist_ok=True)
+        self.reconcile()
+
+    def track_file(self, path: str) -> None:
+        """Enregistre un fichier écrit (ou réécrit) dans le dossier"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.untrack_file(path)
+            return
+        path = os.path.abspath(path)
+        previous = self._files.get(path)
+        if previous:
+            self.total_bytes -= previous[1]
+        self._files[path] = (stat.st_mtime, stat.st_size)
+        self.total_bytes += stat.st_size
+        heapq.heappush(self._by_age, (stat.st_mtime, path))
+
+    def untrack_file(self, path: str) -> None:
+        """Retire un fichier supprimé de la comptabilité"""
+        previous = self._files.pop(os.path.abspath(path), None)
+        if previous:
+            self.total_bytes -= previous[1]
+
+    def _pop_oldest(self, skipped: List[tuple]) -> Optional[tuple]:
+        """Dépile le plus ancien fichier suivi (les fichiers protégés vont dans skipped)"""
+        while self._by_age:
+            mtime, path = heapq.heappop(self._by_age)
+            current = self._files.get(path)
+            if not current or current[0] != mtime:
+                continue  # Entrée périmée
+            if self.is_pinned(path):
+                skipped.append((mtime, path))
+                continue
+            return mtime, path
+        return None
+
+    def _remove(self, path: str) -> None:
+        if self.cache is not None and self.cache.owns(path):
+            self.cache.discard(path)
+            return
+        try:
+            os.remove(path)
+            logger.info(f"Fichier supprimé: {os.path.basename(path)}")
+        except FileNotFoundError:
+            pass
+        self.untrack_file(path)
 
     async def cleanup_old_files(self, max_age_hours: int = 24):
         """Nettoie les fichiers plus vieux que max_age_hours"""
         try:
-            current_time = time.time()
-            for filename in os.listdir(self.download_folder):
-                file_path = os.path.join(self.download_folder, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    if file_age > (max_age_hours * 3600):
-                        os.remove(file_path)
-                        logger.info(f"Fichier supprimé: {filename}")
+            cutoff = time.time() - max_age_hours * 3600
+            skipped = []
+            while True:
+                oldest = self._pop_oldest(skipped)
+                if oldest is None:
+                    break
+                if oldest[0] > cutoff:
+                    heapq.heappush(self._by_age, oldest)
+                    break
+                self._remove(oldest[1])
+            for entry in skipped:
+                heapq.heappush(self._by_age, entry)
         except Exception as e:
             logger.error(f"Erreur lors du nettoyage des fichiers: {e}")
 
+    def ensure_space(self, needed_bytes: int) -> bool:
+        """
+        Libère de la place en supprimant les fichiers les plus anciens
+
+        Returns:
+            bool: True si needed_bytes tiennent dans le quota
+        """
+        skipped = []
+        while self.total_bytes + needed_bytes > self.max_storage_bytes:
+            oldest = self._pop_oldest(skipped)
+            if oldest is None:
+                break
+            self._remove(oldest[1])
+        for entry in skipped:
+            heapq.heappush(self._by_age, entry)
+        return self.total_bytes + needed_bytes <= self.max_storage_bytes
+
     def check_storage_usage(self) -> bool:
         """Vérifie si l'utilisation du stockage est dans les limites"""
+        return self.total_bytes <= self.max_storage_bytes
+
+    def reconcile(self) -> None:
+        """Reconstruit l'index à partir du disque (écritures hors comptabilité)"""
         try:
-            total_size = 0
+            files = {}
             for dirpath, _, filenames in os.walk(self.download_folder):
                 for f in filenames:
-                    fp = os.path.join(dirpath, f)
-                    total_size += os.path.getsize(fp)
-            return total_size <= self.max_storage_bytes
+                    fp = os.path.abspath(os.path.join(dirpath, f))
+                    try:
+                        stat = os.stat(fp)
+                    except OSError:
+                        continue
+                    files[fp] = (stat.st_mtime, stat.st_size)
+            total = sum(size for _, size in files.values())
+            if total != self.total_bytes and self._files:
+                logger.info(f"Stockage resynchronisé: {self.total_bytes} -> {total} octets")
+            self._files = files
+            self.total_bytes = total
+            self._by_age = [(mtime, path) for path, (mtime, _) in files.items()]
+            heapq.heapify(self._by_age)
         except Exception as e:
             logger.error(f"Erreur lors de la vérification du stockage: {e}")
-            return False
+
+    async def sweep(self, max_age_hours: int = 24):
+        """Tâche périodique : resynchronisation, nettoyage et respect du quota"""
+        self.reconcile()
+        await self.cleanup_old_files(max_age_hours)
+        if not self.ensure_space(0):
+            logger.warning(
+                f"Quota de stockage dépassé: {self.total_bytes} / {self.max_storage_bytes} octets"
+            )
 
 # Initialisation du gestionnaire de ressources
 resource_manager = ResourceManager(config.DOWNLOAD_FOLDER)
 
+# Cache des médias téléchargés, partagé par tous les envois
+media_cache = MediaCache(
+    os.path.join(config.DOWNLOAD_FOLDER, 'cache'), config.MEDIA_CACHE_SIZE, listener=resource_manager
+)
+resource_manager.is_pinned = media_cache.is_in_use
+resource_manager.cache = media_cache
+
 class InputValidator:
     @staticmethod
     def validate_url(url: str) -> bool:
@@ -2957,124 +3500,101 @@ async def remove_url_buttons(update, context):
         await query.answer("Erreur lors de la suppression des boutons URL")
         return WAITING_PUBLICATION_CONTENT
 
+async def _large_file_placeholder(context, post):
+    """Texte affiché à la place de l'aperçu d'un fichier trop volumineux (None sinon)"""
+    if post["type"] not in ["video", "document"]:
+        return None
+    file_size = await _get_post_file_size(context, post)
+    # Taille inconnue : par sécurité, pas d'aperçu
+    if file_size is not None and file_size <= config.BOT_MAX_MEDIA_SIZE:
+        return None
+    file_type_text = "vidéo" if post["type"] == "video" else "document"
+    preview_text = f"📁 {file_type_text.capitalize()} (fichier volumineux)\n"
+    if post.get("caption"):
+        preview_text += f"📝 Légende: {post['caption']}\n"
+    preview_text += "\n⚠️ Aperçu non disponible (fichier > 50 Mo)\n✅ Le fichier sera envoyé via userbot lors de la publication"
+    return preview_text
+
+
 async def send_preview_file(update, context, post_index):
-    """Envoie un aperçu du fichier modifié"""
+    """Programme la mise à jour de l'aperçu du fichier modifié (modifications rapprochées fusionnées)"""
     try:
         if 'posts' not in context.user_data or post_index >= len(context.user_data['posts']):
             return
-        
-        post = context.user_data['posts'][post_index]
-        
-        # Supprimer l'ancien aperçu s'il existe
-        preview_info = context.user_data.get('preview_messages', {}).get(post_index)
-        if preview_info:
-            try:
-                await context.bot.delete_message(
-                    chat_id=preview_info['chat_id'],
-                    message_id=preview_info['message_id']
-                )
-            except Exception:
-                pass
-        
-        # Créer les boutons d'action
-        keyboard = [
-            [InlineKeyboardButton("✨ Ajouter des réactions", callback_data=f"add_reactions_{post_index}")],
-            [InlineKeyboardButton("🔗 Ajouter un bouton URL", callback_data=f"add_url_button_{post_index}")],
-        ]
 
-        # Ajouter les boutons de thumbnail selon le type
-        if post['type'] in ['photo', 'video', 'document']:
-            keyboard.append([
-                InlineKeyboardButton("📎 Upload Thumbnail", callback_data=f"upload_thumbnail_{post_index}"),
-                InlineKeyboardButton("🖼️✏️ Set Thumbnail + Rename", callback_data=f"set_thumbnail_rename_{post_index}")
-            ])
-            keyboard.append([InlineKeyboardButton("✏️ Rename", callback_data=f"rename_post_{post_index}")])
-        else:
-            keyboard.append([InlineKeyboardButton("✏️ Renommer", callback_data=f"rename_post_{post_index}")])
+        async def build():
+            post = context.user_data['posts'][post_index]
 
-        keyboard.append([InlineKeyboardButton("❌ Supprimer", callback_data=f"delete_post_{post_index}")])
-        keyboard.append([InlineKeyboardButton("✏️ Edit File", callback_data=f"edit_file_{post_index}")])
-        
-        # Envoyer le nouvel aperçu
-        sent_message = None
-        
-        # Vérifier si le fichier est trop volumineux pour l'aperçu
-        file_too_large = False
-        if post["type"] in ["video", "document"]:
-            try:
-                file_obj = await context.bot.get_file(post["content"])
-                if file_obj.file_size > 50 * 1024 * 1024:  # 50 Mo
-                    file_too_large = True
-            except Exception:
-                file_too_large = True  # Par sécurité
-        
-        if file_too_large:
-            # Pour les gros fichiers, envoyer un message texte au lieu de l'aperçu
-            file_type_text = "vidéo" if post["type"] == "video" else "document"
-            preview_text = f"📁 {file_type_text.capitalize()} (fichier volumineux)\n"
-            if post.get("caption"):
-                preview_text += f"📝 Légende: {post['caption']}\n"
-            preview_text += "\n⚠️ Aperçu non disponible (fichier > 50 Mo)\n✅ Le fichier sera envoyé via userbot lors de la publication"
-            
-            sent_message = await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=preview_text,
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        else:
-            # Pour les fichiers normaux, envoyer l'aperçu habituel
-            if post["type"] == "photo":
-                sent_message = await context.bot.send_photo(
-                    chat_id=update.effective_chat.id,
-                    photo=post["content"],
-                    caption=post.get("caption"),
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
-            elif post["type"] == "video":
-                # Inclure le thumbnail s'il existe
-                kwargs = {
-                    'chat_id': update.effective_chat.id,
-                    'video': post["content"],
-                    'caption': post.get("caption"),
-                    'reply_markup': InlineKeyboardMarkup(keyboard)
-                }
-                if post.get('thumbnail'):
-                    kwargs['thumbnail'] = post['thumbnail']
-                sent_message = await context.bot.send_video(**kwargs)
-            elif post["type"] == "document":
-                # Inclure le thumbnail s'il existe
-                kwargs = {
-                    'chat_id': update.effective_chat.id,
-                    'document': post["content"],
-                    'caption': post.get("caption"),
-                    'reply_markup': InlineKeyboardMarkup(keyboard)
-                }
-                if post.get('thumbnail'):
-                    kwargs['thumbnail'] = post['thumbnail']
-                sent_message = await context.bot.send_document(**kwargs)
-            elif post["type"] == "text":
-                sent_message = await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=post["content"],
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
-        
-        # Sauvegarder les informations du nouveau message d'aperçu
-        if sent_message:
-            if 'preview_messages' not in context.user_data:
-                context.user_data['preview_messages'] = {}
-            context.user_data['preview_messages'][post_index] = {
-                'message_id': sent_message.message_id,
-                'chat_id': update.effective_chat.id
-            }
+            # Créer les boutons d'action
+            keyboard = [
+                [InlineKeyboardButton("✨ Ajouter des réactions", callback_data=f"add_reactions_{post_index}")],
+                [InlineKeyboardButton("🔗 Ajouter un bouton URL", callback_data=f"add_url_button_{post_index}")],
+            ]
+
+            # Ajouter les boutons de thumbnail selon le type
+            if post['type'] in ['photo', 'video', 'document']:
+                keyboard.append([
+                    InlineKeyboardButton("📎 Upload Thumbnail", callback_data=f"upload_thumbnail_{post_index}"),
+                    InlineKeyboardButton("🖼️✏️ Set Thumbnail + Rename", callback_data=f"set_thumbnail_rename_{post_index}")
+                ])
+                keyboard.append([InlineKeyboardButton("✏️ Rename", callback_data=f"rename_post_{post_index}")])
+            else:
+                keyboard.append([InlineKeyboardButton("✏️ Renommer", callback_data=f"rename_post_{post_index}")])
+
+            keyboard.append([InlineKeyboardButton("❌ Supprimer", callback_data=f"delete_post_{post_index}")])
+            keyboard.append([InlineKeyboardButton("✏️ Edit File", callback_data=f"edit_file_{post_index}")])
+            return InlineKeyboardMarkup(keyboard), await _large_file_placeholder(context, post)
+
+        get_preview_refresher().schedule(context, update.effective_chat.id, post_index, build)
     
     except Exception as e:
         logger.error(f"Erreur dans send_preview_file: {e}")
 
+# -----------------------------------------------------------------------------
+# ROUTES DES CALLBACKS (les routes plus longues sont déclarées avec leur
+# fonction, voir _cb_*)
+# -----------------------------------------------------------------------------
+callback_router.exact("settings", settings)
+callback_router.exact("custom_settings", handle_custom_settings)
+callback_router.exact("create_publication", create_publication)
+callback_router.exact("planifier_post", planifier_post)
+callback_router.exact("main_menu", start)
+callback_router.exact("timezone", handle_timezone)
+callback_router.prefix("select_channel_", handle_channel_selection)
+callback_router.prefix(callback_codec.prefix("select_channel") + ":", handle_channel_selection)
+callback_router.prefix(callback_codec.prefix("select_channel") + "!", handle_channel_selection)
+callback_router.prefix("remove_reactions_", remove_reactions)
+callback_router.prefix("remove_url_buttons_", remove_url_buttons)
+callback_router.exact("fanout_menu", handle_fanout_menu)
+callback_router.prefix("fanout_toggle_", handle_fanout_menu)
+callback_router.prefix(callback_codec.prefix("fanout_toggle") + ":", handle_fanout_menu)
+callback_router.prefix(callback_codec.prefix("fanout_toggle") + "!", handle_fanout_menu)
+callback_router.prefix("custom_channel_", handle_custom_channel)
+callback_router.exact("manage_channels", manage_channels)
+callback_router.prefix(callback_codec.prefix("delete_channel") + ":", handle_delete_channel)
+callback_router.prefix(callback_codec.prefix("delete_channel") + "!", handle_delete_channel)
+callback_router.exact("add_thumbnail", handle_add_thumbnail)
+callback_router.prefix("custom_select_channel_", handle_custom_select_channel)
+callback_router.exact("thumbnail_menu", handle_thumbnail_functions)
+callback_router.exact("view_thumbnail", handle_view_thumbnail)
+callback_router.exact("delete_thumbnail", handle_delete_thumbnail)
+callback_router.prefix("upload_thumbnail_", handle_add_thumbnail_to_post)
+callback_router.prefix("set_thumbnail_rename_", handle_set_thumbnail_and_rename)
+callback_router.exact("edit_username", handle_add_username)
+
+
 def main():
     try:
         # Configuration de l'application
-        application = Application.builder().token(config.BOT_TOKEN).build()
+        application = (
+            Application.builder()
+            .token(config.BOT_TOKEN)
+            .concurrent_updates(PerUserUpdateProcessor(config.MAX_CONCURRENT_UPDATES))
+            .persistence(SQLitePersistence(db_manager, config.PERSISTENCE_INTERVAL))
+            .post_init(start_userbot_pool)
+            .post_shutdown(stop_userbot_pool)
+            .build()
+        )
 
         # Ajout de logs pour le démarrage
         logger.info("Initialisation de l'application...")
@@ -3083,10 +3603,14 @@ def main():
         application.bot_data['reaction_counts'] = {}
 
         # Initialisation du scheduler
-        application.scheduler_manager = SchedulerManager(db_manager)
+        application.bot_data['db_manager'] = db_manager
+        application.scheduler_manager = scheduler_manager
         application.scheduler_manager.start()
         logger.info("Scheduler démarré avec succès")
 
+        # Balayage périodique du dossier de téléchargement
+        application.scheduler_manager.schedule_recurring_task('storage_sweep', CLEANUP_INTERVAL, resource_manager.sweep)
+
         # Log des états de conversation pour débogage
         logger.info(f"Définition des états de conversation:")
         logger.info(f"MAIN_MENU = {MAIN_MENU}")
@@ -3095,12 +3619,14 @@ def main():
         logger.info(f"WAITING_PUBLICATION_CONTENT = {WAITING_PUBLICATION_CONTENT}")
         logger.info(f"WAITING_REACTION_INPUT = {WAITING_REACTION_INPUT}")
         logger.info(f"WAITING_URL_INPUT = {WAITING_URL_INPUT}")
+        logger.info(f"Routes de callback enregistrées: {len(callback_router)}")
+        for prefix, route in callback_router.overlaps():
+            logger.info(f"Route de callback '{route}' prioritaire sur le préfixe '{prefix}'")
 
-        # Initialisation du userbot Telethon
-        userbot = TelegramClient(config.SESSION_NAME, config.API_ID, config.API_HASH)
-        userbot.start()
-        logger.info("Client Telethon démarré avec succès")
-        application.bot_data['userbot'] = userbot
+        # Pool de sessions userbot Telethon, connectées en arrière-plan au démarrage
+        application.bot_data['userbot_pool'] = UserbotPool.from_sessions(
+            config.USERBOT_SESSIONS, config.API_ID, config.API_HASH
+        )
 
         # Define additional global handlers that work in all states
         global_handlers = [
@@ -3179,16 +3705,21 @@ def main():
             ],
             per_message=False,
             name="main_conversation",
-            persistent=False,
+            persistent=True,
             allow_reentry=True,
         )
 
         logger.info("ConversationHandler configuré avec états: %s",
                     ", ".join(str(state) for state in conv_handler.states.keys()))
 
+        application.add_handler(CallbackQueryHandler(callback_deduplicator.guard), group=-1)  # Doublons écartés
         application.add_handler(conv_handler, group=0)  # Priorité maximale
-        application.add_handler(CallbackQueryHandler(handle_reaction_click, pattern=r'^react_'), group=1)
+        application.add_handler(CallbackQueryHandler(
+            handle_reaction_click, pattern=rf"^(react_|{re.escape(callback_codec.prefix('react'))}[:!])"
+        ), group=1)
         application.add_handler(MessageHandler(reply_keyboard_filter, handle_reply_keyboard), group=1)
+        # Fin du traitement d'un callback : la fenêtre anti-doublon commence
+        application.add_handler(CallbackQueryHandler(callback_deduplicator.release), group=2)
         application.add_handler(CommandHandler("diagnostic", diagnostic))
         application.add_handler(CommandHandler("db_diagnostic", db_diagnostic))
         application.add_handler(CommandHandler("debug", debug_state))
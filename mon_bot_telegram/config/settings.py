@@ -125,6 +125,10 @@ MAX_BUTTONS_TOTAL = 8
 CLEANUP_INTERVAL = 3600  # 1 heure
 BACKUP_INTERVAL = 86400  # 24 heures
 
+# Lissage des envois planifiés aux heures rondes
+SCHEDULE_SMOOTHING_WINDOW = int(os.getenv("SCHEDULE_SMOOTHING_WINDOW", "30"))  # secondes
+SCHEDULE_MAX_SENDS_PER_SECOND = int(os.getenv("SCHEDULE_MAX_SENDS_PER_SECOND", "5"))
+
 # Classe pour gérer les paramètres
 class Settings:
     def __init__(self):
@@ -142,6 +146,8 @@ class Settings:
         self.max_buttons_total = MAX_BUTTONS_TOTAL
         self.cleanup_interval = CLEANUP_INTERVAL
         self.backup_interval = BACKUP_INTERVAL
+        self.schedule_smoothing_window = SCHEDULE_SMOOTHING_WINDOW
+        self.schedule_max_sends_per_second = SCHEDULE_MAX_SENDS_PER_SECOND
 
 # Instance unique des paramètres
 settings = Settings()
\ No newline at end of file
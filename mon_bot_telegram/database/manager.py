@@ -4,6 +4,7 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from config.settings import settings
+from mon_bot_telegram.utils.media_metadata import METADATA_COLUMNS, metadata_to_columns
 import os
 import json
 
@@ -87,6 +88,26 @@ class DatabaseManager:
                 )
             ''')
 
+            # Ajouter les colonnes de métadonnées des médias si elles n'existent pas
+            for column, column_type in (
+                ("file_size", "INTEGER"),
+                ("mime_type", "TEXT"),
+                ("duration", "INTEGER"),
+                ("width", "INTEGER"),
+                ("height", "INTEGER"),
+                ("file_unique_id", "TEXT"),
+            ):
+                try:
+                    cursor.execute(f"ALTER TABLE posts ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError:
+                    pass  # La colonne existe déjà
+
+            # Index pour les requêtes du planificateur (posts en attente par date)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_posts_status_scheduled
+                ON posts (status, scheduled_time)
+            ''')
+
             # Table des fuseaux horaires des utilisateurs
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS user_timezones (
@@ -107,6 +128,36 @@ class DatabaseManager:
                 )
             ''')
 
+            # Points de reprise des uploads du userbot (parts acquittées par fichier)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS upload_checkpoints (
+                    file_key TEXT PRIMARY KEY,
+                    upload_file_id INTEGER NOT NULL,
+                    part_size INTEGER NOT NULL,
+                    total_parts INTEGER NOT NULL,
+                    acked_parts TEXT NOT NULL DEFAULT '',
+                    updated_at REAL NOT NULL
+                )
+            ''')
+
+            # Persistance des données de conversation (user_data, chat_data) et des états
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS persisted_data (
+                    kind TEXT NOT NULL,
+                    entity_id INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (kind, entity_id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS persisted_conversations (
+                    name TEXT NOT NULL,
+                    conversation_key TEXT NOT NULL,
+                    state BLOB NOT NULL,
+                    PRIMARY KEY (name, conversation_key)
+                )
+            ''')
+
             self.connection.commit()
             return True
 
@@ -323,6 +374,23 @@ class DatabaseManager:
             logger.error(f"Erreur lors de la mise à jour du tag: {e}")
             return False
 
+    def delete_channel(self, username: str, user_id: int) -> bool:
+        """Supprime un canal de l'utilisateur"""
+        try:
+            cursor = self.connection.cursor()
+            # Nettoyer le username (enlever @ si présent)
+            clean_username = username.lstrip('@')
+            cursor.execute(
+                "DELETE FROM channels WHERE username IN (?, ?) AND user_id = ?",
+                (clean_username, f"@{clean_username}", user_id)
+            )
+            deleted = cursor.rowcount > 0
+            self.connection.commit()
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la suppression du canal: {e}")
+            return False
+
     def get_channel_tag(self, username: str, user_id: int) -> Optional[str]:
         """Récupère le tag d'un canal"""
         try:
@@ -342,17 +410,21 @@ class DatabaseManager:
 
     def add_post(self, channel_id: int, post_type: str, content: str, 
                 caption: Optional[str] = None, buttons: Optional[str] = None,
-                reactions: Optional[str] = None, scheduled_time: Optional[str] = None) -> int:
-        """Ajoute une nouvelle publication"""
+                reactions: Optional[str] = None, scheduled_time: Optional[str] = None,
+                metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Ajoute une nouvelle publication (avec les métadonnées du média si fournies)"""
         try:
+            columns = metadata_to_columns(metadata)
             cursor = self.connection.cursor()
             cursor.execute(
-                """
+                f"""
                 INSERT INTO posts 
-                (channel_id, post_type, content, caption, buttons, reactions, scheduled_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                (channel_id, post_type, content, caption, buttons, reactions, scheduled_time,
+                 {", ".join(columns)})
+                VALUES (?, ?, ?, ?, ?, ?, ?, {", ".join("?" for _ in columns)})
                 """,
-                (channel_id, post_type, content, caption, buttons, reactions, scheduled_time)
+                (channel_id, post_type, content, caption, buttons, reactions, scheduled_time,
+                 *columns.values())
             )
             self.connection.commit()
             return cursor.lastrowid
@@ -377,7 +449,8 @@ class DatabaseManager:
                     "reactions": row[6],
                     "scheduled_time": row[7],
                     "status": row[8],
-                    "created_at": row[9]
+                    "created_at": row[9],
+                    **self._post_metadata(cursor, row)
                 }
             return None
         except sqlite3.Error as e:
@@ -408,7 +481,7 @@ class DatabaseManager:
                 FROM posts p 
                 JOIN channels c ON p.channel_id = c.id 
                 WHERE p.status = 'pending'
-                ORDER BY p.scheduled_time
+                ORDER BY p.scheduled_time, p.id
                 """
             )
             return [
@@ -423,7 +496,8 @@ class DatabaseManager:
                     "scheduled_time": row[7],
                     "status": row[8],
                     "created_at": row[9],
-                    "channel_username": row[10]
+                    "channel_username": row[-1],
+                    **self._post_metadata(cursor, row)
                 }
                 for row in cursor.fetchall()
             ]
@@ -431,6 +505,16 @@ class DatabaseManager:
             logger.error(f"Erreur lors de la récupération des publications en attente: {e}")
             raise DatabaseError(f"Erreur lors de la récupération des publications en attente: {e}")
 
+    @staticmethod
+    def _post_metadata(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+        """Extrait les colonnes de métadonnées d'une ligne de la table posts"""
+        names = [description[0] for description in cursor.description]
+        metadata = {}
+        for column in METADATA_COLUMNS:
+            if column in names:
+                metadata[column] = row[names.index(column)]
+        return metadata
+
     def set_user_timezone(self, user_id: int, timezone: str) -> bool:
         """Définit le fuseau horaire d'un utilisateur"""
         try:
@@ -502,7 +586,8 @@ class DatabaseManager:
                     "scheduled_time": row[7],
                     "status": row[8],
                     "created_at": row[9],
-                    "channel_username": row[10]
+                    "channel_username": row[-1],
+                    **self._post_metadata(cursor, row)
                 }
                 for row in cursor.fetchall()
             ]
@@ -566,4 +651,113 @@ class DatabaseManager:
             return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Erreur lors de la suppression du thumbnail: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def get_upload_checkpoint(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """Récupère le point de reprise d'un upload"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''
+                SELECT upload_file_id, part_size, total_parts, acked_parts, updated_at
+                FROM upload_checkpoints WHERE file_key = ?
+            ''', (file_key,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                'upload_file_id': row[0],
+                'part_size': row[1],
+                'total_parts': row[2],
+                'acked_parts': row[3],
+                'updated_at': row[4]
+            }
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la récupération du point de reprise: {e}")
+            return None
+
+    def save_upload_checkpoint(self, file_key: str, upload_file_id: int, part_size: int,
+                               total_parts: int, acked_parts: str, updated_at: float) -> bool:
+        """Enregistre les parts acquittées d'un upload"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO upload_checkpoints
+                (file_key, upload_file_id, part_size, total_parts, acked_parts, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (file_key, upload_file_id, part_size, total_parts, acked_parts, updated_at))
+            self.connection.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de l'enregistrement du point de reprise: {e}")
+            return False
+
+    def delete_upload_checkpoint(self, file_key: str) -> bool:
+        """Supprime le point de reprise d'un upload terminé ou expiré"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("DELETE FROM upload_checkpoints WHERE file_key = ?", (file_key,))
+            self.connection.commit()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la suppression du point de reprise: {e}")
+            return False
+
+    def load_persisted_data(self, kind: str) -> Dict[int, bytes]:
+        """Récupère les données persistées d'un type ('user' ou 'chat') par identifiant"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT entity_id, data FROM persisted_data WHERE kind = ?", (kind,))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors du chargement des données persistées: {e}")
+            return {}
+
+    def load_persisted_conversations(self, name: str) -> Dict[str, bytes]:
+        """Récupère les états persistés d'un ConversationHandler par clé"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT conversation_key, state FROM persisted_conversations WHERE name = ?", (name,)
+            )
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors du chargement des conversations persistées: {e}")
+            return {}
+
+    def write_persisted_batch(self, data_rows: List[tuple], conversation_rows: List[tuple]) -> bool:
+        """
+        Écrit un lot de données persistées en une seule transaction
+
+        Args:
+            data_rows: (kind, entity_id, data) ; data None supprime la ligne
+            conversation_rows: (name, conversation_key, state) ; state None supprime la ligne
+        """
+        try:
+            with self.connection:
+                cursor = self.connection.cursor()
+                for kind, entity_id, data in data_rows:
+                    if data is None:
+                        cursor.execute(
+                            "DELETE FROM persisted_data WHERE kind = ? AND entity_id = ?", (kind, entity_id)
+                        )
+                    else:
+                        cursor.execute(
+                            "INSERT OR REPLACE INTO persisted_data (kind, entity_id, data) VALUES (?, ?, ?)",
+                            (kind, entity_id, data)
+                        )
+                for name, key, state in conversation_rows:
+                    if state is None:
+                        cursor.execute(
+                            "DELETE FROM persisted_conversations WHERE name = ? AND conversation_key = ?",
+                            (name, key)
+                        )
+                    else:
+                        cursor.execute(
+                            "INSERT OR REPLACE INTO persisted_conversations (name, conversation_key, state) "
+                            "VALUES (?, ?, ?)",
+                            (name, key, state)
+                        )
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de l'écriture des données persistées: {e}")
+            return False
@@ -0,0 +1,212 @@
+"""
+Persistance des conversations et des brouillons dans la base du bot.
+
+Sans persistance, un redémarrage effaçait le brouillon en cours de chaque
+utilisateur (jusqu'à 24 fichiers) et sa position dans la conversation.
+SQLitePersistence enregistre user_data, chat_data et les états des
+ConversationHandler persistants dans les tables persisted_data et
+persisted_conversations :
+
+- seules les entrées réellement modifiées sont écrites : l'empreinte de la
+  dernière version enregistrée est comparée à la nouvelle ;
+- l'Application ne transmet les données qu'à chaque intervalle de mise à
+  jour ; toutes les écritures d'un passage sont regroupées en une seule
+  transaction ;
+- chaque utilisateur est sérialisé séparément (pickle binaire), sans
+  réécrire l'ensemble des données comme un fichier pickle unique ;
+- une valeur non sérialisable n'empêche pas d'enregistrer le reste : les
+  clés concernées sont écartées (et journalisées), les autres sont écrites.
+
+bot_data n'est pas persisté : il contient le pool userbot (clients
+Telethon), ni copiable ni sérialisable.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import pickle
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger('TelegramBot')
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+class SQLitePersistence(BasePersistence):
+    """Persistance incrémentale de user_data, chat_data et des conversations"""
+
+    def __init__(self, db_manager, update_interval: float = 30):
+        """
+        Args:
+            db_manager: DatabaseManager du bot
+            update_interval: Intervalle entre deux passages de persistance (secondes)
+        """
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.db_manager = db_manager
+        # Empreinte de la dernière version écrite : (type, identifiant) -> digest
+        self._digests: Dict[Tuple[str, Any], bytes] = {}
+        # Écritures en attente du prochain lot
+        self._pending_data: Dict[Tuple[str, int], Optional[bytes]] = {}
+        self._pending_conversations: Dict[Tuple[str, str], Optional[bytes]] = {}
+        self._write_scheduled = False
+        # Clés écartées à la dernière sérialisation : (type, identifiant) -> clés
+        self._dropped_keys: Dict[Tuple[str, Any], Tuple[str, ...]] = {}
+        self.writes = 0
+        self.skipped = 0
+
+    # ----- Chargement -----
+
+    def _load(self, kind: str) -> Dict[int, Any]:
+        loaded = {}
+        for entity_id, blob in self.db_manager.load_persisted_data(kind).items():
+            try:
+                loaded[entity_id] = pickle.loads(blob)
+                self._digests[(kind, entity_id)] = _digest(blob)
+            except Exception as e:
+                logger.error(f"Données persistées illisibles ({kind} {entity_id}): {e}")
+        return loaded
+
+    async def get_user_data(self) -> Dict[int, Any]:
+        return self._load('user')
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return self._load('chat')
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[Any, ...], object]:
+        conversations = {}
+        for key, blob in self.db_manager.load_persisted_conversations(name).items():
+            try:
+                conversations[tuple(json.loads(key))] = pickle.loads(blob)
+                self._digests[('conversation', name, key)] = _digest(blob)
+            except Exception as e:
+                logger.error(f"État de conversation persisté illisible ({name} {key}): {e}")
+        return conversations
+
+    # ----- Mises à jour (marquées puis écrites par lot) -----
+
+    def _mark(self, pending: Dict, pending_key, digest_key, value: Any, delete: bool = False) -> None:
+        if delete:
+            self._dropped_keys.pop(digest_key, None)
+            if self._digests.pop(digest_key, None) is None and pending_key not in pending:
+                return
+            pending[pending_key] = None
+        else:
+            blob = self._serialize(digest_key, value)
+            if blob is None:
+                return
+            digest = _digest(blob)
+            if self._digests.get(digest_key) == digest:
+                self.skipped += 1
+                return
+            self._digests[digest_key] = digest
+            pending[pending_key] = blob
+        self._schedule_write()
+
+    def _serialize(self, digest_key, value: Any) -> Optional[bytes]:
+        """
+        Sérialise une entrée ; les clés non sérialisables d'un dictionnaire sont écartées
+
+        Returns:
+            Optional[bytes]: None si rien ne peut être enregistré
+        """
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._dropped_keys.pop(digest_key, None)
+            return blob
+        except Exception as e:
+            if not isinstance(value, dict):
+                logger.error(f"Données non sérialisables, non enregistrées ({digest_key}): {e}")
+                return None
+
+        kept, dropped = {}, []
+        for key, item in value.items():
+            try:
+                pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+                kept[key] = item
+            except Exception as e:
+                dropped.append((str(key), e))
+        dropped_keys = tuple(sorted(key for key, _ in dropped))
+        # Une seule erreur par changement des clés écartées, pas à chaque passage
+        if self._dropped_keys.get(digest_key) != dropped_keys:
+            self._dropped_keys[digest_key] = dropped_keys
+            details = "; ".join(f"{key}: {error}" for key, error in dropped)
+            logger.error(f"Clés non sérialisables écartées ({digest_key}): {details}")
+        try:
+            return pickle.dumps(kept, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.error(f"Données non sérialisables, non enregistrées ({digest_key}): {e}")
+            return None
+
+    def _schedule_write(self) -> None:
+        # Les mises à jour d'un même passage sont lancées ensemble : l'écriture
+        # programmée après elles les regroupe en une transaction
+        if self._write_scheduled:
+            return
+        self._write_scheduled = True
+        asyncio.get_running_loop().call_soon(self._write_pending)
+
+    def _write_pending(self) -> None:
+        self._write_scheduled = False
+        if not self._pending_data and not self._pending_conversations:
+            return
+        data_rows = [(kind, entity_id, blob) for (kind, entity_id), blob in self._pending_data.items()]
+        conversation_rows = [(name, key, blob) for (name, key), blob in self._pending_conversations.items()]
+        self._pending_data = {}
+        self._pending_conversations = {}
+        if self.db_manager.write_persisted_batch(data_rows, conversation_rows):
+            self.writes += len(data_rows) + len(conversation_rows)
+            return
+        # Échec : les empreintes sont oubliées pour que le prochain passage réécrive tout
+        for kind, entity_id, _ in data_rows:
+            self._digests.pop((kind, entity_id), None)
+        for name, key, _ in conversation_rows:
+            self._digests.pop(('conversation', name, key), None)
+
+    async def update_user_data(self, user_id: int, data: Any) -> None:
+        self._mark(self._pending_data, ('user', user_id), ('user', user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        self._mark(self._pending_data, ('chat', chat_id), ('chat', chat_id), data)
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: Tuple[Any, ...], new_state: Optional[object]) -> None:
+        conversation_key = json.dumps(list(key), separators=(',', ':'))
+        self._mark(self._pending_conversations, (name, conversation_key), ('conversation', name, conversation_key),
+                   new_state, delete=new_state is None)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._mark(self._pending_data, ('user', user_id), ('user', user_id), None, delete=True)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._mark(self._pending_data, ('chat', chat_id), ('chat', chat_id), None, delete=True)
+
+    async def refresh_user_data(self, user_id: int, user_data: Any) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Écrit immédiatement les mises à jour en attente (arrêt du bot)"""
+        self._write_pending()
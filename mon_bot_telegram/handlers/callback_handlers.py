@@ -15,6 +15,8 @@ from utils.validators import InputValidator
 from utils.constants import MAIN_MENU, SCHEDULE_SELECT_CHANNEL, SCHEDULE_SEND
 from utils.error_handler import handle_error
 from utils.scheduler import SchedulerManager
+from utils.media_metadata import metadata_to_columns
+from utils.callback_router import CallbackRouter
 # Nous n'importons plus scheduler_manager directement
 import sys
 
@@ -49,20 +51,8 @@ class CallbackError(Exception):
     pass
 
 
-# Mapping des actions vers les gestionnaires
-CALLBACK_HANDLERS: Dict[str, HandlerType] = {
-    "main_menu": "start",
-    "create_publication": "create_publication",
-    "planifier_post": "planifier_post",
-    "modifier_heure": "handle_edit_time",
-    "envoyer_maintenant": "handle_send_now",
-    "annuler_publication": "handle_cancel_post",
-    "retour": "planifier_post",
-    "preview": "handle_preview",
-    "settings": "handle_settings",
-    "timezone": "handle_timezone_setup",
-    "schedule_send": "schedule_send"
-}
+# Routes des callbacks (enregistrées en fin de module)
+callback_router = CallbackRouter()
 
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -72,76 +62,24 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     Args:
         update: L'objet Update de Telegram
         context: Le contexte de la conversation
-
-    Raises:
-        CallbackError: Si le callback est invalide ou non géré
     """
     query = update.callback_query
-    user_id = update.effective_user.id
     if not query or not query.data:
         logger.warning("Callback sans données reçu")
         return
 
     try:
-        # Récupération du callback data complet
-        callback_data = query.data
         await query.answer()
 
-        # Cas spécifiques pour les callbacks
-        if callback_data == "main_menu":
-            # Importer la fonction start du module parent
-            from bot import start
-            return await start(update, context)
-            
-        elif callback_data == "create_publication":
-            # Importer la fonction create_publication du module parent
-            from bot import create_publication
-            return await create_publication(update, context)
-            
-        elif callback_data == "planifier_post":
-            return await planifier_post(update, context)
-            
-        elif callback_data == "schedule_send":
-            # Importer la fonction schedule_send du module parent
-            return await schedule_send(update, context)
-            
-        elif callback_data == "schedule_today" or callback_data == "schedule_tomorrow":
-            # Stocker le jour sélectionné
-            context.user_data['schedule_day'] = 'today' if callback_data == "schedule_today" else 'tomorrow'
-            return await schedule_send(update, context)
-            
-        elif callback_data == "modifier_heure":
-            return await handle_edit_time(update, context)
-            
-        elif callback_data == "envoyer_maintenant":
-            return await handle_send_now(update, context)
-            
-        elif callback_data == "annuler_publication":
-            return await handle_cancel_post(update, context)
-            
-        elif callback_data == "confirm_cancel":
-            return await handle_confirm_cancel(update, context)
-            
-        elif callback_data == "retour":
-            return await planifier_post(update, context)
-            
-        elif callback_data == "settings":
-            # Création d'un menu de paramètres simple
-            keyboard = [
-                [InlineKeyboardButton("🕒 Fuseau horaire", callback_data="set_timezone")],
-                [InlineKeyboardButton("📢 Gérer les canaux", callback_data="manage_channels")],
-                [InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]
-            ]
-            await query.edit_message_text(
-                "⚙️ Paramètres\n\nChoisissez une option :",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return SETTINGS
-            
-        # Si le callback n'est pas dans la liste des cas directement gérés
-        logger.warning(f"Callback non géré directement : {callback_data}")
+        resolved = callback_router.resolve(query.data)
+        if resolved is not None:
+            route, params = resolved
+            return await route.handler(update, context, **params)
+
+        # Si le callback n'a pas de route
+        logger.warning(f"Callback non géré directement : {query.data}")
         await query.edit_message_text(
-            f"⚠️ Action {callback_data} non implémentée. Retour au menu principal.",
+            f"⚠️ Action {query.data} non implémentée. Retour au menu principal.",
             reply_markup=InlineKeyboardMarkup(
                 [[InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]]
             )
@@ -159,6 +97,38 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return MAIN_MENU
 
 
+async def _main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Importer la fonction start du module parent
+    from bot import start
+    return await start(update, context)
+
+
+async def _create_publication(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Importer la fonction create_publication du module parent
+    from bot import create_publication
+    return await create_publication(update, context)
+
+
+async def _schedule_day(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Stocker le jour sélectionné
+    context.user_data['schedule_day'] = 'today' if update.callback_query.data == "schedule_today" else 'tomorrow'
+    return await schedule_send(update, context)
+
+
+async def _settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Création d'un menu de paramètres simple
+    keyboard = [
+        [InlineKeyboardButton("🕒 Fuseau horaire", callback_data="set_timezone")],
+        [InlineKeyboardButton("📢 Gérer les canaux", callback_data="manage_channels")],
+        [InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]
+    ]
+    await update.callback_query.edit_message_text(
+        "⚙️ Paramètres\n\nChoisissez une option :",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return SETTINGS
+
+
 async def handle_edit_time(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Gère la modification de l'heure d'une publication.
@@ -600,7 +570,7 @@ async def handle_schedule_time(update: Update, context: ContextTypes.DEFAULT_TYP
             # Utilise la fonction get_user_timezone de DatabaseManager
             # Assurez-vous que cette fonction est correctement implémentée
             from database.manager import DatabaseManager
-            db = DatabaseManager(settings.db_config["path"])
+            db = DatabaseManager()
             user_timezone = db.get_user_timezone(user_id) or "UTC"
             
             local_tz = pytz.timezone(user_timezone)
@@ -687,16 +657,19 @@ async def handle_schedule_time(update: Update, context: ContextTypes.DEFAULT_TYP
                             if result:
                                 channel_id = result[0]
                         
-                        # Ajouter le post à la base de données
+                        # Ajouter le post à la base de données (avec les métadonnées du média)
+                        metadata_columns = metadata_to_columns(post.get('metadata'))
                         with sqlite3.connect(settings.db_config["path"]) as conn:
                             cursor = conn.cursor()
                             cursor.execute(
-                                """
-                                INSERT INTO posts (channel_id, type, content, caption, scheduled_time)
-                                VALUES (?, ?, ?, ?, ?)
+                                f"""
+                                INSERT INTO posts (channel_id, post_type, content, caption, scheduled_time,
+                                                   {", ".join(metadata_columns)})
+                                VALUES (?, ?, ?, ?, ?, {", ".join("?" for _ in metadata_columns)})
                                 """,
                                 (channel_id, post['type'], post['content'],
-                                 post.get('caption'), utc_date.strftime('%Y-%m-%d %H:%M:%S'))
+                                 post.get('caption'), utc_date.strftime('%Y-%m-%d %H:%M:%S'),
+                                 *metadata_columns.values())
                             )
                             post_id = cursor.lastrowid
                             conn.commit()
@@ -1117,4 +1090,18 @@ async def schedule_send(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "❌ Erreur lors de la planification.",
             reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]])
         )
-        return MAIN_MENU
\ No newline at end of file
+        return MAIN_MENU
+
+
+callback_router.exact("main_menu", _main_menu)
+callback_router.exact("create_publication", _create_publication)
+callback_router.exact("planifier_post", planifier_post)
+callback_router.exact("schedule_send", schedule_send)
+callback_router.exact("schedule_today", _schedule_day)
+callback_router.exact("schedule_tomorrow", _schedule_day)
+callback_router.exact("modifier_heure", handle_edit_time)
+callback_router.exact("envoyer_maintenant", handle_send_now)
+callback_router.exact("annuler_publication", handle_cancel_post)
+callback_router.exact("confirm_cancel", handle_confirm_cancel)
+callback_router.exact("retour", planifier_post)
+callback_router.exact("settings", _settings_menu)
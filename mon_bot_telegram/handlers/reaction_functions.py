@@ -8,6 +8,8 @@ from typing import List, Dict, Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from ..config import settings
+from ..utils.callback_codec import encode_callback
+from ..utils.preview_renderer import get_preview_refresher
 from mon_bot_telegram.conversation_states import (
     WAITING_REACTION_INPUT,
     WAITING_URL_INPUT,
@@ -18,6 +20,12 @@ from mon_bot_telegram.conversation_states import (
 
 logger = logging.getLogger(__name__)
 
+
+async def _preview_markup(reply_markup: InlineKeyboardMarkup):
+    """Clavier de l'aperçu, sans texte de remplacement (pour PreviewRefresher)"""
+    return reply_markup, None
+
+
 async def handle_reactions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Gère la sélection des réactions pour une publication"""
     query = update.callback_query
@@ -305,7 +313,7 @@ async def handle_reaction_input(update, context):
         for reaction in reactions:
             current_row.append(InlineKeyboardButton(
                 f"{reaction}",
-                callback_data=f"react_{post_index}_{reaction}"
+                callback_data=encode_callback("react", post_index, reaction)
             ))
             if len(current_row) == 4:
                 keyboard.append(current_row)
@@ -320,53 +328,9 @@ async def handle_reaction_input(update, context):
             [InlineKeyboardButton("❌ Supprimer", callback_data=f"delete_post_{post_index}")]
         ])
         reply_markup = InlineKeyboardMarkup(keyboard)
-        # Suppression de l'ancien message d'aperçu s'il existe
-        preview_info = context.user_data.get('preview_messages', {}).get(post_index)
-        if preview_info:
-            try:
-                await context.bot.delete_message(
-                    chat_id=preview_info['chat_id'],
-                    message_id=preview_info['message_id']
-                )
-            except Exception:
-                pass
-        # Envoi du nouveau message avec les réactions
-        post = context.user_data['posts'][post_index]
-        sent_message = None
-        if post["type"] == "photo":
-            sent_message = await context.bot.send_photo(
-                chat_id=update.effective_chat.id,
-                photo=post["content"],
-                caption=post.get("caption"),
-                reply_markup=reply_markup
-            )
-        elif post["type"] == "video":
-            sent_message = await context.bot.send_video(
-                chat_id=update.effective_chat.id,
-                video=post["content"],
-                caption=post.get("caption"),
-                reply_markup=reply_markup
-            )
-        elif post["type"] == "document":
-            sent_message = await context.bot.send_document(
-                chat_id=update.effective_chat.id,
-                document=post["content"],
-                caption=post.get("caption"),
-                reply_markup=reply_markup
-            )
-        elif post["type"] == "text":
-            sent_message = await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=post["content"],
-                reply_markup=reply_markup
-            )
-        if sent_message:
-            if 'preview_messages' not in context.user_data:
-                context.user_data['preview_messages'] = {}
-            context.user_data['preview_messages'][post_index] = {
-                'message_id': sent_message.message_id,
-                'chat_id': update.effective_chat.id
-            }
+        # Seul le clavier change : modification en place de l'aperçu, après les modifications rapprochées
+        get_preview_refresher().schedule(context, update.effective_chat.id, post_index,
+                                         lambda: _preview_markup(reply_markup))
         await update.message.reply_text(
             "✅ Réactions ajoutées avec succès !\nVous pouvez continuer à m'envoyer des messages."
         )
@@ -412,7 +376,7 @@ async def handle_url_input(update, context):
             for reaction in context.user_data['posts'][post_index]['reactions']:
                 current_row.append(InlineKeyboardButton(
                     f"{reaction}",
-                    callback_data=f"react_{post_index}_{reaction}"
+                    callback_data=encode_callback("react", post_index, reaction)
                 ))
                 if len(current_row) == 4:
                     keyboard.append(current_row)
@@ -428,51 +392,8 @@ async def handle_url_input(update, context):
             [InlineKeyboardButton("❌ Supprimer", callback_data=f"delete_post_{post_index}")]
         ])
         reply_markup = InlineKeyboardMarkup(keyboard)
-        preview_info = context.user_data.get('preview_messages', {}).get(post_index)
-        if preview_info:
-            try:
-                await context.bot.delete_message(
-                    chat_id=preview_info['chat_id'],
-                    message_id=preview_info['message_id']
-                )
-            except Exception:
-                pass
-        post = context.user_data['posts'][post_index]
-        sent_message = None
-        if post["type"] == "photo":
-            sent_message = await context.bot.send_photo(
-                chat_id=update.effective_chat.id,
-                photo=post["content"],
-                caption=post.get("caption"),
-                reply_markup=reply_markup
-            )
-        elif post["type"] == "video":
-            sent_message = await context.bot.send_video(
-                chat_id=update.effective_chat.id,
-                video=post["content"],
-                caption=post.get("caption"),
-                reply_markup=reply_markup
-            )
-        elif post["type"] == "document":
-            sent_message = await context.bot.send_document(
-                chat_id=update.effective_chat.id,
-                document=post["content"],
-                caption=post.get("caption"),
-                reply_markup=reply_markup
-            )
-        elif post["type"] == "text":
-            sent_message = await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=post["content"],
-                reply_markup=reply_markup
-            )
-        if sent_message:
-            if 'preview_messages' not in context.user_data:
-                context.user_data['preview_messages'] = {}
-            context.user_data['preview_messages'][post_index] = {
-                'message_id': sent_message.message_id,
-                'chat_id': update.effective_chat.id
-            }
+        get_preview_refresher().schedule(context, update.effective_chat.id, post_index,
+                                         lambda: _preview_markup(reply_markup))
         await update.message.reply_text(
             "✅ Bouton URL ajouté avec succès !\nVous pouvez continuer à m'envoyer des messages."
         )
@@ -6,7 +6,11 @@ import logging
 import asyncio
 import sqlite3
 from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import pytz
@@ -14,17 +18,39 @@ import pytz
 from mon_bot_telegram.conversation_states import (
     MAIN_MENU, SEND_OPTIONS, WAITING_PUBLICATION_CONTENT
 )
+from mon_bot_telegram.config.settings import settings as bot_settings
+from mon_bot_telegram.utils.burst_smoother import BurstSmoother
+from mon_bot_telegram.utils.clock import SystemClock, get_clock
 
 logger = logging.getLogger('UploaderBot')
 
 # Classe de gestionnaire de planification
 class SchedulerManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, clock: Optional[SystemClock] = None, smoother: Optional[BurstSmoother] = None):
+        """
+        Args:
+            db_manager: DatabaseManager du bot
+            clock: Horloge à utiliser (horloge active par défaut). Avec une
+                SimulatedClock, les tâches sont confiées à l'horloge et
+                APScheduler n'est jamais démarré.
+            smoother: Lisseur des envois planifiés au même instant
+        """
         self.scheduler = AsyncIOScheduler()
         self.db_manager = db_manager
+        self.clock = clock or get_clock()
+        self.smoother = smoother or BurstSmoother(
+            bot_settings.schedule_smoothing_window,
+            bot_settings.schedule_max_sends_per_second,
+            clock=self.clock
+        )
+        # Coroutine (post_id) qui publie un post planifié, fournie par bot.py
+        self.post_sender: Optional[Callable[[int], Awaitable[Any]]] = None
+        # Seconde d'envoi réservée par post planifié
+        self._post_slots: Dict[int, datetime] = {}
 
     def start(self):
-        self.scheduler.start()
+        if not self.clock.simulated:
+            self.scheduler.start()
 
     def stop(self):
         """Arrête le planificateur s'il est en cours d'exécution"""
@@ -35,9 +61,130 @@ class SchedulerManager:
         except Exception as e:
             logger.error(f"Erreur lors de l'arrêt du scheduler: {e}")
 
-    # Méthodes minimales pour éviter les erreurs
+    def schedule_task(self, task_id: str, run_date: datetime, func: Callable[..., Any], *args, **kwargs) -> str:
+        """
+        Planifie une tâche unique (remplace une tâche de même identifiant)
+
+        Une tâche dont la date est passée (redémarrage du bot) est exécutée
+        dès que possible au lieu d'être abandonnée.
+
+        Args:
+            task_id: Identifiant de la tâche
+            run_date: Date d'exécution (naïve = UTC)
+            func: Fonction ou coroutine à exécuter
+        """
+        if run_date.tzinfo is None:
+            run_date = pytz.UTC.localize(run_date)
+        if self.clock.simulated:
+            return self.clock.schedule(run_date, func, *args, job_id=task_id, **kwargs)
+        self.scheduler.add_job(
+            func,
+            trigger=DateTrigger(run_date=run_date),
+            id=task_id,
+            args=args,
+            kwargs=kwargs,
+            replace_existing=True,
+            misfire_grace_time=None
+        )
+        return task_id
+
+    def schedule_recurring_task(self, task_id: str, interval_seconds: float, func: Callable[..., Any],
+                                *args, **kwargs) -> str:
+        """
+        Planifie une tâche récurrente (remplace une tâche de même identifiant)
+
+        Args:
+            task_id: Identifiant de la tâche
+            interval_seconds: Intervalle entre deux exécutions (secondes)
+            func: Fonction ou coroutine à exécuter
+        """
+        if self.clock.simulated:
+            return self.clock.schedule_interval(interval_seconds, func, *args, job_id=task_id, **kwargs)
+        self.scheduler.add_job(
+            func,
+            trigger=IntervalTrigger(seconds=interval_seconds),
+            id=task_id,
+            args=args,
+            kwargs=kwargs,
+            replace_existing=True
+        )
+        return task_id
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Annule une tâche planifiée (False si elle n'existe pas)"""
+        if self.clock.simulated:
+            return self.clock.cancel(task_id)
+        try:
+            self.scheduler.remove_job(task_id)
+            return True
+        except JobLookupError:
+            return False
+
+    def has_task(self, task_id: str) -> bool:
+        """Indique si une tâche est planifiée"""
+        if self.clock.simulated:
+            return self.clock.has_job(task_id)
+        return self.scheduler.get_job(task_id) is not None
+
+    def schedule_post(self, post_id: int, run_date: datetime, channel: Optional[str] = None) -> datetime:
+        """
+        Planifie la publication d'un post enregistré en base
+
+        La date est lissée : les posts planifiés au même instant sont répartis
+        sur une courte fenêtre (BurstSmoother), chaque post d'un canal après
+        le précédent. Un post déjà planifié est replanifié.
+
+        Args:
+            post_id: Identifiant du post dans la table posts
+            run_date: Date demandée (naïve = UTC) ; une date passée est ramenée à maintenant
+            channel: Canal cible
+
+        Returns:
+            datetime: Date d'envoi effective (UTC)
+        """
+        self.cancel_post(post_id)
+        if run_date.tzinfo is None:
+            run_date = pytz.UTC.localize(run_date)
+        run_date = max(run_date, self.clock.utcnow())
+        effective = self.smoother.assign(run_date, channel)
+        self._post_slots[post_id] = effective
+        self.schedule_task(f"post_{post_id}", effective, self.execute_scheduled_post, post_id)
+        logger.info(f"Post {post_id} planifié pour {effective.isoformat()} (demandé: {run_date.isoformat()})")
+        return effective
+
+    def cancel_post(self, post_id: int) -> bool:
+        """Annule la publication planifiée d'un post et libère sa seconde d'envoi"""
+        slot = self._post_slots.pop(post_id, None)
+        if slot is not None:
+            self.smoother.release(slot)
+        return self.cancel_task(f"post_{post_id}")
+
+    def restore_pending_posts(self) -> int:
+        """
+        Replanifie les posts en attente enregistrés en base (démarrage du bot)
+
+        Returns:
+            int: Nombre de posts replanifiés
+        """
+        restored = 0
+        for post in self.db_manager.get_pending_posts():
+            if not post.get('scheduled_time'):
+                continue
+            try:
+                run_date = datetime.strptime(post['scheduled_time'], '%Y-%m-%d %H:%M:%S')
+                self.schedule_post(post['id'], run_date, post.get('username'))
+                restored += 1
+            except Exception as e:
+                logger.error(f"Impossible de replanifier le post {post['id']}: {e}")
+        return restored
+
     async def execute_scheduled_post(self, post_id):
         logger.info(f"Exécution du post planifié {post_id}")
+        self._post_slots.pop(post_id, None)
+        if self.post_sender is None:
+            logger.error(f"Aucun envoi configuré pour le post planifié {post_id}")
+            return False
+        return await self.post_sender(post_id)
 
 
 async def planifier_post(update, context):
@@ -67,7 +214,7 @@ async def planifier_post(update, context):
                 scheduled_time = pytz.UTC.localize(scheduled_time).astimezone(local_tz)
                 
                 message += f"*{i}. Publication prévue le {scheduled_time.strftime('%d/%m/%Y à %H:%M')}*\n"
-                message += f"Type: {post['type']}\n"
+                message += f"Type: {post['post_type']}\n"
                 if post.get('caption'):
                     message += f"Légende: {post['caption'][:50]}...\n" if len(post['caption']) > 50 else f"Légende: {post['caption']}\n"
                 message += "\n"
@@ -75,7 +222,6 @@ async def planifier_post(update, context):
         # Construire le clavier
         keyboard = [
             [InlineKeyboardButton("➕ Nouvelle publication planifiée", callback_data="create_publication")],
-            [InlineKeyboardButton("🗑 Supprimer une publication", callback_data="delete_scheduled_post")],
             [InlineKeyboardButton("↩️ Menu principal", callback_data="main_menu")]
         ]
 
@@ -129,7 +275,6 @@ def handle_schedule_in_reply_keyboard(update, context, user_text):
         keyboard = [
             [InlineKeyboardButton("Régler temps d'auto destruction", callback_data="auto_destruction")],
             [InlineKeyboardButton("Maintenant", callback_data="send_now")],
-            [InlineKeyboardButton("Planifier", callback_data="schedule_send")],
             [InlineKeyboardButton("↩️ Retour", callback_data="main_menu")]
         ]
         
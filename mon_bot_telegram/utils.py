@@ -5,6 +5,8 @@ import logging
 from typing import List, Dict, Any, Callable, Awaitable, Tuple, Optional
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+from mon_bot_telegram.utils.clock import get_clock
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,7 +53,7 @@ class TimeUtils:
         Returns:
             bool: True si l'heure est valide, False sinon
         """
-        return scheduled_time > datetime.now(pytz.UTC)
+        return scheduled_time > get_clock().utcnow()
 
 
 class KeyboardUtils:
@@ -126,7 +128,7 @@ class TimezoneManager:
     def validate_future_time(dt: datetime, timezone: str) -> Tuple[bool, str]:
         """Vérifie si une date est dans le futur."""
         local_tz = pytz.timezone(timezone)
-        now = datetime.now(local_tz)
+        now = get_clock().now(local_tz)
         if dt <= now:
             return False, "Cette heure est déjà passée"
         return True, ""
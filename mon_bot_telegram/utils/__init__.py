@@ -8,7 +8,6 @@ Il comprend :
 """
 from .timezone_manager import TimezoneManager
 from .message_utils import PostType, MessageError
-from .validators import InputValidator, TimeInputValidator
 from .keyboard_manager import KeyboardManager
 from .post_editing_state import PostEditingState
 from .message_templates import MessageTemplates
@@ -0,0 +1,122 @@
+"""
+Lissage des pics d'envois planifiés.
+
+Les utilisateurs planifient massivement aux heures rondes (HH:00, HH:30) :
+tous les posts partent alors dans la même seconde et déclenchent des
+flood waits. BurstSmoother répartit les envois d'un même instant sur une
+petite fenêtre configurable, sans jamais dépasser `max_per_second` envois
+par seconde. Les posts d'un canal planifiés dans la même fenêtre gardent
+leur ordre (chacun au moins une seconde après le précédent) ; des posts
+planifiés à des heures éloignées ne se décalent jamais l'un l'autre.
+"""
+import logging
+import math
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import pytz
+
+from .clock import SystemClock, get_clock
+
+logger = logging.getLogger('TelegramBot')
+
+
+class BurstSmoother:
+    """Attribue à chaque envoi planifié une seconde d'exécution libre"""
+
+    def __init__(self, window_seconds: int = 30, max_per_second: int = 5, clock: Optional[SystemClock] = None):
+        """
+        Initialise le lisseur
+
+        Args:
+            window_seconds: Durée (secondes) sur laquelle sont répartis les envois d'un même instant
+            max_per_second: Nombre maximum d'envois par seconde
+            clock: Horloge du planificateur (horloge active par défaut)
+        """
+        self.clock = clock
+        self.window_seconds = max(0, int(window_seconds))
+        self.max_per_second = max(1, int(max_per_second))
+        # Nombre d'envois réservés par seconde (timestamp Unix entier)
+        self._slots: Dict[int, int] = {}
+        # Dernière seconde attribuée par (canal, seconde demandée)
+        self._channel_last: Dict[Tuple[str, int], int] = {}
+        # Dernière seconde à laquelle les réservations passées ont été purgées
+        self._pruned_at: Optional[int] = None
+
+    def assign(self, run_date: datetime, channel: Optional[str] = None) -> datetime:
+        """
+        Réserve une seconde d'envoi pour un post planifié à run_date
+
+        L'envoi prend la seconde la moins chargée de la fenêtre
+        [run_date, run_date + window_seconds] (la plus tôt en cas d'égalité).
+        Si la fenêtre est pleine, il passe à la première seconde libre
+        suivante plutôt que de surcharger une seconde.
+
+        Args:
+            run_date: Date demandée par l'utilisateur (UTC si naïve)
+            channel: Canal cible (l'ordre des posts d'un canal est conservé)
+
+        Returns:
+            datetime: Date d'exécution effective (UTC)
+        """
+        if run_date.tzinfo is None:
+            run_date = pytz.UTC.localize(run_date)
+        requested = self._to_second(run_date)
+        self._prune()
+
+        earliest = requested
+        if channel is not None:
+            # Après les posts du canal demandés plus tôt dans la même fenêtre :
+            # deux envois d'une même seconde partent en parallèle
+            for previous in range(requested - self.window_seconds, requested + 1):
+                last = self._channel_last.get((channel, previous))
+                if last is not None:
+                    earliest = max(earliest, last + 1)
+
+        second = None
+        for candidate in range(earliest, requested + self.window_seconds + 1):
+            load = self._slots.get(candidate, 0)
+            if load < self.max_per_second and (second is None or load < self._slots.get(second, 0)):
+                second = candidate
+        if second is None:
+            second = max(earliest, requested + self.window_seconds + 1)
+            while self._slots.get(second, 0) >= self.max_per_second:
+                second += 1
+            logger.warning(
+                f"Fenêtre de lissage saturée pour {run_date.isoformat()}, "
+                f"envoi placé à +{second - requested}s"
+            )
+
+        self._slots[second] = self._slots.get(second, 0) + 1
+        if channel is not None:
+            self._channel_last[(channel, requested)] = second
+        return datetime.fromtimestamp(second, pytz.UTC)
+
+    def release(self, run_date: datetime) -> None:
+        """Libère une seconde réservée (post annulé ou replanifié)"""
+        second = self._to_second(run_date)
+        if self._slots.get(second, 0) > 0:
+            self._slots[second] -= 1
+            if not self._slots[second]:
+                del self._slots[second]
+
+    def load_at(self, run_date: datetime) -> int:
+        """Retourne le nombre d'envois réservés sur la seconde donnée"""
+        return self._slots.get(self._to_second(run_date), 0)
+
+    def _prune(self) -> None:
+        now = math.floor((self.clock or get_clock()).time())
+        if now == self._pruned_at:
+            return
+        self._pruned_at = now
+        for second in [s for s in self._slots if s < now]:
+            del self._slots[second]
+        for key in [k for k, s in self._channel_last.items() if s < now]:
+            del self._channel_last[key]
+
+    @staticmethod
+    def _to_second(value: datetime) -> int:
+        if value.tzinfo is None:
+            value = pytz.UTC.localize(value)
+        return math.floor(value.timestamp())
+
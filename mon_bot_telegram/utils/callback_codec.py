@@ -0,0 +1,189 @@
+"""
+Encodage compact des callback_data.
+
+Telegram limite callback_data à 64 octets. Les données construites à la
+main (react_{index}_{emoji}, select_channel_{username}...) dépassaient cette
+limite avec un long username ou un emoji composé, et étaient relues par des
+split('_') successifs. Chaque action a désormais un code court et des champs
+typés :
+
+    <code>:<base64url(champs)>     champs entiers en varint, textes en
+                                   varint(longueur) + UTF-8
+    <code>!<jeton>                 si le résultat dépasse 64 octets, les
+                                   champs sont conservés côté serveur dans
+                                   une table bornée et seul un jeton opaque
+                                   est envoyé
+
+Les boutons de réaction restent sur les messages publiés : leurs champs
+tiennent toujours dans l'encodage direct, qui ne dépend d'aucun état serveur.
+"""
+import base64
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger('TelegramBot')
+
+MAX_CALLBACK_BYTES = 64
+
+
+def _write_varint(value: int, out: bytearray) -> None:
+    if value < 0:
+        raise ValueError("Les entiers de callback doivent être positifs")
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class CallbackCodec:
+    """Encode et décode les callback_data des actions enregistrées"""
+
+    def __init__(self, max_tokens: int = 10000):
+        """
+        Args:
+            max_tokens: Nombre maximum de jetons conservés côté serveur (les plus anciens sont oubliés)
+        """
+        self.max_tokens = max_tokens
+        self._actions: Dict[str, Tuple[str, Tuple[type, ...]]] = {}
+        self._by_code: Dict[str, Tuple[str, Tuple[type, ...]]] = {}
+        self._tokens: "OrderedDict[str, Tuple[Any, ...]]" = OrderedDict()
+
+    def register(self, action: str, code: str, *types: type) -> None:
+        """
+        Déclare une action
+
+        Args:
+            action: Nom de l'action (ex: 'react')
+            code: Code court transmis à Telegram (ex: 'r')
+            types: Types des champs (int ou str)
+        """
+        if action in self._actions or code in self._by_code:
+            raise ValueError(f"Action de callback déjà enregistrée : '{action}' ({code})")
+        if ':' in code or '!' in code:
+            raise ValueError(f"Code de callback invalide : '{code}'")
+        self._actions[action] = (code, types)
+        self._by_code[code] = (action, types)
+
+    def prefix(self, action: str) -> str:
+        """Préfixe des callback_data d'une action (pour le routage)"""
+        return self._actions[action][0]
+
+    def encode(self, action: str, *values: Any) -> str:
+        """
+        Encode une action et ses champs en callback_data (64 octets au plus)
+
+        Args:
+            action: Action enregistrée
+            values: Champs, dans l'ordre déclaré
+        """
+        code, types = self._actions[action]
+        if len(values) != len(types):
+            raise ValueError(f"L'action '{action}' attend {len(types)} champ(s)")
+        payload = bytearray()
+        for kind, value in zip(types, values):
+            if kind is int:
+                _write_varint(int(value), payload)
+            else:
+                raw = str(value).encode('utf-8')
+                _write_varint(len(raw), payload)
+                payload += raw
+        data = f"{code}:{base64.urlsafe_b64encode(bytes(payload)).rstrip(b'=').decode('ascii')}"
+        if len(data.encode('utf-8')) <= MAX_CALLBACK_BYTES:
+            return data
+        return f"{code}!{self._store(tuple(values))}"
+
+    def decode(self, data: str, action: Optional[str] = None) -> Optional[Tuple[Any, ...]]:
+        """
+        Décode un callback_data
+
+        Args:
+            data: callback_data reçu
+            action: Action attendue (None pour accepter toute action)
+
+        Returns:
+            Optional[Tuple[Any, ...]]: Champs décodés, None si la donnée est invalide,
+            d'une autre action ou si son jeton a expiré
+        """
+        decoded = self.decode_action(data)
+        if decoded is None or (action is not None and decoded[0] != action):
+            return None
+        return decoded[1]
+
+    def decode_action(self, data: str) -> Optional[Tuple[str, Tuple[Any, ...]]]:
+        """Décode un callback_data en (action, champs)"""
+        for separator in (':', '!'):
+            code, found, payload = data.partition(separator)
+            if found and code in self._by_code:
+                break
+        else:
+            return None
+        action, types = self._by_code[code]
+        if separator == '!':
+            values = self._tokens.get(payload)
+            if values is None:
+                logger.info(f"Jeton de callback expiré pour l'action '{action}'")
+                return None
+            self._tokens.move_to_end(payload)
+            return action, values
+        try:
+            raw = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+            return action, self._read_fields(raw, types)
+        except (ValueError, IndexError, UnicodeDecodeError):
+            logger.warning(f"callback_data invalide pour l'action '{action}'")
+            return None
+
+    @staticmethod
+    def _read_fields(raw: bytes, types: Sequence[type]) -> Tuple[Any, ...]:
+        values = []
+        pos = 0
+        for kind in types:
+            value, pos = _read_varint(raw, pos)
+            if kind is not int:
+                if pos + value > len(raw):
+                    raise ValueError("Champ tronqué")
+                value, pos = raw[pos:pos + value].decode('utf-8'), pos + value
+            values.append(value)
+        if pos != len(raw):
+            raise ValueError("Données en trop")
+        return tuple(values)
+
+    def _store(self, values: Tuple[Any, ...]) -> str:
+        token = secrets.token_urlsafe(9)
+        self._tokens[token] = values
+        while len(self._tokens) > self.max_tokens:
+            self._tokens.popitem(last=False)
+        return token
+
+
+callback_codec = CallbackCodec()
+callback_codec.register("react", "r", int, str)
+callback_codec.register("select_channel", "sc", str)
+callback_codec.register("delete_channel", "dc", str)
+callback_codec.register("fanout_toggle", "ft", str)
+
+
+def encode_callback(action: str, *values: Any) -> str:
+    """Raccourci de CallbackCodec.encode avec le codec partagé"""
+    return callback_codec.encode(action, *values)
+
+
+def decode_callback(data: str, action: Optional[str] = None) -> Optional[Tuple[Any, ...]]:
+    """Raccourci de CallbackCodec.decode avec le codec partagé"""
+    return callback_codec.decode(data, action)
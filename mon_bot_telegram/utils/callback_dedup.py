@@ -0,0 +1,124 @@
+"""
+Anti-doublon des appuis sur les boutons inline.
+
+Un double appui (ou une requête renvoyée par Telegram) déclenchait deux fois
+le même handler : un double appui sur « Maintenant » publiait deux fois.
+Chaque callback est identifié par (utilisateur, message, callback_data) ; un
+callback identique reçu pendant son traitement, ou dans la fenêtre qui suit
+la fin de ce traitement, est abandonné avant l'exécution de tout handler.
+La fenêtre ne part qu'à la fin des handlers : un second appui mis en file
+derrière un handler lent (updates d'un même utilisateur traitées une à une)
+est encore reconnu comme doublon. Les callbacks en cours et les callbacks
+terminés sont tenus dans deux tables, chacune triée par expiration et purgée
+par la tête. Seuls les callbacks terminés sont évincés quand la taille
+maximum est atteinte, jamais un callback en cours : la mémoire reste bornée
+quelle que soit la durée de fonctionnement du bot.
+"""
+import logging
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from telegram.ext import ApplicationHandlerStop
+
+from .clock import get_clock
+
+logger = logging.getLogger('TelegramBot')
+
+
+class CallbackDeduplicator:
+    """Abandonne les callbacks identiques reçus dans une courte fenêtre"""
+
+    def __init__(self, window: float = 2.0, max_entries: int = 10000, max_in_flight: float = 300.0):
+        """
+        Args:
+            window: Durée pendant laquelle un callback identique est ignoré
+                après la fin de son traitement (secondes)
+            max_entries: Nombre maximum de callbacks mémorisés
+            max_in_flight: Durée maximum d'un traitement, au-delà de laquelle un
+                callback dont la fin n'a pas été signalée n'est plus bloqué (secondes)
+        """
+        self.window = window
+        self.max_entries = max_entries
+        self.max_in_flight = max_in_flight
+        # Clé -> limite de traitement des callbacks en cours, et clé -> fin de la
+        # fenêtre des callbacks terminés. Durées fixes : l'ordre d'insertion est
+        # celui des expirations, la purge s'arrête au premier callback non expiré
+        self._in_flight: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._finished: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.dropped = 0
+
+    @staticmethod
+    def key_for(query) -> Hashable:
+        """Identifie un appui : même utilisateur, même message, même bouton"""
+        user_id = query.from_user.id if query.from_user else None
+        if query.message is not None:
+            return user_id, query.message.chat_id, query.message.message_id, query.data
+        if query.inline_message_id:
+            return user_id, query.inline_message_id, query.data
+        return user_id, query.id
+
+    def is_duplicate(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        Indique si le callback est en cours ou a été vu dans la fenêtre, et le marque en cours sinon
+
+        Args:
+            key: Clé du callback (key_for)
+            now: Instant courant (horloge monotone)
+        """
+        now = get_clock().monotonic() if now is None else now
+        self._purge(now)
+        if key in self._in_flight or key in self._finished:
+            return True
+        self._in_flight[key] = now + self.max_in_flight
+        # Les callbacks en cours ne sont jamais évincés : un double appui
+        # pendant le traitement reste un doublon, même sous charge
+        while self._finished and len(self) > self.max_entries:
+            self._finished.popitem(last=False)
+        return False
+
+    def finish(self, key: Hashable, now: Optional[float] = None) -> None:
+        """
+        Signale la fin du traitement d'un callback : la fenêtre d'expiration commence
+
+        Args:
+            key: Clé du callback (key_for)
+            now: Instant courant (horloge monotone)
+        """
+        if self._in_flight.pop(key, None) is None:
+            return
+        now = get_clock().monotonic() if now is None else now
+        self._finished[key] = now + self.window
+
+    def _purge(self, now: float) -> None:
+        for table in (self._in_flight, self._finished):
+            while table:
+                key, expires_at = next(iter(table.items()))
+                if expires_at > now:
+                    break
+                del table[key]
+
+    async def guard(self, update, context) -> None:
+        """
+        Handler à enregistrer dans un groupe prioritaire (ex: group=-1)
+
+        Raises:
+            ApplicationHandlerStop: Si le callback est un doublon (aucun autre handler ne s'exécute)
+        """
+        query = update.callback_query
+        if query is None or not self.is_duplicate(self.key_for(query)):
+            return
+        self.dropped += 1
+        logger.info(f"Callback en double ignoré : {query.data}")
+        try:
+            await query.answer()
+        except Exception:
+            pass
+        raise ApplicationHandlerStop
+
+    async def release(self, update, context) -> None:
+        """Handler à enregistrer dans le dernier groupe, après ceux du callback (ex: group=2)"""
+        if update.callback_query is not None:
+            self.finish(self.key_for(update.callback_query))
+
+    def __len__(self) -> int:
+        return len(self._in_flight) + len(self._finished)
@@ -0,0 +1,159 @@
+"""
+Routage des callback_data des boutons inline.
+
+Remplace la chaîne de if/elif de handle_callback (comparaisons linéaires,
+préfixes courts qui masquaient des routes plus longues) :
+
+- routes exactes : dictionnaire (une seule recherche) ;
+- routes par préfixe : arbre préfixe compilé, le préfixe le plus long
+  l'emporte quel que soit l'ordre d'enregistrement (add_thumbnail_rename_
+  n'est plus masqué par add_thumbnail_) ;
+- la fin de la donnée après le préfixe peut être extraite comme paramètre
+  typé (post_index entier, username de canal).
+
+Le coût d'un dispatch ne dépend pas du nombre de routes, seulement de la
+longueur de callback_data (64 octets au plus). Un double enregistrement
+lève une erreur dès l'import. Un callback sans route est journalisé et
+confié au handler de repli, qui prévient l'utilisateur.
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('TelegramBot')
+
+CallbackHandler = Callable[..., Awaitable[Any]]
+
+
+class CallbackRoute:
+    """Route enregistrée"""
+
+    def __init__(self, pattern: str, handler: CallbackHandler, is_prefix: bool,
+                 param: Optional[str] = None, convert: Callable[[str], Any] = str):
+        self.pattern = pattern
+        self.handler = handler
+        self.is_prefix = is_prefix
+        self.param = param
+        self.convert = convert
+
+    def params(self, data: str) -> Dict[str, Any]:
+        """Paramètres extraits de callback_data (ValueError si la conversion échoue)"""
+        if not self.param:
+            return {}
+        return {self.param: self.convert(data[len(self.pattern):])}
+
+
+class CallbackRouter:
+    """Routes exactes et par préfixe des callback_data"""
+
+    def __init__(self):
+        self._exact: Dict[str, CallbackRoute] = {}
+        self._prefixes: Dict[str, CallbackRoute] = {}
+        # Arbre préfixe : caractère -> noeud ; la clé None porte la route du noeud
+        self._trie: Dict[Any, Any] = {}
+        self._fallback: Optional[CallbackHandler] = None
+
+    def exact(self, data: str, handler: Optional[CallbackHandler] = None):
+        """
+        Enregistre une route exacte (utilisable comme décorateur)
+
+        Args:
+            data: callback_data complet
+            handler: Coroutine (update, context)
+        """
+        def register(func: CallbackHandler) -> CallbackHandler:
+            if data in self._exact:
+                raise ValueError(f"Route de callback déjà enregistrée : '{data}'")
+            self._exact[data] = CallbackRoute(data, func, is_prefix=False)
+            return func
+        return register(handler) if handler is not None else register
+
+    def prefix(self, prefix: str, handler: Optional[CallbackHandler] = None,
+               param: Optional[str] = None, convert: Callable[[str], Any] = str):
+        """
+        Enregistre une route par préfixe (utilisable comme décorateur)
+
+        Args:
+            prefix: Début de callback_data
+            handler: Coroutine (update, context, **params)
+            param: Nom du paramètre recevant la fin de callback_data
+            convert: Conversion du paramètre (ex: int)
+        """
+        def register(func: CallbackHandler) -> CallbackHandler:
+            if not prefix:
+                raise ValueError("Un préfixe de callback ne peut pas être vide")
+            if prefix in self._prefixes:
+                raise ValueError(f"Préfixe de callback déjà enregistré : '{prefix}'")
+            route = CallbackRoute(prefix, func, is_prefix=True, param=param, convert=convert)
+            self._prefixes[prefix] = route
+            node = self._trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = route
+            return func
+        return register(handler) if handler is not None else register
+
+    def fallback(self, handler: CallbackHandler) -> CallbackHandler:
+        """
+        Enregistre le handler des callbacks sans route (utilisable comme décorateur)
+
+        Args:
+            handler: Coroutine (update, context)
+        """
+        self._fallback = handler
+        return handler
+
+    def resolve(self, data: str) -> Optional[Tuple[CallbackRoute, Dict[str, Any]]]:
+        """
+        Trouve la route d'un callback_data
+
+        Returns:
+            Optional[Tuple[CallbackRoute, Dict[str, Any]]]: Route et paramètres, None si aucune
+        """
+        route = self._exact.get(data)
+        if route is None:
+            node = self._trie
+            for char in data:
+                node = node.get(char)
+                if node is None:
+                    break
+                route = node.get(None, route)
+        if route is None:
+            return None
+        try:
+            return route, route.params(data)
+        except ValueError:
+            logger.warning(f"Paramètre invalide dans le callback '{data}' (route '{route.pattern}')")
+            return None
+
+    async def dispatch(self, update, context) -> Any:
+        """Appelle le handler de update.callback_query.data (ou le handler de repli)"""
+        data = update.callback_query.data or ""
+        resolved = self.resolve(data)
+        if resolved is None:
+            logger.warning(f"Aucune route pour le callback '{data}'")
+            if self._fallback is None:
+                return None
+            return await self._fallback(update, context)
+        route, params = resolved
+        return await route.handler(update, context, **params)
+
+    def overlaps(self) -> List[Tuple[str, str]]:
+        """
+        Routes qu'une comparaison dans l'ordre d'enregistrement masquerait
+
+        Le dispatch n'y est pas sensible (route exacte, puis préfixe le plus
+        long) ; la liste sert au diagnostic.
+
+        Returns:
+            List[Tuple[str, str]]: Couples (préfixe englobant, route englobée)
+        """
+        patterns = list(self._exact) + list(self._prefixes)
+        return sorted(
+            (prefix, pattern)
+            for prefix in self._prefixes
+            for pattern in patterns
+            if pattern != prefix and pattern.startswith(prefix)
+        )
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._prefixes)
@@ -0,0 +1,305 @@
+"""
+Horloge injectable pour le sous-système de planification.
+
+Le code de production utilise SystemClock (heure réelle). Les tests et
+benchmarks peuvent installer une SimulatedClock via set_clock() puis faire
+avancer le temps instantanément pour rejouer des journées ou des semaines
+de publications planifiées en quelques secondes.
+"""
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import pytz
+
+logger = logging.getLogger('TelegramBot')
+
+
+class SystemClock:
+    """Horloge basée sur l'heure système"""
+
+    simulated = False
+
+    def now(self, tz=None) -> datetime:
+        """Retourne l'heure courante (timezone-aware si tz est fourni)"""
+        return datetime.now(tz)
+
+    def utcnow(self) -> datetime:
+        """Retourne l'heure courante en UTC (timezone-aware)"""
+        return datetime.now(pytz.UTC)
+
+    def time(self) -> float:
+        """Retourne un timestamp Unix"""
+        return time.time()
+
+    def monotonic(self) -> float:
+        """Retourne une horloge monotone pour mesurer des durées"""
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        """Attend le nombre de secondes indiqué"""
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock(SystemClock):
+    """
+    Horloge simulée dont le temps n'avance que sur demande.
+
+    Les tâches enregistrées avec schedule() sont exécutées par advance() ou
+    jump(), dans l'ordre (run_date, ordre d'insertion). Chaque exécution est
+    consignée dans `executions` avec son retard (lag) pour vérifier l'ordre,
+    la latence et le rattrapage après un saut de temps.
+    """
+
+    simulated = True
+
+    def __init__(self, start: Optional[datetime] = None):
+        """
+        Initialise l'horloge simulée
+
+        Args:
+            start: Instant de départ (UTC par défaut: maintenant)
+        """
+        if start is None:
+            start = datetime.now(pytz.UTC)
+        elif start.tzinfo is None:
+            start = pytz.UTC.localize(start)
+        self._now = start.astimezone(pytz.UTC)
+        self._epoch = self._now
+        self._jobs: List[tuple] = []
+        self._cancelled: set = set()
+        self._job_ids: Dict[str, int] = {}
+        self._sleepers: List[tuple] = []
+        self._counter = itertools.count()
+        self._tasks: set = set()
+        self.executions: List[Dict[str, Any]] = []
+
+    def now(self, tz=None) -> datetime:
+        if tz is None:
+            return self._now.replace(tzinfo=None)
+        return self._now.astimezone(tz)
+
+    def utcnow(self) -> datetime:
+        return self._now
+
+    def time(self) -> float:
+        return self._now.timestamp()
+
+    def monotonic(self) -> float:
+        return (self._now - self._epoch).total_seconds()
+
+    async def sleep(self, seconds: float) -> None:
+        """Suspend l'appelant jusqu'à ce que l'horloge ait avancé de `seconds`"""
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        wake_at = self._now + timedelta(seconds=seconds)
+        heapq.heappush(self._sleepers, (wake_at, next(self._counter), future))
+        await future
+
+    def schedule(
+        self,
+        run_date: datetime,
+        func: Callable[..., Any],
+        *args,
+        job_id: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """
+        Enregistre une tâche à exécuter à run_date
+
+        Args:
+            run_date: Date d'exécution (naïve = UTC)
+            func: Fonction ou coroutine à exécuter
+            job_id: Identifiant de la tâche (remplace une tâche existante)
+
+        Returns:
+            str: L'identifiant de la tâche
+        """
+        if run_date.tzinfo is None:
+            run_date = pytz.UTC.localize(run_date)
+        run_date = run_date.astimezone(pytz.UTC)
+        seq = next(self._counter)
+        if job_id is None:
+            job_id = f"sim_{seq}"
+        elif job_id in self._job_ids:
+            self._cancelled.add(self._job_ids[job_id])
+        self._job_ids[job_id] = seq
+        heapq.heappush(self._jobs, (run_date, seq, job_id, func, args, kwargs))
+        return job_id
+
+    def schedule_interval(
+        self,
+        interval_seconds: float,
+        func: Callable[..., Any],
+        *args,
+        job_id: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """
+        Enregistre une tâche récurrente, première exécution après un intervalle
+
+        Comme avec APScheduler, les exécutions manquées lors d'un jump() sont
+        regroupées en une seule.
+
+        Args:
+            interval_seconds: Intervalle entre deux exécutions
+            func: Fonction ou coroutine à exécuter
+            job_id: Identifiant de la tâche (remplace une tâche existante)
+
+        Returns:
+            str: L'identifiant de la tâche
+        """
+        if interval_seconds <= 0:
+            raise ValueError("L'intervalle d'une tâche récurrente doit être positif")
+        step = timedelta(seconds=interval_seconds)
+        if job_id is None:
+            job_id = f"sim_interval_{next(self._counter)}"
+
+        def run(run_date: datetime) -> Any:
+            next_date = run_date + step
+            while next_date <= self._now:
+                next_date += step
+            self.schedule(next_date, run, next_date, job_id=job_id)
+            return func(*args, **kwargs)
+
+        first = self._now + step
+        return self.schedule(first, run, first, job_id=job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Annule une tâche enregistrée"""
+        seq = self._job_ids.pop(job_id, None)
+        if seq is None:
+            return False
+        self._cancelled.add(seq)
+        return True
+
+    def has_job(self, job_id: str) -> bool:
+        return job_id in self._job_ids
+
+    def pending_count(self) -> int:
+        return len(self._job_ids)
+
+    async def advance(self, seconds: float) -> int:
+        """
+        Avance le temps pas à pas : chaque tâche s'exécute exactement à sa date
+
+        Args:
+            seconds: Durée à simuler
+
+        Returns:
+            int: Nombre de tâches exécutées
+        """
+        target = self._now + timedelta(seconds=seconds)
+        executed = 0
+        while True:
+            next_date = self._next_event_date()
+            if next_date is None or next_date > target:
+                break
+            self._now = max(self._now, next_date)
+            executed += await self._run_due()
+            await self._settle()
+        self._now = target
+        self._wake_sleepers()
+        await self._settle()
+        return executed
+
+    async def jump(self, seconds: float) -> int:
+        """
+        Saute directement à l'instant cible puis exécute les tâches en retard,
+        comme le ferait le bot après une interruption (rattrapage)
+
+        Args:
+            seconds: Durée du saut
+
+        Returns:
+            int: Nombre de tâches exécutées
+        """
+        self._now = self._now + timedelta(seconds=seconds)
+        executed = await self._run_due()
+        self._wake_sleepers()
+        await self._settle()
+        return executed
+
+    async def _settle(self, rounds: int = 10) -> None:
+        """Laisse la boucle d'événements exécuter les tâches réveillées"""
+        for _ in range(rounds):
+            if all(t.done() for t in self._tasks):
+                break
+            await asyncio.sleep(0)
+
+    def _next_event_date(self) -> Optional[datetime]:
+        while self._jobs and self._jobs[0][1] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(self._jobs)[1])
+        dates = []
+        if self._jobs:
+            dates.append(self._jobs[0][0])
+        if self._sleepers:
+            dates.append(self._sleepers[0][0])
+        return min(dates) if dates else None
+
+    def _on_task_done(self, task: asyncio.Future) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Erreur lors de l'exécution simulée: {task.exception()}")
+
+    def _wake_sleepers(self) -> None:
+        while self._sleepers and self._sleepers[0][0] <= self._now:
+            _, _, future = heapq.heappop(self._sleepers)
+            if not future.done():
+                future.set_result(None)
+
+    async def _run_due(self) -> int:
+        executed = 0
+        self._wake_sleepers()
+        while self._jobs and self._jobs[0][0] <= self._now:
+            run_date, seq, job_id, func, args, kwargs = heapq.heappop(self._jobs)
+            if seq in self._cancelled:
+                self._cancelled.discard(seq)
+                continue
+            self._job_ids.pop(job_id, None)
+            try:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    # Comme APScheduler, la tâche tourne en parallèle : elle
+                    # peut elle-même attendre sur l'horloge simulée
+                    task = asyncio.ensure_future(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._on_task_done)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'exécution simulée de {job_id}: {e}")
+            self.executions.append({
+                'job_id': job_id,
+                'run_date': run_date,
+                'executed_at': self._now,
+                'lag': (self._now - run_date).total_seconds()
+            })
+            executed += 1
+        return executed
+
+
+_clock: SystemClock = SystemClock()
+
+
+def get_clock() -> SystemClock:
+    """Retourne l'horloge active"""
+    return _clock
+
+
+def set_clock(clock: Optional[SystemClock]) -> SystemClock:
+    """
+    Installe une horloge (None restaure l'horloge système)
+
+    Returns:
+        SystemClock: L'horloge précédemment active
+    """
+    global _clock
+    previous = _clock
+    _clock = clock if clock is not None else SystemClock()
+    return previous
@@ -0,0 +1,113 @@
+"""
+Envoi concurrent des publications avec conservation de l'ordre.
+
+La préparation des posts (claviers, vérification de taille, thumbnails) est
+lancée en parallèle, tandis que les envois restent séquentiels par canal :
+chaque envoi démarre dès que son post est prêt et que l'envoi précédent du
+même canal est terminé. L'ordre final des messages est donc garanti, et les
+canaux différents progressent indépendamment.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+
+logger = logging.getLogger('TelegramBot')
+
+
+class DispatchResult:
+    """Résultat d'un dispatch"""
+
+    def __init__(self):
+        self.sent: List[int] = []
+        self.stopped: bool = False
+        self.errors: Dict[int, Exception] = {}
+
+    @property
+    def first_error(self) -> Optional[Exception]:
+        """Retourne l'erreur du premier post en échec (dans l'ordre des posts)"""
+        if not self.errors:
+            return None
+        return self.errors[min(self.errors)]
+
+
+class OrderedDispatcher:
+    """Prépare les posts en parallèle et les envoie dans l'ordre par canal"""
+
+    def __init__(self, concurrency: int = 6):
+        """
+        Initialise le dispatcher
+
+        Args:
+            concurrency: Nombre maximum de préparations simultanées
+        """
+        self.concurrency = max(1, int(concurrency))
+
+    async def dispatch(
+        self,
+        items: Sequence[Any],
+        prepare: Callable[[int, Any], Awaitable[Any]],
+        send: Callable[[int, Any], Awaitable[Optional[bool]]],
+        channel_of: Optional[Callable[[int, Any], Hashable]] = None
+    ) -> DispatchResult:
+        """
+        Prépare et envoie une liste de posts
+
+        Args:
+            items: Posts à envoyer, dans l'ordre
+            prepare: Coroutine de préparation (index, post) -> post préparé
+            send: Coroutine d'envoi (index, post préparé). Retourner False
+                interrompt les envois suivants du même canal.
+            channel_of: Fonction (index, post) -> canal (un seul canal par défaut)
+
+        Returns:
+            DispatchResult: Posts envoyés, interruption et erreurs par index
+        """
+        result = DispatchResult()
+        if not items:
+            return result
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _prepare(index: int, item: Any) -> Any:
+            async with semaphore:
+                return await prepare(index, item)
+
+        prepared = [asyncio.ensure_future(_prepare(i, item)) for i, item in enumerate(items)]
+
+        queues: Dict[Hashable, List[int]] = {}
+        for index, item in enumerate(items):
+            key = channel_of(index, item) if channel_of else None
+            queues.setdefault(key, []).append(index)
+
+        async def _run_channel(indexes: List[int]) -> None:
+            for position, index in enumerate(indexes):
+                try:
+                    ready = await prepared[index]
+                    if await send(index, ready) is False:
+                        result.stopped = True
+                        self._cancel(prepared, indexes[position + 1:])
+                        return
+                    result.sent.append(index)
+                except Exception as e:
+                    logger.error(f"Erreur lors de l'envoi du post {index}: {e}")
+                    result.errors[index] = e
+                    # On n'envoie pas la suite pour ne pas casser l'ordre du canal
+                    self._cancel(prepared, indexes[position + 1:])
+                    return
+
+        try:
+            await asyncio.gather(*(_run_channel(indexes) for indexes in queues.values()))
+        finally:
+            self._cancel(prepared, range(len(prepared)))
+        result.sent.sort()
+        return result
+
+    @staticmethod
+    def _cancel(tasks: List[asyncio.Future], indexes) -> None:
+        for index in indexes:
+            task = tasks[index]
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Évite l'avertissement "exception was never retrieved"
+                task.exception()
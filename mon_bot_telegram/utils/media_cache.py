@@ -0,0 +1,240 @@
+"""
+Cache local des médias, adressé par file_unique_id.
+
+Les fichiers téléchargés sont rangés sous le dossier de téléchargement par
+identifiant Telegram stable (file_unique_id) et non par nom : deux
+utilisateurs qui envoient "video.mp4" ne se marchent plus dessus, et un
+même média renvoyé est servi depuis le disque sans nouveau téléchargement.
+
+- Téléchargement dans un fichier temporaire puis os.replace() atomique :
+  un fichier du cache est toujours complet.
+- Compteur de références : un fichier en cours d'utilisation n'est jamais
+  supprimé.
+- Éviction LRU des fichiers non référencés au-delà du budget en octets.
+"""
+import asyncio
+import logging
+import os
+import re
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger('TelegramBot')
+
+PARTIAL_SUFFIX = ".part"
+
+
+class MediaCacheError(Exception):
+    """Erreur du cache de médias"""
+    pass
+
+
+class _CacheEntry:
+    __slots__ = ("path", "size", "refs")
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self.refs = 0
+
+
+class MediaCache:
+    """Cache disque des médias avec références et éviction LRU"""
+
+    def __init__(self, root: str, max_bytes: int, listener=None):
+        """
+        Initialise le cache et indexe les fichiers déjà présents
+
+        Args:
+            root: Dossier du cache
+            max_bytes: Budget disque en octets
+            listener: Objet notifié des écritures et suppressions
+                (track_file / untrack_file, ex: ResourceManager)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.listener = listener
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Indexe le contenu du dossier (du plus ancien au plus récent accès)"""
+        found = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isfile(path):
+                continue
+            if PARTIAL_SUFFIX in name:
+                # Téléchargement interrompu par un arrêt du bot
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_atime, name, path, stat.st_size))
+        for _, name, path, size in sorted(found):
+            key = os.path.splitext(name)[0]
+            self._entries[key] = _CacheEntry(path, size)
+            self.total_bytes += size
+        if found:
+            logger.info(f"Cache de médias: {len(found)} fichiers, {self.total_bytes} octets")
+
+    @staticmethod
+    def _safe_key(file_unique_id: str) -> str:
+        key = re.sub(r'[^A-Za-z0-9_-]', '_', file_unique_id or "")
+        if not key:
+            raise MediaCacheError("file_unique_id manquant pour le cache")
+        return key
+
+    def contains(self, file_unique_id: str) -> bool:
+        key = self._safe_key(file_unique_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if not os.path.exists(entry.path):
+            # Supprimé hors du cache : on oublie l'entrée
+            self._forget(key)
+            return False
+        return True
+
+    def owns(self, path: str) -> bool:
+        """Indique si un chemin est dans le dossier du cache"""
+        return os.path.abspath(os.path.dirname(path)) == os.path.abspath(self.root)
+
+    def is_in_use(self, path: str) -> bool:
+        """Indique si un fichier est en cours d'utilisation ou de téléchargement"""
+        name = os.path.basename(path)
+        if not self.owns(path):
+            return False
+        if PARTIAL_SUFFIX in name:
+            return True
+        entry = self._entries.get(os.path.splitext(name)[0])
+        return entry is not None and entry.refs > 0
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        file_unique_id: str,
+        fetch: Callable[[str], Awaitable[None]],
+        suffix: str = ""
+    ) -> AsyncIterator[str]:
+        """
+        Fournit le chemin local d'un média, en le téléchargeant si besoin
+
+        Le fichier reste protégé de l'éviction pendant le bloc `async with`.
+        Des appels simultanés pour le même média partagent un seul téléchargement.
+
+        Args:
+            file_unique_id: Identifiant stable du média
+            fetch: Coroutine qui télécharge le média vers le chemin donné
+            suffix: Extension du fichier en cache (ex: '.mp4')
+
+        Yields:
+            str: Chemin du fichier complet
+        """
+        key = self._safe_key(file_unique_id)
+        entry = await self._get_or_fetch(key, fetch, suffix)
+        entry.refs += 1
+        try:
+            yield entry.path
+        finally:
+            entry.refs -= 1
+            self._evict()
+
+    async def _get_or_fetch(self, key: str, fetch, suffix: str) -> _CacheEntry:
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if os.path.exists(entry.path):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                # Supprimé hors du cache : on oublie l'entrée
+                self._forget(key)
+
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            # Un autre appel télécharge déjà ce média
+            await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        final_path = os.path.join(self.root, f"{key}{suffix}")
+        partial_path = f"{final_path}{PARTIAL_SUFFIX}-{uuid.uuid4().hex}"
+        try:
+            await fetch(partial_path)
+            os.replace(partial_path, final_path)
+            entry = _CacheEntry(final_path, os.path.getsize(final_path))
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            if self.listener is not None:
+                self.listener.track_file(final_path)
+            logger.info(f"Média mis en cache: {key} ({entry.size} octets)")
+            self._evict(keep=key)
+            future.set_result(None)
+            return entry
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            # Les appels en attente retentent eux-mêmes le téléchargement
+            future.set_result(None)
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+    def discard(self, path: str) -> bool:
+        """
+        Supprime un fichier du cache à la demande d'un tiers (quota du dossier
+        de téléchargement), en gardant l'index et le budget à jour
+
+        Returns:
+            bool: False si le fichier est en cours d'utilisation
+        """
+        if self.is_in_use(path):
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        key = os.path.splitext(os.path.basename(path))[0]
+        entry = self._entries.get(key)
+        if entry is not None and os.path.abspath(entry.path) == os.path.abspath(path):
+            self._forget(key)
+            logger.info(f"Média supprimé du cache: {key} ({entry.size} octets)")
+        elif self.listener is not None:
+            self.listener.untrack_file(path)
+        return True
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Supprime les fichiers non référencés les moins récents au-delà du budget"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0 or key == keep:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer {entry.path} du cache: {e}")
+                continue
+            self._forget(key)
+            logger.info(f"Média évincé du cache: {key} ({entry.size} octets)")
+
+    def _forget(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+            if self.listener is not None:
+                self.listener.untrack_file(entry.path)
@@ -0,0 +1,70 @@
+"""
+Métadonnées des médias capturées à la réception du message.
+
+Telegram fournit déjà la taille, le type MIME, la durée et les dimensions
+sur message.photo / message.video / message.document : on les enregistre
+une seule fois dans le brouillon au lieu d'appeler bot.get_file() (qui
+échoue au-delà de 20 Mo) à chaque décision de routage.
+"""
+from typing import Any, Dict, Optional
+
+# Colonnes de la table posts alimentées par les métadonnées
+METADATA_COLUMNS = ("file_size", "mime_type", "duration", "width", "height", "file_unique_id")
+
+
+def extract_media_metadata(message) -> Dict[str, Any]:
+    """
+    Extrait les métadonnées du média d'un message
+
+    Args:
+        message: Message Telegram reçu
+
+    Returns:
+        Dict[str, Any]: Métadonnées (valeurs None si non applicables)
+    """
+    metadata: Dict[str, Any] = {
+        "file_size": None,
+        "mime_type": None,
+        "duration": None,
+        "width": None,
+        "height": None,
+        "file_unique_id": None,
+        "file_name": None,
+        "source_chat_id": message.chat_id,
+        "source_message_id": message.message_id
+    }
+
+    if message.photo:
+        media = message.photo[-1]
+        metadata["mime_type"] = "image/jpeg"
+    elif message.video:
+        media = message.video
+    elif message.document:
+        media = message.document
+    else:
+        return metadata
+
+    metadata["file_size"] = getattr(media, "file_size", None)
+    metadata["file_unique_id"] = getattr(media, "file_unique_id", None)
+    metadata["mime_type"] = getattr(media, "mime_type", None) or metadata["mime_type"]
+    metadata["file_name"] = getattr(media, "file_name", None)
+    metadata["duration"] = getattr(media, "duration", None)
+    metadata["width"] = getattr(media, "width", None)
+    metadata["height"] = getattr(media, "height", None)
+    return metadata
+
+
+def get_metadata_file_size(post: Dict[str, Any]) -> Optional[int]:
+    """Retourne la taille connue du fichier d'un post, ou None"""
+    metadata = post.get("metadata") or {}
+    size = metadata.get("file_size")
+    if size is None:
+        # Posts relus depuis la base de données (colonne à plat)
+        size = post.get("file_size")
+    return size
+
+
+def metadata_to_columns(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convertit des métadonnées en valeurs pour les colonnes de la table posts"""
+    metadata = metadata or {}
+    return {column: metadata.get(column) for column in METADATA_COLUMNS}
@@ -0,0 +1,80 @@
+"""
+Routage des médias reçus selon leur taille connue.
+
+Telegram possède déjà chaque média reçu : tant que l'API bot l'accepte, le
+renvoi se fait par file_id, sans téléchargement ni nouvel upload. Le
+passage par le disque ou par le userbot n'est utilisé que lorsqu'il est
+indispensable. Les compteurs mesurent les octets ainsi évités.
+"""
+from typing import Dict, Optional
+
+# Routes possibles
+ROUTE_FILE_ID = "file_id"       # Renvoi direct par file_id (aucun octet transféré)
+ROUTE_USERBOT = "userbot"       # Relais Telegram -> userbot (au-delà de la limite du bot)
+ROUTE_DISK = "disk"             # Téléchargement local puis envoi (taille inconnue, dernier recours)
+ROUTE_TOO_LARGE = "too_large"   # Au-delà de la limite du userbot
+
+
+def route_media(file_type: str, file_size: Optional[int], bot_limit: int, userbot_limit: int) -> str:
+    """
+    Choisit la route d'envoi d'un média
+
+    Args:
+        file_type: 'photo', 'video' ou 'document'
+        file_size: Taille connue à la réception (None si inconnue)
+        bot_limit: Taille maximum d'un envoi par l'API bot
+        userbot_limit: Taille maximum d'un envoi par le userbot
+
+    Returns:
+        str: Une des constantes ROUTE_*
+    """
+    if file_type == "photo":
+        # Les photos restent toujours sous la limite du bot
+        return ROUTE_FILE_ID
+    if file_size is None:
+        # Taille inconnue : on tente le file_id, le disque sert de repli
+        return ROUTE_FILE_ID
+    if file_size > userbot_limit:
+        return ROUTE_TOO_LARGE
+    if file_size > bot_limit:
+        return ROUTE_USERBOT
+    return ROUTE_FILE_ID
+
+
+class RoutingStats:
+    """Compteurs de routage et octets évités"""
+
+    def __init__(self):
+        self.routes: Dict[str, int] = {}
+        # Octets non téléchargés par le bot (file_id ou relais userbot)
+        self.bytes_not_downloaded = 0
+        # Octets non réuploadés depuis le bot (renvois par file_id)
+        self.bytes_not_uploaded = 0
+        self.fallbacks = 0
+
+    def record(self, route: str, file_size: Optional[int]) -> None:
+        """Enregistre un envoi réussi sur une route"""
+        self.routes[route] = self.routes.get(route, 0) + 1
+        size = file_size or 0
+        if route == ROUTE_FILE_ID:
+            self.bytes_not_downloaded += size
+            self.bytes_not_uploaded += size
+        elif route == ROUTE_USERBOT:
+            self.bytes_not_downloaded += size
+
+    def record_fallback(self) -> None:
+        """Un renvoi par file_id a échoué et a basculé vers le disque"""
+        self.fallbacks += 1
+
+    @property
+    def bytes_avoided(self) -> int:
+        return self.bytes_not_downloaded + self.bytes_not_uploaded
+
+    def summary(self) -> str:
+        routes = ", ".join(f"{route}: {count}" for route, count in sorted(self.routes.items())) or "aucun"
+        return (
+            f"Envois par route: {routes}\n"
+            f"Replis vers le disque: {self.fallbacks}\n"
+            f"Téléchargements évités: {self.bytes_not_downloaded / (1024 * 1024):.1f} Mo\n"
+            f"Uploads évités: {self.bytes_not_uploaded / (1024 * 1024):.1f} Mo"
+        )
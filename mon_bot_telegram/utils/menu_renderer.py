@@ -0,0 +1,137 @@
+"""
+Rendu des menus à boutons.
+
+Les claviers (InlineKeyboardMarkup, immuables) ne sont plus reconstruits à
+chaque appui : les menus fixes sont construits une seule fois, les menus
+dynamiques (listes de canaux) sont mémorisés selon leur contenu. Pour chaque
+message affiché, l'empreinte du dernier rendu (texte + clavier) est
+conservée : une modification identique est ignorée avant tout appel réseau
+au lieu de provoquer une erreur « Message is not modified ».
+"""
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+logger = logging.getLogger('TelegramBot')
+
+# Un bouton est décrit par (texte, callback_data), une ligne par un tuple de boutons
+ButtonSpec = Tuple[str, str]
+RowsSpec = Tuple[Tuple[ButtonSpec, ...], ...]
+
+_static_menus: Dict[str, InlineKeyboardMarkup] = {}
+
+
+def static_menu(name: str, rows: RowsSpec) -> InlineKeyboardMarkup:
+    """
+    Retourne un menu fixe, construit au premier appel seulement
+
+    Args:
+        name: Nom du menu
+        rows: Lignes de boutons (texte, callback_data)
+    """
+    markup = _static_menus.get(name)
+    if markup is None:
+        markup = _static_menus[name] = _build(rows)
+    return markup
+
+
+@lru_cache(maxsize=512)
+def menu_markup(rows: RowsSpec) -> InlineKeyboardMarkup:
+    """
+    Retourne un menu dynamique, mémorisé selon son contenu
+
+    Args:
+        rows: Lignes de boutons (texte, callback_data)
+    """
+    return _build(rows)
+
+
+def _build(rows: RowsSpec) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text, callback_data=data) for text, data in row]
+        for row in rows
+    ])
+
+
+class MenuEditTracker:
+    """Mémorise le dernier rendu de chaque message pour ignorer les modifications identiques"""
+
+    def __init__(self, max_messages: int = 5000):
+        """
+        Args:
+            max_messages: Nombre maximum de messages suivis (les plus anciens sont oubliés)
+        """
+        self.max_messages = max_messages
+        # (chat_id, message_id) -> (empreinte, edit_date du message après le rendu)
+        self._last: "OrderedDict[Tuple[int, int], Tuple[int, Any]]" = OrderedDict()
+        self.skipped = 0
+
+    def is_unchanged(self, message, fingerprint: int) -> bool:
+        """
+        Le message affiche déjà ce rendu
+
+        L'edit_date doit aussi correspondre : un message modifié entre-temps
+        par un autre chemin n'est jamais considéré comme identique.
+        """
+        key = (message.chat_id, message.message_id)
+        if self._last.get(key) != (fingerprint, message.edit_date):
+            return False
+        self._last.move_to_end(key)
+        return True
+
+    def remember(self, message, fingerprint: int) -> None:
+        key = (message.chat_id, message.message_id)
+        self._last[key] = (fingerprint, message.edit_date)
+        self._last.move_to_end(key)
+        while len(self._last) > self.max_messages:
+            self._last.popitem(last=False)
+
+    async def edit(self, query, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                   parse_mode: Optional[str] = None) -> bool:
+        """
+        Modifie le message d'un callback sauf si le rendu est identique au précédent
+
+        Args:
+            query: CallbackQuery dont le message est modifié
+            text: Nouveau texte
+            reply_markup: Nouveau clavier
+            parse_mode: Mode de formatage du texte
+
+        Returns:
+            bool: True si un appel de modification a été fait
+        """
+        message = query.message
+        fingerprint = hash((text, reply_markup, parse_mode))
+        if message is not None and self.is_unchanged(message, fingerprint):
+            self.skipped += 1
+            return False
+        try:
+            edited = await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+            edited = message  # Contenu déjà identique : le message n'a pas changé
+        if edited is not None and not isinstance(edited, bool):
+            self.remember(edited, fingerprint)
+        return True
+
+
+_tracker: Optional[MenuEditTracker] = None
+
+
+def get_menu_tracker() -> MenuEditTracker:
+    """Retourne le suivi des rendus partagé"""
+    global _tracker
+    if _tracker is None:
+        _tracker = MenuEditTracker()
+    return _tracker
+
+
+async def edit_menu(query, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                    parse_mode: Optional[str] = None) -> bool:
+    """Raccourci de MenuEditTracker.edit avec le suivi partagé"""
+    return await get_menu_tracker().edit(query, text, reply_markup, parse_mode)
@@ -0,0 +1,269 @@
+"""
+Upload parallèle multi-connexions pour le userbot Telethon.
+
+TelegramClient.upload_file envoie les parts d'un fichier les unes après les
+autres sur une seule connexion MTProto, ce qui plafonne le débit des
+fichiers de 2 Go. ParallelUploader découpe le flux en parts et les répartit
+sur N connexions ouvertes vers le DC du compte, avec une mémoire bornée
+(nombre de parts en attente limité), puis retourne l'InputFile/InputFileBig
+standard utilisable par send_file(). Avec un point de reprise
+(UploadCheckpoint), les parts acquittées sont enregistrées et une nouvelle
+tentative reprend à la première part manquante.
+
+TelethonPartSink ouvre ses connexions avec des API internes de Telethon
+(MTProtoSender, _get_dc, _connection...), vérifiées avec la version fixée
+dans requirements.txt. Si elles manquent, open() lève SinkUnavailable avant
+toute lecture du flux et l'appelant se replie sur client.upload_file.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+from typing import Any, Callable, List, Optional
+
+from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+from telethon.tl.types import InputFile, InputFileBig
+
+try:
+    from telethon.network import MTProtoSender
+except ImportError:  # API interne, absente d'autres versions de Telethon
+    MTProtoSender = None
+
+logger = logging.getLogger('TelegramBot')
+
+# Au-delà de 10 Mo, Telegram impose l'upload "big file"
+BIG_FILE_THRESHOLD = 10 * 1024 * 1024
+MAX_PART_SIZE = 512 * 1024
+
+
+class UploadError(Exception):
+    """Erreur lors d'un upload parallèle"""
+    pass
+
+
+class SinkUnavailable(UploadError):
+    """Les connexions parallèles ne peuvent pas être ouvertes (rien n'a été envoyé)"""
+    pass
+
+
+class PartSink:
+    """Destination des parts d'un upload (une connexion MTProto ou un bouchon)"""
+
+    connections = 1
+
+    async def open(self) -> None:
+        """Ouvre les connexions"""
+
+    async def save_part(self, file_id: int, part_index: int, total_parts: int,
+                        data: bytes, big: bool, connection: int) -> None:
+        """Envoie une part sur la connexion indiquée"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Ferme les connexions"""
+
+
+class TelethonPartSink(PartSink):
+    """Envoie les parts sur N connexions MTProto vers le DC du userbot"""
+
+    # Attributs internes du TelegramClient utilisés pour ouvrir les connexions
+    CLIENT_INTERNALS = ('_get_dc', '_connection', '_log', '_proxy', '_local_addr')
+
+    def __init__(self, client, connections: int = 4):
+        """
+        Initialise la destination
+
+        Args:
+            client: TelegramClient connecté
+            connections: Nombre de connexions parallèles
+        """
+        self.client = client
+        self.connections = max(1, int(connections))
+        self._senders: List[Any] = []
+
+    @classmethod
+    def is_supported(cls, client) -> bool:
+        """Indique si les API internes de Telethon nécessaires sont présentes"""
+        return MTProtoSender is not None and all(hasattr(client, name) for name in cls.CLIENT_INTERNALS)
+
+    async def open(self) -> None:
+        """
+        Ouvre les connexions
+
+        Raises:
+            SinkUnavailable: Si les API internes de Telethon ont changé
+        """
+        if not self.is_supported(self.client):
+            raise SinkUnavailable("API interne de Telethon absente (MTProtoSender ou client)")
+        try:
+            # Les fichiers sont uploadés sur le DC du compte : la clé d'autorisation
+            # de la session y est valable, pas besoin d'exporter l'autorisation
+            dc = await self.client._get_dc(self.client.session.dc_id)
+            for _ in range(self.connections):
+                sender = MTProtoSender(self.client.session.auth_key, loggers=self.client._log)
+                await sender.connect(self.client._connection(
+                    dc.ip_address,
+                    dc.port,
+                    dc.id,
+                    loggers=self.client._log,
+                    proxy=self.client._proxy,
+                    local_addr=self.client._local_addr
+                ))
+                self._senders.append(sender)
+        except (AttributeError, TypeError) as e:
+            # Signature interne modifiée par une autre version de Telethon
+            await self.close()
+            raise SinkUnavailable(f"API interne de Telethon incompatible: {e}") from e
+        logger.info(f"{len(self._senders)} connexions d'upload ouvertes vers le DC {dc.id}")
+
+    async def save_part(self, file_id: int, part_index: int, total_parts: int,
+                        data: bytes, big: bool, connection: int) -> None:
+        if big:
+            request = SaveBigFilePartRequest(file_id, part_index, total_parts, data)
+        else:
+            request = SaveFilePartRequest(file_id, part_index, data)
+        if not await self._senders[connection].send(request):
+            raise UploadError(f"Part {part_index} refusée par le serveur")
+
+    async def close(self) -> None:
+        for sender in self._senders:
+            try:
+                await sender.disconnect()
+            except Exception as e:
+                logger.warning(f"Erreur à la fermeture d'une connexion d'upload: {e}")
+        self._senders.clear()
+
+
+class ParallelUploader:
+    """Découpe un flux en parts et les uploade en parallèle"""
+
+    def __init__(self, sink: PartSink, part_size: int = MAX_PART_SIZE, parts_per_connection: int = 2):
+        """
+        Initialise l'uploader
+
+        Args:
+            sink: Destination des parts
+            part_size: Taille d'une part (multiple de 1 Ko, 512 Ko maximum)
+            parts_per_connection: Parts en attente par connexion (borne la mémoire)
+        """
+        if part_size % 1024 or not 0 < part_size <= MAX_PART_SIZE:
+            raise ValueError("La taille d'une part doit être un multiple de 1 Ko, 512 Ko maximum")
+        self.sink = sink
+        self.part_size = part_size
+        self.parts_per_connection = max(1, parts_per_connection)
+
+    def total_parts(self, file_size: int) -> int:
+        """Nombre de parts d'un fichier"""
+        return (file_size + self.part_size - 1) // self.part_size
+
+    @staticmethod
+    def is_resumable(file_size: int) -> bool:
+        """Seuls les "big files" peuvent reprendre (pas de MD5 sur le fichier complet)"""
+        return file_size > BIG_FILE_THRESHOLD
+
+    async def upload(self, stream, file_size: int, file_name: str,
+                     file_id: Optional[int] = None, checkpoint=None,
+                     progress_callback: Optional[Callable[[int, int], Any]] = None) -> Any:
+        """
+        Uploade un flux
+
+        Args:
+            stream: Objet avec une méthode read(n) (synchrone ou asynchrone).
+                Avec un point de reprise, le flux doit commencer à
+                checkpoint.first_missing() * part_size
+            file_size: Taille totale en octets
+            file_name: Nom du fichier
+            file_id: Identifiant d'upload (aléatoire par défaut)
+            checkpoint: UploadCheckpoint optionnel (big files uniquement)
+            progress_callback: Appelé avec (octets envoyés, total) après chaque part
+
+        Returns:
+            InputFile ou InputFileBig à passer à send_file()
+        """
+        big = self.is_resumable(file_size)
+        total_parts = self.total_parts(file_size)
+        if checkpoint is not None and not big:
+            checkpoint = None
+        if checkpoint is not None:
+            if checkpoint.part_size != self.part_size or checkpoint.total_parts != total_parts:
+                raise UploadError("Point de reprise incompatible avec la taille des parts")
+            file_id = checkpoint.upload_file_id
+        elif file_id is None:
+            file_id = random.randrange(-2 ** 63, 2 ** 63)
+        start_part = checkpoint.first_missing() if checkpoint is not None else 0
+        md5 = None if big else hashlib.md5()
+        sent_bytes = min(file_size, len(checkpoint.acked) * self.part_size) if checkpoint else 0
+        connections = self.sink.connections
+        queue: asyncio.Queue = asyncio.Queue(maxsize=connections * self.parts_per_connection)
+
+        async def worker(connection: int) -> None:
+            nonlocal sent_bytes
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    part_index, data = item
+                    await self.sink.save_part(file_id, part_index, total_parts, data, big, connection)
+                    if checkpoint is not None:
+                        checkpoint.ack(part_index)
+                    sent_bytes += len(data)
+                    if progress_callback is not None:
+                        progress_callback(sent_bytes, file_size)
+                finally:
+                    queue.task_done()
+
+        await self.sink.open()
+        workers = [asyncio.create_task(worker(i)) for i in range(connections)]
+        try:
+            for part_index in range(start_part, total_parts):
+                data = stream.read(self.part_size)
+                if asyncio.iscoroutine(data) or isinstance(data, asyncio.Future):
+                    data = await data
+                expected = min(self.part_size, file_size - part_index * self.part_size)
+                if len(data) != expected:
+                    raise UploadError(
+                        f"Part {part_index}: {len(data)} octets lus au lieu de {expected}"
+                    )
+                if md5 is not None:
+                    md5.update(data)
+                if checkpoint is not None and checkpoint.is_acked(part_index):
+                    continue
+                await self._put(queue, (part_index, data), workers)
+            for _ in workers:
+                await self._put(queue, None, workers)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            if checkpoint is not None:
+                # Dernier lot de parts acquittées, pour reprendre après un échec
+                checkpoint.flush()
+            await self.sink.close()
+
+        if checkpoint is not None:
+            checkpoint.complete()
+        resumed = f", reprise à la part {start_part}" if start_part else ""
+        logger.info(
+            f"Upload parallèle terminé: {file_name} ({total_parts} parts, {connections} connexions{resumed})"
+        )
+        if big:
+            return InputFileBig(file_id, total_parts, file_name)
+        return InputFile(file_id, total_parts, file_name, md5.hexdigest())
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, item, workers: List[asyncio.Task]) -> None:
+        """Ajoute une part à la file, en remontant l'erreur d'un worker éventuel"""
+        put = asyncio.ensure_future(queue.put(item))
+        try:
+            while True:
+                for task in workers:
+                    if task.done() and not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+                running = [task for task in workers if not task.done()]
+                done, _ = await asyncio.wait([put, *running], return_when=asyncio.FIRST_COMPLETED)
+                if put in done:
+                    return
+        finally:
+            if not put.done():
+                put.cancel()
@@ -0,0 +1,267 @@
+"""
+Mise à jour en place des aperçus de brouillon.
+
+Auparavant, chaque modification d'un fichier du brouillon (réactions,
+bouton URL, thumbnail) supprimait l'aperçu puis renvoyait tout le média :
+deux appels, un renvoi du fichier et un chat réordonné. L'état affiché de
+chaque aperçu est mémorisé ; le nouvel état est comparé à l'ancien et seul
+ce qui a changé est modifié :
+
+- clavier seul          -> edit_message_reply_markup
+- légende (+ clavier)   -> edit_message_caption
+- texte (+ clavier)     -> edit_message_text
+- thumbnail             -> edit_message_media
+
+Le renvoi complet ne sert plus qu'en repli (message supprimé, type changé).
+PreviewRefresher regroupe les modifications rapprochées d'un même aperçu en
+un seul rendu.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import InlineKeyboardMarkup, InputMediaDocument, InputMediaVideo
+from telegram.error import BadRequest
+
+from .clock import get_clock
+
+logger = logging.getLogger('TelegramBot')
+
+
+def preview_state(post: Dict[str, Any], reply_markup: Optional[InlineKeyboardMarkup],
+                  placeholder: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Décrit ce qu'affiche l'aperçu d'un post
+
+    Args:
+        post: Post du brouillon
+        reply_markup: Clavier de l'aperçu
+        placeholder: Texte affiché à la place du média (fichier trop volumineux)
+
+    Returns:
+        Dict[str, Any]: État comparable (et sérialisable)
+    """
+    if placeholder is not None:
+        kind, content, caption, thumbnail = "placeholder", placeholder, None, None
+    else:
+        kind = post.get("type")
+        content = post.get("content")
+        caption = post.get("caption") if kind != "text" else None
+        thumbnail = post.get("thumbnail") if kind in ("video", "document") else None
+    return {
+        "kind": kind,
+        "content": content,
+        "caption": caption,
+        "thumbnail": thumbnail,
+        "markup": reply_markup.to_dict() if reply_markup else None
+    }
+
+
+async def render_preview(bot, chat_id: int, previous: Optional[Dict[str, Any]],
+                         state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Affiche un aperçu en modifiant uniquement ce qui a changé
+
+    Args:
+        bot: Bot de l'application
+        chat_id: Chat de l'aperçu
+        previous: Entrée précédente de preview_messages (message_id, chat_id, state)
+        state: Nouvel état (preview_state)
+
+    Returns:
+        Dict[str, Any]: Nouvelle entrée pour preview_messages
+    """
+    old_state = (previous or {}).get("state")
+    if previous and old_state and _editable(old_state, state):
+        try:
+            await _edit_changes(bot, previous["chat_id"], previous["message_id"], old_state, state)
+            return {**previous, "state": state}
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return {**previous, "state": state}
+            logger.info(f"Modification de l'aperçu impossible ({e}), nouvel envoi")
+        except Exception as e:
+            logger.info(f"Modification de l'aperçu impossible ({e}), nouvel envoi")
+
+    # Repli : remplacement complet de l'aperçu
+    if previous:
+        try:
+            await bot.delete_message(chat_id=previous["chat_id"], message_id=previous["message_id"])
+        except Exception:
+            pass
+    sent_message = await _send(bot, chat_id, state)
+    return {"message_id": sent_message.message_id, "chat_id": chat_id, "state": state}
+
+
+def _editable(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """Un texte se modifie en place ; un média ne change pas de fichier sans renvoi"""
+    if old["kind"] != new["kind"]:
+        return False
+    return new["kind"] in ("text", "placeholder") or old["content"] == new["content"]
+
+
+async def _edit_changes(bot, chat_id: int, message_id: int,
+                        old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    markup = InlineKeyboardMarkup.de_json(new["markup"], bot) if new["markup"] else None
+    kind = new["kind"]
+
+    if kind in ("video", "document") and old["thumbnail"] != new["thumbnail"]:
+        media_class = InputMediaVideo if kind == "video" else InputMediaDocument
+        media = media_class(media=new["content"], caption=new["caption"], thumbnail=new["thumbnail"])
+        await bot.edit_message_media(chat_id=chat_id, message_id=message_id, media=media, reply_markup=markup)
+    elif kind in ("text", "placeholder") and old["content"] != new["content"]:
+        await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=new["content"],
+                                    reply_markup=markup)
+    elif old["caption"] != new["caption"]:
+        await bot.edit_message_caption(chat_id=chat_id, message_id=message_id, caption=new["caption"],
+                                       reply_markup=markup)
+    elif old["markup"] != new["markup"]:
+        await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=markup)
+
+
+async def _send(bot, chat_id: int, state: Dict[str, Any]):
+    markup = InlineKeyboardMarkup.de_json(state["markup"], bot) if state["markup"] else None
+    kind = state["kind"]
+    if kind == "photo":
+        return await bot.send_photo(chat_id=chat_id, photo=state["content"], caption=state["caption"],
+                                    reply_markup=markup)
+    if kind in ("video", "document"):
+        kwargs = {'chat_id': chat_id, kind: state["content"], 'caption': state["caption"], 'reply_markup': markup}
+        if state["thumbnail"]:
+            kwargs['thumbnail'] = state["thumbnail"]
+        if kind == "video":
+            return await bot.send_video(**kwargs)
+        return await bot.send_document(**kwargs)
+    return await bot.send_message(chat_id=chat_id, text=state["content"], reply_markup=markup)
+
+
+async def update_post_preview(context, chat_id: int, post_index: int,
+                              reply_markup: Optional[InlineKeyboardMarkup],
+                              placeholder: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Met à jour l'aperçu d'un post du brouillon et l'enregistre dans preview_messages
+
+    Args:
+        context: Contexte du handler (user_data['posts'] et ['preview_messages'])
+        chat_id: Chat de l'aperçu
+        post_index: Index du post dans le brouillon
+        reply_markup: Clavier de l'aperçu
+        placeholder: Texte affiché à la place du média (fichier trop volumineux)
+    """
+    post = context.user_data['posts'][post_index]
+    previews = context.user_data.setdefault('preview_messages', {})
+    state = preview_state(post, reply_markup, placeholder)
+    previews[post_index] = await render_preview(context.bot, chat_id, previews.get(post_index), state)
+    return previews[post_index]
+
+
+class PreviewRefresher:
+    """
+    Rafraîchissement différé et fusionné des aperçus, par post du brouillon
+
+    Chaque modification marque l'aperçu comme à rafraîchir ; le rendu n'a lieu
+    qu'après une courte période sans nouvelle modification, une seule fois
+    pour toutes les modifications rapprochées. Les rendus d'un même aperçu
+    sont sérialisés : preview_messages n'est plus modifié en concurrence.
+
+    Un rendu différé ne vaut que pour le post qui l'a demandé : si le
+    brouillon a changé entre-temps (post supprimé, index décalé), il est
+    abandonné plutôt que d'afficher un autre post avec un clavier périmé.
+    """
+
+    def __init__(self, quiet_period: float = 0.8):
+        """
+        Initialise le planificateur
+
+        Args:
+            quiet_period: Délai sans modification avant le rendu (secondes)
+        """
+        self.quiet_period = quiet_period
+        self._latest: Dict[tuple, tuple] = {}
+        self._deadlines: Dict[tuple, float] = {}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+        # Verrou de rendu et nombre de rendus qui l'utilisent, par aperçu
+        self._locks: Dict[tuple, list] = {}
+        self.requests = 0
+        self.renders = 0
+
+    def schedule(self, context, chat_id: int, post_index: int,
+                 build: Callable[[], Awaitable[Tuple[Optional[InlineKeyboardMarkup], Optional[str]]]]) -> None:
+        """
+        Marque un aperçu à rafraîchir
+
+        Args:
+            context: Contexte du handler
+            chat_id: Chat de l'aperçu
+            post_index: Index du post dans le brouillon
+            build: Coroutine retournant (clavier, texte de remplacement) au moment du rendu
+        """
+        key = (chat_id, post_index)
+        posts = context.user_data.get('posts', [])
+        post = posts[post_index] if post_index < len(posts) else None
+        self.requests += 1
+        self._latest[key] = (context, build, post)
+        self._deadlines[key] = get_clock().monotonic() + self.quiet_period
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            self._tasks[key] = asyncio.ensure_future(self._wait_and_render(key))
+
+    async def flush(self, chat_id: int, post_index: Optional[int] = None) -> None:
+        """Effectue immédiatement les rendus en attente d'un chat (ou d'un seul post)"""
+        keys = [key for key in list(self._latest)
+                if key[0] == chat_id and (post_index is None or key[1] == post_index)]
+        for key in keys:
+            self._deadlines[key] = 0.0
+            await self._render(key)
+
+    async def _wait_and_render(self, key: tuple) -> None:
+        clock = get_clock()
+        try:
+            while key in self._latest:
+                delay = self._deadlines.get(key, 0.0) - clock.monotonic()
+                if delay > 0:
+                    await clock.sleep(delay)
+                    continue
+                await self._render(key)
+        finally:
+            self._tasks.pop(key, None)
+
+    async def _render(self, key: tuple) -> None:
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._render_latest(key)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                # Plus aucun rendu en cours ni en attente pour cet aperçu
+                del self._locks[key]
+
+    async def _render_latest(self, key: tuple) -> None:
+        context, build, post = self._latest.pop(key, (None, None, None))
+        self._deadlines.pop(key, None)
+        if context is None:
+            return
+        chat_id, post_index = key
+        posts = context.user_data.get('posts', [])
+        if post is None or post_index >= len(posts) or posts[post_index] is not post:
+            logger.info(f"Aperçu {post_index} abandonné : le brouillon a changé entre-temps")
+            return
+        try:
+            reply_markup, placeholder = await build()
+            await update_post_preview(context, chat_id, post_index, reply_markup, placeholder)
+            self.renders += 1
+        except Exception as e:
+            logger.error(f"Erreur lors du rafraîchissement de l'aperçu {post_index}: {e}")
+
+
+_refresher: Optional[PreviewRefresher] = None
+
+
+def get_preview_refresher() -> PreviewRefresher:
+    """Retourne le planificateur de rafraîchissement partagé"""
+    global _refresher
+    if _refresher is None:
+        _refresher = PreviewRefresher()
+    return _refresher
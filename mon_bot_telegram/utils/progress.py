@@ -0,0 +1,157 @@
+"""
+Suivi de progression des gros transferts.
+
+DebouncedEditor met à jour un message de statut au plus une fois par
+intervalle : les mises à jour intermédiaires sont fusionnées (seul le
+dernier texte est envoyé) et un texte identique n'est jamais renvoyé.
+Les modifications de progression consomment ainsi très peu du quota
+anti-flood du chat. TransferProgress convertit les callbacks de progression
+(Telethon, relais en flux) en pourcentage, débit et temps restant.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from telegram.error import BadRequest, RetryAfter
+
+from .clock import get_clock
+
+logger = logging.getLogger('TelegramBot')
+
+
+class DebouncedEditor:
+    """Édite un message au plus une fois par intervalle, en fusionnant les mises à jour"""
+
+    def __init__(self, edit: Callable[[str], Awaitable[None]], min_interval: float = 3.0):
+        """
+        Initialise l'éditeur
+
+        Args:
+            edit: Coroutine qui applique un texte (ex: message.edit_text)
+            min_interval: Délai minimum entre deux modifications (secondes)
+        """
+        self._edit = edit
+        self.min_interval = min_interval
+        self._pending: Optional[str] = None
+        self._last_text: Optional[str] = None
+        self._next_allowed = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.edits = 0
+
+    def update(self, text: str) -> None:
+        """Programme un nouveau texte (remplace toute mise à jour non envoyée)"""
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def flush(self, text: Optional[str] = None) -> None:
+        """Envoie immédiatement le dernier texte (fin de transfert)"""
+        if text is not None:
+            self._pending = text
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._send()
+
+    async def _run(self) -> None:
+        clock = get_clock()
+        while self._pending is not None:
+            delay = self._next_allowed - clock.monotonic()
+            if delay > 0:
+                await clock.sleep(delay)
+            await self._send()
+
+    async def _send(self) -> None:
+        text, self._pending = self._pending, None
+        if text is None or text == self._last_text:
+            return
+        clock = get_clock()
+        try:
+            await self._edit(text)
+            self._last_text = text
+            self.edits += 1
+            self._next_allowed = clock.monotonic() + self.min_interval
+        except RetryAfter as e:
+            # Quota dépassé malgré tout : on attend et on garde le texte le plus récent
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+            self._next_allowed = clock.monotonic() + retry_after
+            if self._pending is None:
+                self._pending = text
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Mise à jour de la progression impossible: {e}")
+            self._last_text = text
+        except Exception as e:
+            logger.warning(f"Mise à jour de la progression impossible: {e}")
+
+
+def _format_size(num_bytes: float) -> str:
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if num_bytes < 1024 or unit == "Go":
+            return f"{num_bytes:.1f} {unit}" if unit != "o" else f"{int(num_bytes)} {unit}"
+        num_bytes /= 1024
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}"
+    if seconds >= 60:
+        return f"{seconds // 60}min{seconds % 60:02d}"
+    return f"{seconds}s"
+
+
+class TransferProgress:
+    """Callback de progression affichant pourcentage, débit et temps restant"""
+
+    def __init__(self, editor: DebouncedEditor, label: str = "Upload", smoothing: float = 0.3):
+        """
+        Initialise le suivi
+
+        Args:
+            editor: Éditeur du message de statut
+            label: Libellé du transfert
+            smoothing: Coefficient de lissage du débit (moyenne exponentielle)
+        """
+        self.editor = editor
+        self.label = label
+        self.smoothing = smoothing
+        self._start = get_clock().monotonic()
+        self._last_time = self._start
+        self._last_bytes = 0
+        self._rate: Optional[float] = None
+
+    def __call__(self, current: int, total: int) -> None:
+        """Signature des progress_callback de Telethon (current, total)"""
+        now = get_clock().monotonic()
+        elapsed = now - self._last_time
+        if elapsed >= 0.5:
+            instant = (current - self._last_bytes) / elapsed
+            if self._rate is None:
+                self._rate = instant
+            else:
+                self._rate = self.smoothing * instant + (1 - self.smoothing) * self._rate
+            self._last_time = now
+            self._last_bytes = current
+        self.editor.update(self.render(current, total))
+
+    def render(self, current: int, total: int) -> str:
+        percent = current * 100 / total if total else 0
+        filled = int(percent // 10)
+        text = (
+            f"⏳ {self.label} en cours...\n"
+            f"[{'█' * filled}{'░' * (10 - filled)}] {percent:.0f}%\n"
+            f"{_format_size(current)} / {_format_size(total)}"
+        )
+        if self._rate:
+            text += f"\n🚀 {_format_size(self._rate)}/s"
+            if total and current < total:
+                text += f" — ⏱️ {_format_duration((total - current) / self._rate)} restantes"
+        return text
+
+    async def finish(self, text: str) -> None:
+        """Affiche le message final immédiatement"""
+        await self.editor.flush(text)
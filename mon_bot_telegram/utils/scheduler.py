@@ -9,6 +9,7 @@ from pytz import timezone
 import asyncio
 
 from .error_handler import BotError, handle_error
+from .clock import SystemClock, get_clock
 
 logger = logging.getLogger('TelegramBot')
 
@@ -19,11 +20,20 @@ class SchedulerError(BotError):
 class SchedulerManager:
     """Gestionnaire de tâches planifiées"""
     
-    def __init__(self, timezone_str: str = "UTC"):
-        """Initialise le gestionnaire de tâches"""
+    def __init__(self, timezone_str: str = "UTC", clock: Optional[SystemClock] = None):
+        """
+        Initialise le gestionnaire de tâches
+
+        Args:
+            timezone_str: Fuseau horaire du scheduler
+            clock: Horloge à utiliser (horloge active par défaut). Avec une
+                SimulatedClock, les tâches sont confiées à l'horloge et
+                APScheduler n'est jamais démarré.
+        """
         try:
             # Configuration minimale sans options avancées
             self.timezone = timezone(timezone_str)
+            self.clock = clock or get_clock()
             self.scheduler = AsyncIOScheduler(timezone=self.timezone)
             
             self.logger = logging.getLogger('SchedulerManager')
@@ -38,7 +48,8 @@ class SchedulerManager:
         """Démarre le scheduler"""
         try:
             if not self.running:
-                self.scheduler.start()
+                if not self.clock.simulated:
+                    self.scheduler.start()
                 self.running = True
                 logger.info("Scheduler démarré")
         except Exception as e:
@@ -48,7 +59,9 @@ class SchedulerManager:
     def stop(self) -> None:
         """Arrête le scheduler"""
         try:
-            self.scheduler.shutdown()
+            if self.scheduler.running:
+                self.scheduler.shutdown()
+            self.running = False
             logger.info("Scheduler arrêté")
         except Exception as e:
             logger.error(f"Erreur lors de l'arrêt du scheduler: {e}")
@@ -76,6 +89,11 @@ class SchedulerManager:
             bool: True si la tâche a été planifiée
         """
         try:
+            if self.clock.simulated:
+                self.clock.schedule(run_date, func, *args, job_id=task_id, **kwargs)
+                logger.debug(f"Tâche {task_id} planifiée (horloge simulée) pour {run_date}")
+                return True
+
             # Vérifie si la tâche existe déjà
             if self.scheduler.get_job(task_id):
                 logger.warning(f"Tâche {task_id} déjà existante, remplacement...")
@@ -158,6 +176,9 @@ class SchedulerManager:
             bool: True si la tâche a été replanifiée
         """
         try:
+            if self.clock.simulated:
+                raise SchedulerError("Replanification non supportée avec l'horloge simulée: utilisez schedule_task")
+
             job = self.scheduler.get_job(task_id)
             if not job:
                 raise JobLookupError(f"Tâche {task_id} non trouvée")
@@ -186,6 +207,9 @@ class SchedulerManager:
             bool: True si la tâche a été annulée
         """
         try:
+            if self.clock.simulated:
+                return self.clock.cancel(task_id)
+
             self.scheduler.remove_job(task_id)
             logger.info(f"Tâche {task_id} annulée")
             return True
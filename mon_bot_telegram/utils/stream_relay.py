@@ -0,0 +1,233 @@
+"""
+Relais en flux entre le téléchargement et l'upload du userbot.
+
+Au lieu d'écrire le fichier complet sur disque avant de le renvoyer, les
+morceaux téléchargés (iter_download) alimentent un tampon circulaire borné
+en mémoire que l'upload (upload_file) consomme en même temps. La mémoire
+reste limitée à la taille du tampon et la durée totale tend vers
+max(téléchargement, upload) au lieu de leur somme.
+
+Avec un stockage de points de reprise, une nouvelle tentative reprend le
+téléchargement et l'upload à la première part non acquittée.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Optional, Union
+
+from telethon.tl.types import DocumentAttributeFilename
+
+from .parallel_upload import ParallelUploader, SinkUnavailable, TelethonPartSink
+from .transfer_checkpoint import UploadCheckpoint
+
+logger = logging.getLogger('TelegramBot')
+
+
+class RingBuffer:
+    """Tampon circulaire d'octets borné (un producteur, un consommateur)"""
+
+    def __init__(self, capacity: int):
+        """
+        Initialise le tampon
+
+        Args:
+            capacity: Taille maximum en octets
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._condition = asyncio.Condition()
+
+    async def write(self, data: bytes) -> None:
+        """Ajoute des octets, en attendant de la place si le tampon est plein"""
+        view = memoryview(data)
+        async with self._condition:
+            while view:
+                await self._condition.wait_for(
+                    lambda: self._size < self.capacity or self._error is not None
+                )
+                if self._error is not None:
+                    raise self._error
+                end = (self._start + self._size) % self.capacity
+                count = min(len(view), self.capacity - self._size, self.capacity - end)
+                self._buffer[end:end + count] = view[:count]
+                self._size += count
+                view = view[count:]
+                self._condition.notify_all()
+
+    async def read(self, size: int) -> bytes:
+        """
+        Lit exactement `size` octets (moins uniquement en fin de flux)
+
+        Returns:
+            bytes: Données lues, b'' en fin de flux
+        """
+        size = min(size, self.capacity)
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._size >= size or self._closed or self._error is not None
+            )
+            if self._error is not None:
+                raise self._error
+            count = min(size, self._size)
+            first = min(count, self.capacity - self._start)
+            data = bytes(self._buffer[self._start:self._start + first])
+            if count > first:
+                data += bytes(self._buffer[:count - first])
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+            self._condition.notify_all()
+            return data
+
+    async def close(self, error: Optional[BaseException] = None) -> None:
+        """Signale la fin du flux (ou une erreur au consommateur)"""
+        async with self._condition:
+            self._closed = True
+            if error is not None:
+                self._error = error
+            self._condition.notify_all()
+
+
+class _BufferReader:
+    """Objet fichier asynchrone lu par TelegramClient.upload_file"""
+
+    def __init__(self, buffer: RingBuffer, name: Optional[str]):
+        self._buffer = buffer
+        self.name = name
+
+    async def read(self, size: int = -1) -> bytes:
+        return await self._buffer.read(size if size > 0 else self._buffer.capacity)
+
+
+class StreamRelay:
+    """Renvoie un média Telegram via le userbot sans passer par le disque"""
+
+    def __init__(self, userbot, buffer_size: int = 8 * 1024 * 1024, chunk_size: int = 512 * 1024,
+                 upload_connections: int = 1, checkpoint_store=None):
+        """
+        Initialise le relais
+
+        Args:
+            userbot: Client Telethon connecté
+            buffer_size: Taille du tampon mémoire en octets
+            chunk_size: Taille des morceaux téléchargés et uploadés (512 Ko max)
+            upload_connections: Connexions MTProto parallèles pour l'upload
+            checkpoint_store: Stockage des points de reprise (ex: DatabaseManager)
+        """
+        self.userbot = userbot
+        self.chunk_size = min(chunk_size, 512 * 1024)
+        self.buffer_size = max(buffer_size, 2 * self.chunk_size)
+        self.upload_connections = max(1, upload_connections)
+        self.checkpoint_store = checkpoint_store
+
+    async def relay(
+        self,
+        message,
+        chat: Union[str, int],
+        caption: Optional[str] = None,
+        file_name: Optional[str] = None,
+        checkpoint_key: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], Any]] = None
+    ) -> Any:
+        """
+        Télécharge et renvoie en parallèle le document d'un message
+
+        Args:
+            message: Message Telethon contenant le document source
+            chat: Chat cible
+            caption: Légende
+            file_name: Nom du fichier envoyé (nom d'origine par défaut)
+            checkpoint_key: Clé du point de reprise (file_unique_id)
+            progress_callback: Appelé avec (octets envoyés, total) pendant l'upload
+
+        Returns:
+            Message Telethon publié
+        """
+        document = message.document
+        if document is None:
+            raise ValueError("Le message ne contient pas de document à relayer")
+
+        if not file_name:
+            file_name = next(
+                (attr.file_name for attr in document.attributes
+                 if isinstance(attr, DocumentAttributeFilename)),
+                None
+            )
+
+        uploader = None
+        checkpoint = None
+        if self.upload_connections > 1 or self.checkpoint_store is not None:
+            uploader = ParallelUploader(
+                TelethonPartSink(self.userbot, self.upload_connections),
+                part_size=self.chunk_size
+            )
+            if self.checkpoint_store is not None and uploader.is_resumable(document.size):
+                checkpoint = UploadCheckpoint.load_or_create(
+                    self.checkpoint_store,
+                    checkpoint_key or f"doc_{document.id}",
+                    self.chunk_size,
+                    uploader.total_parts(document.size)
+                )
+
+        # Le téléchargement démarre à la première part non acquittée
+        offset = checkpoint.first_missing() * self.chunk_size if checkpoint else 0
+        buffer = RingBuffer(self.buffer_size)
+        producer = asyncio.create_task(self._produce(message, buffer, offset))
+        try:
+            reader = _BufferReader(buffer, file_name)
+            if uploader is not None:
+                try:
+                    input_file = await uploader.upload(
+                        reader, document.size, file_name or "file", checkpoint=checkpoint,
+                        progress_callback=progress_callback
+                    )
+                except SinkUnavailable as e:
+                    # Rien n'a été lu : upload_file reprend au début du fichier
+                    logger.warning(f"Upload parallèle indisponible, repli sur upload_file: {e}")
+                    producer.cancel()
+                    uploader = None
+                    buffer = RingBuffer(self.buffer_size)
+                    reader = _BufferReader(buffer, file_name)
+                    producer = asyncio.create_task(self._produce(message, buffer))
+            if uploader is None:
+                input_file = await self.userbot.upload_file(
+                    reader,
+                    file_size=document.size,
+                    file_name=file_name,
+                    part_size_kb=self.chunk_size // 1024,
+                    progress_callback=progress_callback
+                )
+            await producer
+        except BaseException:
+            producer.cancel()
+            raise
+
+        # Conserver les attributs d'origine (vidéo, durée, dimensions) avec le nouveau nom
+        attributes = [
+            attr for attr in document.attributes
+            if not isinstance(attr, DocumentAttributeFilename)
+        ]
+        if file_name:
+            attributes.append(DocumentAttributeFilename(file_name))
+
+        logger.info(f"Fichier relayé en flux ({document.size} octets) vers {chat}")
+        return await self.userbot.send_file(
+            chat,
+            input_file,
+            caption=caption,
+            attributes=attributes,
+            mime_type=document.mime_type
+        )
+
+    async def _produce(self, message, buffer: RingBuffer, offset: int = 0) -> None:
+        try:
+            async for chunk in self.userbot.iter_download(
+                message.media, offset=offset, request_size=self.chunk_size
+            ):
+                await buffer.write(chunk)
+        except BaseException as e:
+            await buffer.close(e)
+            raise
+        await buffer.close()
@@ -0,0 +1,142 @@
+"""
+Points de reprise des gros uploads du userbot.
+
+Chaque part acquittée par Telegram est enregistrée pour le fichier (clé :
+file_unique_id). Si le transfert échoue, la tentative suivante réutilise le
+même identifiant d'upload et reprend à la première part manquante. Les
+parts acquittées sont écrites par lots (toutes les `save_every` parts ou
+toutes les `save_interval` secondes) puis une dernière fois à la fin de
+l'upload, réussi ou non : au pire, un arrêt brutal fait renvoyer les parts
+du dernier lot.
+"""
+import logging
+import random
+from typing import Iterable, List, Optional, Set
+
+from .clock import get_clock
+
+logger = logging.getLogger('TelegramBot')
+
+# Telegram ne conserve les parts uploadées que pendant un temps limité
+DEFAULT_MAX_AGE = 3600
+# Écriture du point de reprise : au plus tard toutes les N parts ou toutes les N secondes
+DEFAULT_SAVE_EVERY = 64
+DEFAULT_SAVE_INTERVAL = 5.0
+
+
+def encode_parts(parts: Iterable[int]) -> str:
+    """Encode un ensemble de parts en plages compactes ('0-15,17,20-31')"""
+    ranges: List[str] = []
+    start = previous = None
+    for part in sorted(parts):
+        if start is None:
+            start = previous = part
+        elif part == previous + 1:
+            previous = part
+        else:
+            ranges.append(f"{start}-{previous}" if previous != start else str(start))
+            start = previous = part
+    if start is not None:
+        ranges.append(f"{start}-{previous}" if previous != start else str(start))
+    return ",".join(ranges)
+
+
+def decode_parts(encoded: Optional[str]) -> Set[int]:
+    """Décode une liste de plages produite par encode_parts"""
+    parts: Set[int] = set()
+    for chunk in (encoded or "").split(","):
+        if not chunk:
+            continue
+        if "-" in chunk:
+            start, end = chunk.split("-")
+            parts.update(range(int(start), int(end) + 1))
+        else:
+            parts.add(int(chunk))
+    return parts
+
+
+class UploadCheckpoint:
+    """
+    État de reprise d'un upload
+
+    Le stockage (`store`) doit fournir get_upload_checkpoint(key),
+    save_upload_checkpoint(key, upload_file_id, part_size, total_parts, acked_parts,
+    updated_at)
+    et delete_upload_checkpoint(key), comme DatabaseManager.
+    """
+
+    def __init__(self, store, key: str, upload_file_id: int, part_size: int,
+                 total_parts: int, acked: Optional[Set[int]] = None,
+                 save_every: int = DEFAULT_SAVE_EVERY, save_interval: float = DEFAULT_SAVE_INTERVAL):
+        self.store = store
+        self.key = key
+        self.upload_file_id = upload_file_id
+        self.part_size = part_size
+        self.total_parts = total_parts
+        self.acked: Set[int] = set(acked or ())
+        self.save_every = max(1, save_every)
+        self.save_interval = save_interval
+        # Parts acquittées pas encore écrites et date de la dernière écriture
+        self._unsaved = 0
+        self._saved_at = get_clock().monotonic()
+
+    @classmethod
+    def load_or_create(cls, store, key: str, part_size: int, total_parts: int,
+                       max_age: int = DEFAULT_MAX_AGE) -> "UploadCheckpoint":
+        """
+        Recharge le point de reprise d'un fichier, ou en crée un nouveau
+
+        Un point de reprise trop ancien ou incompatible (taille de part
+        différente) est ignoré : Telegram a pu oublier les parts.
+        """
+        row = store.get_upload_checkpoint(key)
+        if row:
+            age = get_clock().time() - row["updated_at"]
+            if (row["part_size"] == part_size and row["total_parts"] == total_parts
+                    and age <= max_age):
+                checkpoint = cls(store, key, row["upload_file_id"], part_size, total_parts,
+                                 decode_parts(row["acked_parts"]))
+                logger.info(
+                    f"Reprise de l'upload {key}: {len(checkpoint.acked)}/{total_parts} parts déjà envoyées"
+                )
+                return checkpoint
+            store.delete_upload_checkpoint(key)
+
+        checkpoint = cls(store, key, random.randrange(-2 ** 63, 2 ** 63), part_size, total_parts)
+        checkpoint._save()
+        return checkpoint
+
+    def first_missing(self) -> int:
+        """Index de la première part non acquittée"""
+        part = 0
+        while part in self.acked:
+            part += 1
+        return part
+
+    def is_acked(self, part_index: int) -> bool:
+        return part_index in self.acked
+
+    def ack(self, part_index: int) -> None:
+        """Enregistre une part acquittée par le serveur (écrite avec le lot suivant)"""
+        self.acked.add(part_index)
+        self._unsaved += 1
+        if (self._unsaved >= self.save_every
+                or get_clock().monotonic() - self._saved_at >= self.save_interval):
+            self._save()
+
+    def flush(self) -> None:
+        """Écrit les parts acquittées depuis la dernière écriture (fin ou échec de l'upload)"""
+        if self._unsaved:
+            self._save()
+
+    def complete(self) -> None:
+        """Supprime le point de reprise une fois l'upload finalisé"""
+        self.store.delete_upload_checkpoint(self.key)
+
+    def _save(self) -> None:
+        self.store.save_upload_checkpoint(
+            self.key, self.upload_file_id, self.part_size, self.total_parts,
+            encode_parts(self.acked), get_clock().time()
+        )
+        self._unsaved = 0
+        self._saved_at = get_clock().monotonic()
@@ -0,0 +1,180 @@
+"""
+Régulation des transferts de gros fichiers.
+
+Chaque transfert (téléchargement, relais ou upload du userbot) est admis
+selon les octets déjà en vol et l'espace disque réservé, et non selon un
+simple nombre de tâches : plusieurs fichiers de 2 Go ne peuvent plus saturer
+ensemble le disque et la bande passante. Les transferts en attente sont
+servis à tour de rôle par utilisateur, et chacun peut connaître sa position
+dans la file.
+"""
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+logger = logging.getLogger('TelegramBot')
+
+
+class TransferTicket:
+    """Demande de transfert en attente ou admise"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, owner: Hashable, size: int, disk_bytes: int,
+                 on_wait: Optional[Callable[[Optional[int]], Awaitable[None]]] = None):
+        self.id = next(self._ids)
+        self.owner = owner
+        self.size = max(0, size or 0)
+        self.disk_bytes = max(0, disk_bytes or 0)
+        self.on_wait = on_wait
+        self.position: Optional[int] = None
+        self.admitted = asyncio.Event()
+
+
+class TransferGovernor:
+    """Admission des transferts par budget d'octets, équitable par utilisateur"""
+
+    def __init__(self, max_bytes_in_flight: int, max_disk_bytes: int):
+        """
+        Initialise le régulateur
+
+        Args:
+            max_bytes_in_flight: Octets maximum transférés simultanément
+            max_disk_bytes: Espace disque maximum réservé simultanément
+        """
+        self.max_bytes_in_flight = max_bytes_in_flight
+        self.max_disk_bytes = max_disk_bytes
+        self.bytes_in_flight = 0
+        self.disk_reserved = 0
+        self.active: Dict[int, TransferTicket] = {}
+        # File par utilisateur, parcourue à tour de rôle
+        self._queues: "OrderedDict[Hashable, Deque[TransferTicket]]" = OrderedDict()
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        owner: Hashable,
+        size: int,
+        disk_bytes: int = 0,
+        on_wait: Optional[Callable[[Optional[int]], Awaitable[None]]] = None
+    ) -> AsyncIterator[TransferTicket]:
+        """
+        Attend l'admission d'un transfert puis libère son budget à la fin
+
+        Args:
+            owner: Utilisateur à l'origine du transfert
+            size: Octets transférés
+            disk_bytes: Espace disque utilisé pendant le transfert
+            on_wait: Coroutine appelée avec la position dans la file (1 = prochain)
+                à la mise en attente puis à chaque changement de position, et
+                avec None à l'admission d'un transfert qui a attendu
+
+        Yields:
+            TransferTicket: Ticket admis
+        """
+        ticket = TransferTicket(owner, size, disk_bytes, on_wait)
+        self._queues.setdefault(owner, deque()).append(ticket)
+        self._admit_waiting()
+        try:
+            if not ticket.admitted.is_set():
+                logger.info(
+                    f"Transfert {ticket.id} en attente ({ticket.size} octets, "
+                    f"{self.bytes_in_flight}/{self.max_bytes_in_flight} en vol)"
+                )
+                await self._notify_positions()
+                await ticket.admitted.wait()
+                await self._notify_admitted(ticket)
+        except BaseException:
+            if not ticket.admitted.is_set():
+                self._remove_waiting(ticket)
+                self._admit_waiting()
+                await self._notify_positions()
+                raise
+            self._release(ticket)
+            raise
+
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def queue_position(self, owner: Hashable) -> Optional[int]:
+        """Position du premier transfert en attente d'un utilisateur (1 = prochain)"""
+        for position, ticket in enumerate(self._waiting_order(), 1):
+            if ticket.owner == owner:
+                return position
+        return None
+
+    def _waiting_order(self) -> List[TransferTicket]:
+        """Ordre de service des transferts en attente (tour de rôle par utilisateur)"""
+        queues = [list(queue) for queue in self._queues.values()]
+        order = []
+        for rank in range(max((len(queue) for queue in queues), default=0)):
+            order.extend(queue[rank] for queue in queues if rank < len(queue))
+        return order
+
+    def _fits(self, ticket: TransferTicket) -> bool:
+        # Un transfert plus gros que le budget passe seul
+        if not self.active:
+            return True
+        return (self.bytes_in_flight + ticket.size <= self.max_bytes_in_flight
+                and self.disk_reserved + ticket.disk_bytes <= self.max_disk_bytes)
+
+    def _admit_waiting(self) -> None:
+        """Admet les transferts en tête de file tant que le budget le permet"""
+        while self._queues:
+            owner, queue = next(iter(self._queues.items()))
+            ticket = queue[0]
+            if not self._fits(ticket):
+                # Pas de dépassement : l'ordre équitable est conservé
+                break
+            queue.popleft()
+            # L'utilisateur servi passe en fin de tour
+            del self._queues[owner]
+            if queue:
+                self._queues[owner] = queue
+            self.bytes_in_flight += ticket.size
+            self.disk_reserved += ticket.disk_bytes
+            self.active[ticket.id] = ticket
+            ticket.position = None
+            ticket.admitted.set()
+
+    def _remove_waiting(self, ticket: TransferTicket) -> None:
+        queue = self._queues.get(ticket.owner)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.owner]
+
+    def _release(self, ticket: TransferTicket) -> None:
+        if self.active.pop(ticket.id, None) is None:
+            return
+        self.bytes_in_flight -= ticket.size
+        self.disk_reserved -= ticket.disk_bytes
+        self._admit_waiting()
+        if self._queues:
+            asyncio.ensure_future(self._notify_positions())
+
+    async def _notify_admitted(self, ticket: TransferTicket) -> None:
+        """Prévient l'utilisateur que son transfert quitte la file"""
+        if ticket.on_wait is None:
+            return
+        try:
+            await ticket.on_wait(None)
+        except Exception as e:
+            logger.warning(f"Notification d'admission impossible: {e}")
+
+    async def _notify_positions(self) -> None:
+        """Prévient les utilisateurs dont la position dans la file a changé"""
+        for position, ticket in enumerate(self._waiting_order(), 1):
+            if ticket.position == position:
+                continue
+            ticket.position = position
+            if ticket.on_wait is not None:
+                try:
+                    await ticket.on_wait(position)
+                except Exception as e:
+                    logger.warning(f"Notification de position impossible: {e}")
@@ -0,0 +1,84 @@
+"""
+Traitement concurrent des updates, sérialisé par utilisateur et par chat.
+
+Avec le traitement séquentiel par défaut de l'Application, l'envoi d'un
+fichier de 2 Go ou une publication lente bloquait les updates de tous les
+autres utilisateurs. Les updates sont désormais traitées en parallèle,
+mais celles d'un même utilisateur (et d'un même chat) restent traitées une
+à une, dans leur ordre d'arrivée : les étapes d'une conversation ne se
+doublent jamais.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, List, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger('TelegramBot')
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Updates concurrentes entre utilisateurs, séquentielles pour un même utilisateur ou chat"""
+
+    def __init__(self, max_concurrent_updates: int):
+        """
+        Args:
+            max_concurrent_updates: Nombre maximum d'updates traitées simultanément
+        """
+        super().__init__(max_concurrent_updates)
+        # Clé -> [verrou, nombre d'updates qui l'utilisent ou l'attendent]
+        self._locks: Dict[Tuple[str, int], List[Any]] = {}
+
+    @staticmethod
+    def keys_for(update: object) -> List[Tuple[str, int]]:
+        """Clés de sérialisation d'une update, triées (ordre d'acquisition fixe, sans interblocage)"""
+        if not isinstance(update, Update):
+            return []
+        keys = []
+        if update.effective_user is not None:
+            keys.append(("user", update.effective_user.id))
+        if update.effective_chat is not None:
+            keys.append(("chat", update.effective_chat.id))
+        return sorted(keys)
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Attend le tour de l'update pour son utilisateur et son chat, puis une place de traitement
+
+        Une update en attente derrière une autre du même utilisateur n'occupe
+        aucune des max_concurrent_updates places : un utilisateur qui envoie
+        beaucoup d'updates pendant un traitement lent ne bloque pas les autres.
+        """
+        keys = self.keys_for(update)
+        entries = []
+        for key in keys:
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((key, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry[0])
+            await super().process_update(update, coroutine)
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+            for key, entry in entries:
+                entry[1] -= 1
+                if entry[1] == 0 and self._locks.get(key) is entry:
+                    del self._locks[key]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        """Rien à initialiser"""
+
+    async def shutdown(self) -> None:
+        """Rien à libérer"""
+
+    def __len__(self) -> int:
+        """Nombre d'utilisateurs et de chats ayant des updates en cours"""
+        return len(self._locks)
@@ -0,0 +1,257 @@
+"""
+Pool de sessions userbot (comptes Telethon).
+
+Un seul compte limite tous les gros fichiers à sa bande passante d'upload
+et à ses limites anti-flood. Le pool charge plusieurs sessions, suit pour
+chacune son état de santé, les octets en cours de transfert et une
+éventuelle attente FloodWait, et confie chaque transfert au client sain le
+moins chargé. Le débit des gros fichiers augmente avec le nombre de comptes.
+
+Les sessions sont connectées par une tâche de fond supervisée (reconnexion
+avec backoff exponentiel) : le bot répond aux utilisateurs sans attendre
+MTProto, et les transferts attendent que le pool soit prêt (wait_ready).
+
+Chaque compte doit être membre du chat relais (RELAY_CHAT_ID) et des canaux
+de publication. Une session doit avoir été autorisée une première fois de
+façon interactive (code de connexion) : la tâche de fond ne demande rien.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from telethon import TelegramClient
+from telethon.errors import AuthKeyError, FloodWaitError
+
+from .clock import get_clock
+
+logger = logging.getLogger('TelegramBot')
+
+
+class NoUserbotAvailable(Exception):
+    """Aucun client du pool n'est disponible"""
+    pass
+
+
+class PooledClient:
+    """Client Telethon du pool et son état"""
+
+    def __init__(self, name: str, client):
+        self.name = name
+        self.client = client
+        self.healthy = False
+        self.in_flight_bytes = 0
+        self.active_transfers = 0
+        self.flood_until = 0.0
+        self.last_error: Optional[str] = None
+        # Reconnexion par le superviseur
+        self.retry_delay = 0.0
+        self.next_attempt = 0.0
+
+    def is_connected(self) -> bool:
+        is_connected = getattr(self.client, "is_connected", None)
+        return is_connected() if callable(is_connected) else True
+
+    def is_available(self, now: float) -> bool:
+        # Un client en erreur n'est rendu au pool que par le superviseur,
+        # après une reconnexion réussie
+        if now < self.flood_until:
+            return False
+        return self.healthy and self.is_connected()
+
+
+class UserbotPool:
+    """Répartit les transferts entre plusieurs sessions userbot"""
+
+    def __init__(self, check_interval: float = 30.0, max_backoff: float = 300.0):
+        """
+        Initialise un pool vide
+
+        Args:
+            check_interval: Intervalle de vérification des connexions (secondes)
+            max_backoff: Délai maximum entre deux tentatives de reconnexion (secondes)
+        """
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.clients: List[PooledClient] = []
+        self._ready: Optional[asyncio.Event] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_sessions(cls, session_names: List[str], api_id, api_hash, **kwargs) -> "UserbotPool":
+        """Crée un pool avec un TelegramClient (non démarré) par session"""
+        pool = cls(**kwargs)
+        for name in session_names:
+            pool.add(name, TelegramClient(name, api_id, api_hash))
+        return pool
+
+    def add(self, name: str, client) -> PooledClient:
+        entry = PooledClient(name, client)
+        self.clients.append(entry)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def __bool__(self) -> bool:
+        return bool(self.clients)
+
+    @property
+    def ready(self) -> asyncio.Event:
+        """Événement levé tant qu'au moins une session est connectée"""
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+
+    def start(self) -> None:
+        """Lance la tâche de fond qui connecte et surveille les sessions"""
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self.supervise())
+
+    async def stop(self) -> None:
+        """Arrête la supervision et déconnecte les sessions"""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        await self.stop_all()
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """
+        Attend qu'au moins une session soit connectée
+
+        Raises:
+            NoUserbotAvailable: Si aucune session n'est prête dans le délai
+        """
+        if not self.clients:
+            raise NoUserbotAvailable("Aucune session userbot configurée")
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            errors = "; ".join(
+                f"{entry.name}: {entry.last_error}" for entry in self.clients if entry.last_error
+            )
+            raise NoUserbotAvailable(
+                f"Userbot pas encore connecté{f' ({errors})' if errors else ''}"
+            )
+
+    async def supervise(self) -> None:
+        """Connecte les sessions puis les reconnecte (backoff exponentiel) en cas de coupure"""
+        clock = get_clock()
+        while True:
+            now = clock.monotonic()
+            attempts = [
+                entry for entry in self.clients
+                if not (entry.healthy and entry.is_connected()) and now >= entry.next_attempt
+            ]
+            await asyncio.gather(*(self._connect(entry) for entry in attempts))
+            self._update_ready()
+
+            now = clock.monotonic()
+            delay = self.check_interval
+            for entry in self.clients:
+                if not entry.healthy:
+                    delay = min(delay, max(0.0, entry.next_attempt - now))
+            await clock.sleep(max(delay, 0.1))
+
+    async def _connect(self, entry: PooledClient) -> None:
+        try:
+            await entry.client.connect()
+            if not await entry.client.is_user_authorized():
+                raise ConnectionError(
+                    "session non autorisée, une connexion interactive est nécessaire"
+                )
+            entry.healthy = True
+            entry.retry_delay = 0.0
+            entry.last_error = None
+            logger.info(f"Session userbot '{entry.name}' connectée")
+        except Exception as e:
+            entry.retry_delay = min(max(entry.retry_delay * 2, 1.0), self.max_backoff)
+            entry.next_attempt = get_clock().monotonic() + entry.retry_delay
+            self._mark_unhealthy(entry, e)
+            logger.info(f"Nouvelle tentative pour '{entry.name}' dans {entry.retry_delay:.0f}s")
+
+    def _update_ready(self) -> None:
+        if any(entry.healthy for entry in self.clients):
+            self.ready.set()
+        else:
+            self.ready.clear()
+
+    async def stop_all(self) -> None:
+        for entry in self.clients:
+            try:
+                await entry.client.disconnect()
+            except Exception as e:
+                logger.warning(f"Erreur à la déconnexion de la session '{entry.name}': {e}")
+            entry.healthy = False
+        self._update_ready()
+
+    def pick(self) -> PooledClient:
+        """Retourne le client disponible le moins chargé"""
+        now = get_clock().monotonic()
+        candidates = [entry for entry in self.clients if entry.is_available(now)]
+        if not candidates:
+            raise NoUserbotAvailable(self._unavailable_reason(now))
+        return min(candidates, key=lambda entry: (entry.in_flight_bytes, entry.active_transfers))
+
+    @asynccontextmanager
+    async def lease(self, size: int = 0) -> AsyncIterator[PooledClient]:
+        """
+        Réserve le client le moins chargé pour un transfert
+
+        Les erreurs FloodWait et de connexion sont enregistrées sur le client
+        (qui est alors évité) puis relancées à l'appelant.
+
+        Args:
+            size: Octets à transférer
+
+        Yields:
+            PooledClient: Client réservé (attribut client = TelegramClient)
+        """
+        entry = self.pick()
+        entry.in_flight_bytes += size
+        entry.active_transfers += 1
+        try:
+            yield entry
+        except FloodWaitError as e:
+            entry.flood_until = get_clock().monotonic() + e.seconds
+            logger.warning(f"Session userbot '{entry.name}' en FloodWait pendant {e.seconds}s")
+            raise
+        except (ConnectionError, OSError, AuthKeyError) as e:
+            self._mark_unhealthy(entry, e)
+            self._update_ready()
+            raise
+        finally:
+            entry.in_flight_bytes -= size
+            entry.active_transfers -= 1
+
+    def stats(self) -> List[dict]:
+        """État de chaque session (pour les logs et le diagnostic)"""
+        now = get_clock().monotonic()
+        return [
+            {
+                "name": entry.name,
+                "healthy": entry.healthy,
+                "in_flight_bytes": entry.in_flight_bytes,
+                "active_transfers": entry.active_transfers,
+                "flood_wait": max(0.0, entry.flood_until - now),
+                "last_error": entry.last_error
+            }
+            for entry in self.clients
+        ]
+
+    def _mark_unhealthy(self, entry: PooledClient, error: BaseException) -> None:
+        entry.healthy = False
+        entry.last_error = str(error)
+        logger.error(f"Session userbot '{entry.name}' indisponible: {error}")
+
+    def _unavailable_reason(self, now: float) -> str:
+        if not self.clients:
+            return "Aucune session userbot configurée"
+        flood = [entry.flood_until - now for entry in self.clients if entry.flood_until > now]
+        if flood and len(flood) == len(self.clients):
+            return f"Toutes les sessions userbot sont en FloodWait ({min(flood):.0f}s)"
+        return "Aucune session userbot disponible"
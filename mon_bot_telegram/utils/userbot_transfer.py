@@ -0,0 +1,131 @@
+"""
+Transfert des gros fichiers (50 Mo - 2 Go) par le userbot Telethon.
+
+L'API bot refuse les téléchargements au-delà de 20 Mo : get_file() puis
+download_to_drive() ne peuvent donc pas alimenter le userbot. À la place,
+le bot dépose le fichier (par file_id, sans limite de taille) dans un chat
+relais partagé avec le userbot, qui récupère le message par chat et id puis
+le republie directement depuis les serveurs Telegram.
+"""
+import logging
+from typing import Any, Callable, Optional, Union
+
+from .stream_relay import StreamRelay
+
+logger = logging.getLogger('TelegramBot')
+
+
+class UserbotTransferError(Exception):
+    """Erreur lors d'un transfert par le userbot"""
+    pass
+
+
+class UserbotTransfer:
+    """Publie un fichier connu du bot via le userbot, sans passer par l'API bot"""
+
+    def __init__(self, userbot, relay_chat_id: Optional[int], buffer_size: int = 8 * 1024 * 1024,
+                 upload_connections: int = 1, checkpoint_store=None):
+        """
+        Initialise le transfert
+
+        Args:
+            userbot: Client Telethon connecté
+            relay_chat_id: Chat (canal privé ou groupe) où le bot et le userbot sont membres
+            buffer_size: Mémoire maximum du relais en flux (fichiers renommés)
+            upload_connections: Connexions MTProto parallèles pour les uploads
+            checkpoint_store: Stockage des points de reprise des uploads (ex: DatabaseManager)
+        """
+        self.userbot = userbot
+        self.relay_chat_id = relay_chat_id
+        self.buffer_size = buffer_size
+        self.upload_connections = upload_connections
+        self.checkpoint_store = checkpoint_store
+
+    async def fetch_source_message(self, bot, post_type: str, file_id: str):
+        """
+        Dépose le fichier dans le chat relais et le récupère côté userbot
+
+        Returns:
+            tuple: (message relais côté bot, message Telethon)
+        """
+        if not self.relay_chat_id:
+            raise UserbotTransferError(
+                "RELAY_CHAT_ID non configuré : impossible de transmettre le fichier au userbot"
+            )
+        if post_type == "video":
+            relay_message = await bot.send_video(chat_id=self.relay_chat_id, video=file_id)
+        else:
+            relay_message = await bot.send_document(chat_id=self.relay_chat_id, document=file_id)
+
+        message = await self.userbot.get_messages(self.relay_chat_id, ids=relay_message.message_id)
+        if message is None or message.media is None:
+            await self._delete_relay_message(bot, relay_message)
+            raise UserbotTransferError(
+                f"Message relais {relay_message.message_id} introuvable côté userbot"
+            )
+        return relay_message, message
+
+    async def send(
+        self,
+        bot,
+        channel: Union[str, int],
+        post_type: str,
+        file_id: str,
+        caption: Optional[str] = None,
+        file_name: Optional[str] = None,
+        file_unique_id: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], Any]] = None
+    ) -> Any:
+        """
+        Publie le fichier dans le canal via le userbot
+
+        Args:
+            bot: Bot de l'application (pour le dépôt dans le chat relais)
+            channel: Canal cible
+            post_type: 'video' ou 'document'
+            file_id: file_id du fichier côté bot
+            caption: Légende
+            file_name: Nouveau nom de fichier (force un nouvel upload en flux)
+            file_unique_id: Identifiant stable du fichier, clé du point de reprise
+            progress_callback: Appelé avec (octets envoyés, total) pendant un relais en flux
+
+        Returns:
+            Message Telethon publié
+        """
+        relay_message, message = await self.fetch_source_message(bot, post_type, file_id)
+        try:
+            chat = self._resolve_chat(channel)
+            if not file_name:
+                # Le fichier est déjà sur les serveurs Telegram : aucun transfert
+                logger.info(f"Publication par référence du message relais {message.id} vers {channel}")
+                try:
+                    return await self.userbot.send_file(chat, message.media, caption=caption)
+                except Exception as e:
+                    # Ex: transfert restreint sur le chat relais, on renvoie le contenu
+                    logger.warning(f"Publication par référence impossible ({e}), relais en flux")
+            # Nouvel upload, alimenté en flux par le téléchargement
+            relay = StreamRelay(
+                self.userbot,
+                buffer_size=self.buffer_size,
+                upload_connections=self.upload_connections,
+                checkpoint_store=self.checkpoint_store
+            )
+            return await relay.relay(
+                message, chat, caption=caption, file_name=file_name, checkpoint_key=file_unique_id,
+                progress_callback=progress_callback
+            )
+        finally:
+            await self._delete_relay_message(bot, relay_message)
+
+    async def _delete_relay_message(self, bot, relay_message) -> None:
+        try:
+            await bot.delete_message(chat_id=self.relay_chat_id, message_id=relay_message.message_id)
+        except Exception as e:
+            logger.warning(f"Impossible de supprimer le message relais: {e}")
+
+    @staticmethod
+    def _resolve_chat(channel: Union[str, int]) -> Union[str, int]:
+        """Telethon attend un entier pour les identifiants numériques (-100...)"""
+        if isinstance(channel, str) and channel.lstrip('-').isdigit():
+            return int(channel)
+        return channel
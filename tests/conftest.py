@@ -0,0 +1,16 @@
+"""
+Configuration des tests.
+
+Le bot importe ses modules à la fois par le paquet (mon_bot_telegram.utils...)
+et depuis son dossier (config.settings, media_callback_handler) : les deux
+chemins sont ajoutés comme lors d'un lancement de bot.py.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(ROOT, "mon_bot_telegram")
+
+for path in (PACKAGE_DIR, ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
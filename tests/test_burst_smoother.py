@@ -0,0 +1,90 @@
+"""
+Lissage des envois planifiés au même instant.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytz
+
+from mon_bot_telegram.handlers.schedule_handler import SchedulerManager
+from mon_bot_telegram.utils.burst_smoother import BurstSmoother
+from mon_bot_telegram.utils.clock import SimulatedClock
+
+START = pytz.UTC.localize(datetime(2026, 1, 5, 7, 59))
+ROUND_HOUR = START + timedelta(minutes=1)
+
+
+def test_posts_of_a_channel_get_increasing_seconds():
+    smoother = BurstSmoother(window_seconds=30, max_per_second=5, clock=SimulatedClock(START))
+    dates = [smoother.assign(ROUND_HOUR, "canal") for _ in range(4)]
+    assert dates == [ROUND_HOUR + timedelta(seconds=i) for i in range(4)]
+
+
+def test_burst_is_spread_over_the_whole_window():
+    smoother = BurstSmoother(window_seconds=9, max_per_second=5, clock=SimulatedClock(START))
+    dates = [smoother.assign(ROUND_HOUR) for _ in range(20)]
+    assert Counter(dates) == {ROUND_HOUR + timedelta(seconds=i): 2 for i in range(10)}
+
+
+def test_full_window_never_overbooks_a_second():
+    smoother = BurstSmoother(window_seconds=2, max_per_second=3, clock=SimulatedClock(START))
+    dates = [smoother.assign(ROUND_HOUR) for _ in range(20)]
+    per_second = Counter(dates)
+    assert max(per_second.values()) == 3
+    assert max(dates) == ROUND_HOUR + timedelta(seconds=6)
+
+
+def test_later_post_of_a_channel_does_not_delay_an_earlier_one():
+    smoother = BurstSmoother(window_seconds=30, max_per_second=5, clock=SimulatedClock(START))
+    tomorrow = ROUND_HOUR + timedelta(days=1, hours=10)
+    # Réservations dans le désordre (ordre de la base au redémarrage)
+    assert smoother.assign(tomorrow, "canal") == tomorrow
+    assert smoother.assign(ROUND_HOUR, "canal") == ROUND_HOUR
+    assert smoother.assign(ROUND_HOUR + timedelta(seconds=5), "canal") == ROUND_HOUR + timedelta(seconds=5)
+    # Même instant : toujours une seconde après le post précédent du canal
+    assert smoother.assign(ROUND_HOUR, "canal") == ROUND_HOUR + timedelta(seconds=1)
+
+
+def test_released_second_is_reused():
+    smoother = BurstSmoother(window_seconds=30, max_per_second=1, clock=SimulatedClock(START))
+    first = smoother.assign(ROUND_HOUR)
+    smoother.release(first)
+    assert smoother.assign(ROUND_HOUR) == first
+
+
+def test_live_scheduler_spreads_a_round_hour_burst():
+    clock = SimulatedClock(START)
+    manager = SchedulerManager(
+        db_manager=None, clock=clock, smoother=BurstSmoother(30, 5, clock=clock)
+    )
+    manager.start()
+    sent = []
+
+    async def sender(post_id):
+        sent.append((post_id, clock.utcnow()))
+        return True
+
+    manager.post_sender = sender
+
+    async def scenario():
+        for post_id in range(12):
+            manager.schedule_post(post_id, ROUND_HOUR, f"canal_{post_id % 3}")
+        # Post annulé : sa seconde est libérée et il n'est jamais envoyé
+        manager.cancel_post(11)
+        await clock.advance(3600)
+
+    asyncio.run(scenario())
+    assert sorted(post_id for post_id, _ in sent) == list(range(11))
+    assert max(Counter(at for _, at in sent).values()) <= 5
+    for channel in range(3):
+        channel_sends = [at for post_id, at in sent if post_id % 3 == channel]
+        assert channel_sends == sorted(set(channel_sends))
+    assert min(at for _, at in sent) == ROUND_HOUR
+
+
+def test_overdue_post_is_sent_now_not_in_the_past():
+    clock = SimulatedClock(START)
+    manager = SchedulerManager(db_manager=None, clock=clock)
+    effective = manager.schedule_post(1, START - timedelta(hours=2), "canal")
+    assert effective == START
@@ -0,0 +1,17 @@
+"""
+Encodage compact des callback_data.
+"""
+from mon_bot_telegram.utils.callback_codec import MAX_CALLBACK_BYTES, callback_codec, decode_callback, encode_callback
+
+
+def test_fanout_toggle_round_trip_within_limit():
+    for username in ("canal", "c" * 32, "long_channel_name_" * 4):
+        data = encode_callback("fanout_toggle", username)
+        assert len(data.encode("utf-8")) <= MAX_CALLBACK_BYTES
+        assert decode_callback(data, "fanout_toggle") == (username,)
+        assert decode_callback(data, "select_channel") is None
+
+
+def test_every_action_has_a_distinct_prefix():
+    prefixes = [callback_codec.prefix(action) for action in ("react", "select_channel", "delete_channel", "fanout_toggle")]
+    assert len(set(prefixes)) == len(prefixes)
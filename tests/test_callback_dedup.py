@@ -0,0 +1,104 @@
+"""
+Anti-doublon des appuis sur les boutons inline.
+"""
+import asyncio
+from datetime import datetime
+
+from telegram import CallbackQuery, Chat, Message, Update, User
+from telegram.ext import ApplicationHandlerStop
+
+from mon_bot_telegram.utils.callback_dedup import CallbackDeduplicator
+from mon_bot_telegram.utils.update_processor import PerUserUpdateProcessor
+
+USER = User(1, "Alice", False)
+CHAT = Chat(1, Chat.PRIVATE)
+MENU = Message(10, datetime(2026, 1, 5), CHAT)
+
+
+def _tap(update_id, data="send_now"):
+    query = CallbackQuery(str(update_id), USER, "instance", data=data, message=MENU)
+    return Update(update_id, callback_query=query)
+
+
+async def _process(dedup, update, handler):
+    """Groupes -1, 0 et 2 de l'Application pour un callback"""
+    try:
+        await dedup.guard(update, None)
+    except ApplicationHandlerStop:
+        return
+    await handler()
+    await dedup.release(update, None)
+
+
+def test_double_tap_queued_behind_a_slow_handler_is_dropped():
+    dedup = CallbackDeduplicator(window=0.05)
+    processor = PerUserUpdateProcessor(8)
+    runs = []
+
+    async def slow_publish():
+        runs.append("publication")
+        # Plus long que la fenêtre : le second appui attend derrière ce handler
+        await asyncio.sleep(0.2)
+
+    async def scenario():
+        first, second = _tap(1), _tap(2)
+        await asyncio.gather(
+            processor.do_process_update(first, _process(dedup, first, slow_publish)),
+            processor.do_process_update(second, _process(dedup, second, slow_publish)),
+        )
+
+    asyncio.run(scenario())
+    assert runs == ["publication"]
+    assert dedup.dropped == 1
+
+
+def test_window_starts_when_the_handler_finishes():
+    dedup = CallbackDeduplicator(window=2, max_in_flight=300)
+    key = dedup.key_for(_tap(1).callback_query)
+
+    assert not dedup.is_duplicate(key, now=0)
+    # Traitement en cours bien au-delà de la fenêtre
+    assert dedup.is_duplicate(key, now=60)
+    dedup.finish(key, now=100)
+    assert dedup.is_duplicate(key, now=101)
+    assert not dedup.is_duplicate(key, now=102.5)
+
+
+def test_unfinished_callback_is_released_after_max_in_flight():
+    dedup = CallbackDeduplicator(window=2, max_in_flight=30)
+    key = dedup.key_for(_tap(1).callback_query)
+    assert not dedup.is_duplicate(key, now=0)
+    assert dedup.is_duplicate(key, now=29)
+    assert not dedup.is_duplicate(key, now=31)
+
+
+def test_another_button_of_the_same_message_is_not_a_duplicate():
+    dedup = CallbackDeduplicator()
+    assert not dedup.is_duplicate(dedup.key_for(_tap(1, "send_now").callback_query), now=0)
+    assert not dedup.is_duplicate(dedup.key_for(_tap(2, "main_menu").callback_query), now=0)
+
+
+def test_slow_handler_does_not_hold_back_the_purge():
+    dedup = CallbackDeduplicator(window=2, max_in_flight=300)
+    slow = dedup.key_for(_tap(1, "send_now").callback_query)
+    assert not dedup.is_duplicate(slow, now=0)
+    for update_id in range(2, 102):
+        key = dedup.key_for(_tap(update_id, f"bouton_{update_id}").callback_query)
+        assert not dedup.is_duplicate(key, now=1)
+        dedup.finish(key, now=1)
+    # Les callbacks terminés expirent derrière le handler lent toujours en cours
+    assert not dedup.is_duplicate(dedup.key_for(_tap(200, "main_menu").callback_query), now=10)
+    assert len(dedup) == 2
+
+
+def test_in_flight_callbacks_are_never_evicted():
+    dedup = CallbackDeduplicator(window=2, max_entries=10, max_in_flight=300)
+    keys = [dedup.key_for(_tap(update_id, f"bouton_{update_id}").callback_query) for update_id in range(50)]
+    for key in keys:
+        assert not dedup.is_duplicate(key, now=0)
+    dedup.finish(keys[0], now=0)
+    assert not dedup.is_duplicate(dedup.key_for(_tap(50, "main_menu").callback_query), now=1)
+    # Sous charge, seul le callback terminé est évincé : la table dépasse
+    # max_entries plutôt que d'oublier un callback en cours
+    assert all(dedup.is_duplicate(key, now=1) for key in keys[1:])
+    assert not dedup.is_duplicate(keys[0], now=1)
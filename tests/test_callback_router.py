@@ -0,0 +1,190 @@
+"""
+Routage des callback_data : préfixes englobés, coût du dispatch et
+couverture des boutons émis par bot.py.
+"""
+import ast
+import asyncio
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from mon_bot_telegram.utils.callback_router import CallbackRouter
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mon_bot_telegram")
+
+
+async def _handler(update, context, **params):
+    return params
+
+
+def _query(data):
+    return SimpleNamespace(callback_query=SimpleNamespace(data=data))
+
+
+def test_longest_prefix_wins_whatever_the_order():
+    router = CallbackRouter()
+    router.prefix("add_thumbnail_", lambda update, context, post_index: "court", param="post_index", convert=int)
+    router.prefix("add_thumbnail_rename_", lambda update, context, post_index: "long", param="post_index",
+                  convert=int)
+    route, params = router.resolve("add_thumbnail_rename_3")
+    assert route.pattern == "add_thumbnail_rename_"
+    assert params == {"post_index": 3}
+    assert router.resolve("add_thumbnail_4")[0].pattern == "add_thumbnail_"
+    assert router.overlaps() == [("add_thumbnail_", "add_thumbnail_rename_")]
+
+
+def test_invalid_parameter_and_duplicate_route():
+    router = CallbackRouter()
+    router.prefix("delete_post_", _handler, param="post_index", convert=int)
+    assert router.resolve("delete_post_abc") is None
+    with pytest.raises(ValueError):
+        router.prefix("delete_post_", _handler)
+
+
+def test_unknown_callback_goes_to_the_fallback():
+    router = CallbackRouter()
+    router.exact("main_menu", _handler)
+    unknown = []
+
+    @router.fallback
+    async def fallback(update, context):
+        unknown.append(update.callback_query.data)
+        return "repli"
+
+    assert asyncio.run(router.dispatch(_query("main_menu"), None)) == {}
+    assert asyncio.run(router.dispatch(_query("ancien_bouton"), None)) == "repli"
+    assert unknown == ["ancien_bouton"]
+
+
+class CountingDict(dict):
+    """Dictionnaire qui compte les recherches du routeur"""
+
+    lookups = 0
+
+    def get(self, key, default=None):
+        CountingDict.lookups += 1
+        return super().get(key, default)
+
+
+def _counting(node):
+    return CountingDict({key: value if key is None else _counting(value) for key, value in node.items()})
+
+
+def _lookups(route_count, data):
+    router = CallbackRouter()
+    for i in range(route_count):
+        router.prefix(f"action_{i}_", _handler, param="post_index", convert=int)
+        router.exact(f"menu_{i}", _handler)
+    router._exact = CountingDict(router._exact)
+    router._trie = _counting(router._trie)
+    CountingDict.lookups = 0
+    assert router.resolve(data)[1] == {"post_index": 12}
+    return CountingDict.lookups
+
+
+def test_dispatch_cost_does_not_grow_with_route_count():
+    data = "action_5_12"
+    lookups = {count: _lookups(count, data) for count in (10, 100, 1000)}
+    # Une recherche exacte puis deux par caractère au plus, quel que soit le nombre
+    # de routes (une chaîne if/elif en ferait une par route)
+    assert len(set(lookups.values())) == 1
+    assert lookups[1000] <= 1 + 2 * len(data)
+
+
+def _string_value(node):
+    """callback_data d'un nœud (les valeurs formatées sont remplacées par 0)"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return "".join(part.value if isinstance(part, ast.Constant) else "0" for part in node.values)
+    if (isinstance(node, ast.Call) and getattr(node.func, "id", None) == "encode_callback"
+            and isinstance(node.args[0], ast.Constant)):
+        return ("codec", node.args[0].value)
+    return None
+
+
+def _reachable_functions(tree, roots):
+    """Fonctions du module appelées, directement ou non, depuis roots"""
+    functions = {node.name: node for node in tree.body
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    seen, pending = set(), [name for name in roots if name in functions]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        pending.extend(node.id for node in ast.walk(functions[name])
+                       if isinstance(node, ast.Name) and node.id in functions)
+    return [functions[name] for name in seen]
+
+
+def _emitted_callback_data(tree):
+    """callback_data des boutons (InlineKeyboardButton ou (texte, callback_data) des menus)"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.keyword) and node.arg == "callback_data":
+            value = _string_value(node.value)
+            if value is not None:
+                yield node.value.lineno, value
+        elif isinstance(node, ast.Tuple):
+            for row in node.elts:
+                if isinstance(row, ast.Tuple) and len(row.elts) == 2:
+                    text, value = map(_string_value, row.elts)
+                    if isinstance(text, str) and value is not None:
+                        yield row.lineno, value
+
+
+def _bot_sources():
+    """Arbres à parcourir : bot.py en entier, les fonctions des modules qu'il importe"""
+    with open(os.path.join(PACKAGE_DIR, "bot.py"), encoding="utf-8") as f:
+        bot_tree = ast.parse(f.read())
+    sources = [("bot.py", bot_tree)]
+    for node in bot_tree.body:
+        if not isinstance(node, ast.ImportFrom) or not node.module:
+            continue
+        if node.module.startswith("mon_bot_telegram.handlers."):
+            path = os.path.join(PACKAGE_DIR, *node.module.split(".")[1:]) + ".py"
+        elif node.module == "media_callback_handler":
+            path = os.path.join(PACKAGE_DIR, "media_callback_handler.py")
+        else:
+            continue
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for function in _reachable_functions(tree, [alias.name for alias in node.names]):
+            sources.append((f"{os.path.basename(path)}:{function.name}", function))
+    return bot_tree, sources
+
+
+def _dedicated_patterns(bot_tree):
+    """Motifs des CallbackQueryHandler servis hors du routeur"""
+    return [
+        re.compile(keyword.value.value)
+        for node in ast.walk(bot_tree)
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "CallbackQueryHandler"
+        for keyword in node.keywords
+        if keyword.arg == "pattern" and isinstance(keyword.value, ast.Constant)
+    ]
+
+
+def test_every_emitted_button_has_a_route(monkeypatch, tmp_path):
+    pytest.importorskip("PIL")
+    monkeypatch.setenv("API_ID", "1")
+    monkeypatch.setenv("API_HASH", "test")
+    monkeypatch.setenv("BOT_TOKEN", "1:test")
+    monkeypatch.chdir(tmp_path)
+    from mon_bot_telegram import bot
+
+    bot_tree, sources = _bot_sources()
+    dedicated = _dedicated_patterns(bot_tree)
+    missing = []
+    for source, tree in sources:
+        for lineno, data in _emitted_callback_data(tree):
+            if isinstance(data, tuple):
+                action = data[1]
+                if action == "react":
+                    continue  # handle_reaction_click, enregistré à part
+                data = bot.callback_codec.prefix(action) + ":"
+            if bot.callback_router.resolve(data) is None and not any(p.match(data) for p in dedicated):
+                missing.append(f"{source} ligne {lineno}: {data}")
+    assert not missing, "Boutons sans route :\n" + "\n".join(missing)
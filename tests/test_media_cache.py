@@ -0,0 +1,72 @@
+"""
+Suppressions de fichiers du cache de médias par un tiers.
+"""
+import asyncio
+import os
+
+from mon_bot_telegram.utils.media_cache import MediaCache
+
+
+class Listener:
+    def __init__(self):
+        self.tracked = set()
+
+    def track_file(self, path):
+        self.tracked.add(os.path.abspath(path))
+
+    def untrack_file(self, path):
+        self.tracked.discard(os.path.abspath(path))
+
+
+def _fetcher(size):
+    async def fetch(path):
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+    return fetch
+
+
+def _cache_with(tmp_path, *keys, size=100):
+    listener = Listener()
+    cache = MediaCache(str(tmp_path / "cache"), max_bytes=10_000, listener=listener)
+
+    async def fill():
+        paths = {}
+        for key in keys:
+            async with cache.acquire(key, _fetcher(size), ".mp4") as path:
+                paths[key] = path
+        return paths
+
+    return cache, listener, asyncio.run(fill())
+
+
+def test_discard_updates_index_and_budget(tmp_path):
+    cache, listener, paths = _cache_with(tmp_path, "A", "B")
+    assert cache.total_bytes == 200
+
+    assert cache.discard(paths["A"])
+    assert not os.path.exists(paths["A"])
+    assert not cache.contains("A")
+    assert cache.total_bytes == 100
+    assert os.path.abspath(paths["A"]) not in listener.tracked
+    assert cache.contains("B")
+
+
+def test_file_in_use_is_not_discarded(tmp_path):
+    cache, _, paths = _cache_with(tmp_path, "A")
+
+    async def scenario():
+        async with cache.acquire("A", _fetcher(100), ".mp4") as path:
+            assert cache.owns(path)
+            assert not cache.discard(path)
+            assert os.path.exists(path)
+
+    asyncio.run(scenario())
+    assert cache.contains("A")
+
+
+def test_contains_forgets_files_removed_outside_the_cache(tmp_path):
+    cache, listener, paths = _cache_with(tmp_path, "A")
+    os.remove(paths["A"])
+    assert not cache.contains("A")
+    assert cache.total_bytes == 0
+    assert not listener.tracked
@@ -0,0 +1,210 @@
+"""
+Upload parallèle sur une destination bouchon : débit selon le nombre de
+connexions et réassemblage des parts dans l'ordre.
+"""
+import asyncio
+import hashlib
+import io
+import math
+import os
+from types import SimpleNamespace
+
+import pytest
+from telethon.tl.types import InputFile, InputFileBig
+
+from mon_bot_telegram.utils.clock import SimulatedClock
+from mon_bot_telegram.utils.parallel_upload import (
+    BIG_FILE_THRESHOLD, ParallelUploader, PartSink, SinkUnavailable, TelethonPartSink, UploadError
+)
+from mon_bot_telegram.utils.stream_relay import StreamRelay
+from mon_bot_telegram.utils.transfer_checkpoint import UploadCheckpoint, decode_parts
+
+PART_SIZE = 512 * 1024
+PART_LATENCY = 0.01  # Aller-retour simulé d'une part (secondes)
+
+
+class StubSink(PartSink):
+    """Conserve les parts reçues, avec une latence fixe par part"""
+
+    def __init__(self, connections, latency=0, fail_at=None, clock=None):
+        self.connections = connections
+        self.latency = latency
+        self.clock = clock
+        self.fail_at = fail_at
+        self.parts = {}
+        self.arrival = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed = False
+        self.last_arrival = 0
+
+    async def save_part(self, file_id, part_index, total_parts, data, big, connection):
+        assert 0 <= connection < self.connections
+        if part_index == self.fail_at:
+            raise UploadError("Part refusée")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.clock is not None:
+            await self.clock.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        self.parts[part_index] = data
+        self.arrival.append(part_index)
+        if self.clock is not None:
+            self.last_arrival = self.clock.monotonic()
+
+    async def close(self):
+        self.closed = True
+
+    def reassemble(self):
+        return b"".join(self.parts[index] for index in sorted(self.parts))
+
+
+def _upload(sink, payload):
+    uploader = ParallelUploader(sink, part_size=PART_SIZE)
+    return asyncio.run(uploader.upload(io.BytesIO(payload), len(payload), "fichier.bin"))
+
+
+def _simulated_upload_time(sink, payload):
+    """Durée de l'upload en temps simulé (l'horloge avance d'une latence à la fois)"""
+    uploader = ParallelUploader(sink, part_size=PART_SIZE)
+
+    async def scenario():
+        upload = asyncio.ensure_future(uploader.upload(io.BytesIO(payload), len(payload), "fichier.bin"))
+        while not upload.done():
+            # Laisse les connexions libérées reprendre une part avant d'avancer l'horloge
+            for _ in range(100):
+                await asyncio.sleep(0)
+            await sink.clock.advance(sink.latency)
+        await upload
+        return sink.last_arrival
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture(scope="module")
+def big_payload():
+    # 24 parts : au-dessus du seuil "big file"
+    return os.urandom(BIG_FILE_THRESHOLD + 14 * PART_SIZE)
+
+
+@pytest.mark.parametrize("connections", [1, 2, 4, 8])
+def test_parts_are_reassembled_in_order(big_payload, connections):
+    sink = StubSink(connections, latency=0)
+    result = _upload(sink, big_payload)
+    assert isinstance(result, InputFileBig)
+    assert result.parts == len(big_payload) // PART_SIZE
+    assert sink.reassemble() == big_payload
+    assert sink.max_in_flight <= connections
+    assert sink.closed
+
+
+def test_small_file_carries_md5():
+    payload = os.urandom(3 * PART_SIZE + 1000)
+    sink = StubSink(4, latency=0)
+    result = _upload(sink, payload)
+    assert isinstance(result, InputFile)
+    assert result.md5_checksum == hashlib.md5(payload).hexdigest()
+    assert sink.reassemble() == payload
+
+
+@pytest.mark.parametrize("connections", [1, 2, 4, 8])
+def test_upload_time_divides_by_connections(big_payload, connections):
+    sink = StubSink(connections, latency=PART_LATENCY, clock=SimulatedClock())
+    elapsed = _simulated_upload_time(sink, big_payload)
+    parts = len(big_payload) // PART_SIZE
+    # Toutes les connexions restent occupées : une vague de parts par latence
+    assert elapsed == pytest.approx(math.ceil(parts / connections) * PART_LATENCY)
+    assert sink.max_in_flight == connections
+    assert sink.reassemble() == big_payload
+
+
+def test_worker_error_stops_the_upload(big_payload):
+    sink = StubSink(4, latency=0, fail_at=5)
+    with pytest.raises(UploadError):
+        _upload(sink, big_payload)
+    assert sink.closed
+
+
+def test_missing_telethon_internals_raise_before_anything_is_sent():
+    sink = TelethonPartSink(SimpleNamespace(session=None), connections=4)
+    assert not TelethonPartSink.is_supported(sink.client)
+    with pytest.raises(SinkUnavailable):
+        asyncio.run(sink.open())
+
+
+class FakeUserbot:
+    """Client sans les API internes de Telethon : le relais passe par upload_file"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.uploaded = None
+
+    async def iter_download(self, media, offset=0, request_size=PART_SIZE):
+        for start in range(offset, len(self.payload), request_size):
+            yield self.payload[start:start + request_size]
+
+    async def upload_file(self, reader, file_size, file_name, part_size_kb, progress_callback=None):
+        chunks = []
+        while sum(map(len, chunks)) < file_size:
+            chunks.append(await reader.read(part_size_kb * 1024))
+        self.uploaded = b"".join(chunks)
+        return "input_file"
+
+    async def send_file(self, chat, input_file, **kwargs):
+        return input_file
+
+
+def test_relay_falls_back_to_upload_file(big_payload):
+    userbot = FakeUserbot(big_payload)
+    document = SimpleNamespace(id=1, size=len(big_payload), attributes=[], mime_type="video/mp4")
+    relay = StreamRelay(userbot, buffer_size=4 * PART_SIZE, upload_connections=4)
+    sent = asyncio.run(relay.relay(SimpleNamespace(document=document, media=None), "@canal", file_name="f.mp4"))
+    assert sent == "input_file"
+    assert userbot.uploaded == big_payload
+
+
+class FakeCheckpointStore:
+    """Stockage en mémoire des points de reprise, compte les écritures"""
+
+    def __init__(self):
+        self.rows = {}
+        self.saves = 0
+
+    def get_upload_checkpoint(self, key):
+        return self.rows.get(key)
+
+    def save_upload_checkpoint(self, key, upload_file_id, part_size, total_parts, acked_parts, updated_at):
+        self.saves += 1
+        self.rows[key] = dict(upload_file_id=upload_file_id, part_size=part_size, total_parts=total_parts,
+                              acked_parts=acked_parts, updated_at=updated_at)
+
+    def delete_upload_checkpoint(self, key):
+        self.rows.pop(key, None)
+
+
+def _checkpoint(store, payload, save_every):
+    checkpoint = UploadCheckpoint.load_or_create(store, "doc", PART_SIZE, math.ceil(len(payload) / PART_SIZE))
+    checkpoint.save_every = save_every
+    return checkpoint
+
+
+def test_checkpoint_saves_are_batched(big_payload):
+    store = FakeCheckpointStore()
+    checkpoint = _checkpoint(store, big_payload, save_every=10)
+    uploader = ParallelUploader(StubSink(4), part_size=PART_SIZE)
+    asyncio.run(uploader.upload(io.BytesIO(big_payload), len(big_payload), "fichier.bin", checkpoint=checkpoint))
+    # Création, puis une écriture toutes les 10 parts sur 34, puis la dernière
+    assert store.saves == 1 + 3 + 1
+    assert store.rows == {}
+
+
+def test_failed_upload_flushes_the_acked_parts(big_payload):
+    store = FakeCheckpointStore()
+    checkpoint = _checkpoint(store, big_payload, save_every=1000)
+    uploader = ParallelUploader(StubSink(1, fail_at=5), part_size=PART_SIZE)
+    with pytest.raises(UploadError):
+        asyncio.run(uploader.upload(io.BytesIO(big_payload), len(big_payload), "fichier.bin", checkpoint=checkpoint))
+    assert decode_parts(store.rows["doc"]["acked_parts"]) == set(range(5))
+    assert store.saves == 2
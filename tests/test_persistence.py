@@ -0,0 +1,73 @@
+"""
+Persistance des brouillons : sérialisation partielle des données.
+"""
+import asyncio
+import logging
+import pickle
+import threading
+
+from mon_bot_telegram.database.persistence import SQLitePersistence
+
+
+class MemoryStore:
+    """Tables persisted_data et persisted_conversations en mémoire"""
+
+    def __init__(self):
+        self.data = {}
+        self.conversations = {}
+
+    def load_persisted_data(self, kind):
+        return {entity_id: blob for (stored_kind, entity_id), blob in self.data.items() if stored_kind == kind}
+
+    def load_persisted_conversations(self, name):
+        return {key: blob for (stored_name, key), blob in self.conversations.items() if stored_name == name}
+
+    def write_persisted_batch(self, data_rows, conversation_rows):
+        for kind, entity_id, blob in data_rows:
+            if blob is None:
+                self.data.pop((kind, entity_id), None)
+            else:
+                self.data[(kind, entity_id)] = blob
+        for name, key, blob in conversation_rows:
+            if blob is None:
+                self.conversations.pop((name, key), None)
+            else:
+                self.conversations[(name, key)] = blob
+        return True
+
+
+def _update_user(persistence, user_id, data):
+    async def scenario():
+        await persistence.update_user_data(user_id, data)
+        await persistence.flush()
+
+    asyncio.run(scenario())
+
+
+def test_unpicklable_key_is_dropped_and_the_rest_saved(caplog):
+    store = MemoryStore()
+    persistence = SQLitePersistence(store)
+    user_data = {"posts": [{"type": "text", "content": "brouillon"}], "verrou": threading.Lock()}
+
+    with caplog.at_level(logging.ERROR, logger="TelegramBot"):
+        _update_user(persistence, 1, user_data)
+        # Même clé écartée au passage suivant : pas de nouvelle erreur
+        user_data["posts"].append({"type": "text", "content": "suite"})
+        _update_user(persistence, 1, user_data)
+
+    saved = pickle.loads(store.data[("user", 1)])
+    assert saved == {"posts": user_data["posts"]}
+    errors = [record for record in caplog.records if "verrou" in record.getMessage()]
+    assert len(errors) == 1
+
+    restored = asyncio.run(SQLitePersistence(store).get_user_data())
+    assert restored[1]["posts"][1]["content"] == "suite"
+
+
+def test_unchanged_data_is_not_rewritten():
+    store = MemoryStore()
+    persistence = SQLitePersistence(store)
+    _update_user(persistence, 1, {"posts": []})
+    _update_user(persistence, 1, {"posts": []})
+    assert persistence.writes == 1
+    assert persistence.skipped == 1
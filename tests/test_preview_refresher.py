@@ -0,0 +1,56 @@
+"""
+Rafraîchissement différé des aperçus du brouillon.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from mon_bot_telegram.utils.preview_renderer import PreviewRefresher
+
+CHAT_ID = 42
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.sent.append(text)
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+def _context(*texts):
+    posts = [{"type": "text", "content": text} for text in texts]
+    return SimpleNamespace(bot=FakeBot(), user_data={"posts": posts})
+
+
+async def _build():
+    return None, None
+
+
+def test_render_is_dropped_when_the_post_moved():
+    refresher = PreviewRefresher(quiet_period=60)
+    context = _context("premier", "second")
+
+    async def scenario():
+        refresher.schedule(context, CHAT_ID, 1, _build)
+        # Suppression du premier post : "second" passe à l'index 0
+        context.user_data["posts"].pop(0)
+        await refresher.flush(CHAT_ID)
+
+    asyncio.run(scenario())
+    assert context.bot.sent == []
+    assert refresher.renders == 0
+
+
+def test_locks_are_released_after_rendering():
+    refresher = PreviewRefresher(quiet_period=60)
+    context = _context("premier", "second")
+
+    async def scenario():
+        for index in (0, 1, 0):
+            refresher.schedule(context, CHAT_ID, index, _build)
+        await asyncio.gather(refresher.flush(CHAT_ID, 0), refresher.flush(CHAT_ID, 1))
+
+    asyncio.run(scenario())
+    assert sorted(context.bot.sent) == ["premier", "second"]
+    assert refresher._locks == {}
@@ -0,0 +1,156 @@
+"""
+Rejeu en temps simulé du planificateur utilisé par le bot.
+"""
+import asyncio
+import importlib.util
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytz
+
+from mon_bot_telegram.handlers.schedule_handler import SchedulerManager
+from mon_bot_telegram.utils.clock import SimulatedClock, set_clock
+
+START = pytz.UTC.localize(datetime(2026, 1, 5))
+REPLAY_POSTS = 100_000
+OUTAGE = 2 * 3600  # Bot arrêté deux heures en milieu de semaine
+
+
+def _manager():
+    clock = SimulatedClock(START)
+    manager = SchedulerManager(db_manager=None, clock=clock)
+    manager.start()
+    return clock, manager
+
+
+def test_week_of_posts_runs_on_time_and_in_order():
+    clock, manager = _manager()
+    sent = []
+
+    async def send(post_id):
+        sent.append((post_id, clock.utcnow()))
+
+    run_dates = [
+        START + timedelta(days=day, hours=hour)
+        for day in range(7)
+        for hour in (8, 12, 18, 21)
+    ]
+
+    async def scenario():
+        # Planifiés dans le désordre : l'ordre d'exécution suit les dates
+        for post_id in reversed(range(len(run_dates))):
+            manager.schedule_task(f"post_{post_id}", run_dates[post_id], send, post_id)
+        return await clock.advance(7 * 86400)
+
+    assert asyncio.run(scenario()) == len(run_dates)
+    assert [post_id for post_id, _ in sent] == list(range(len(run_dates)))
+    assert [at for _, at in sent] == run_dates
+    assert all(execution['lag'] == 0 for execution in clock.executions)
+    assert not manager.scheduler.running
+
+
+def test_jump_catches_up_overdue_posts_in_order():
+    clock, manager = _manager()
+    sent = []
+
+    async def send(post_id):
+        sent.append(post_id)
+
+    async def scenario():
+        for post_id in range(3):
+            manager.schedule_task(f"post_{post_id}", START + timedelta(hours=post_id + 1), send, post_id)
+        assert manager.cancel_task("post_1")
+        assert not manager.cancel_task("post_1")
+        return await clock.jump(4 * 3600)
+
+    assert asyncio.run(scenario()) == 2
+    assert sent == [0, 2]
+    assert [execution['lag'] for execution in clock.executions] == [3 * 3600, 3600]
+
+
+def test_rescheduling_replaces_the_task():
+    clock, manager = _manager()
+    sent = []
+
+    async def scenario():
+        manager.schedule_task("post_1", START + timedelta(hours=1), sent.append, "first")
+        manager.schedule_task("post_1", START + timedelta(hours=2), sent.append, "second")
+        assert manager.has_task("post_1")
+        await clock.advance(86400)
+
+    asyncio.run(scenario())
+    assert sent == ["second"]
+    assert not manager.has_task("post_1")
+
+
+def test_recurring_task_over_a_day_then_jump_coalesces():
+    clock, manager = _manager()
+    ticks = []
+
+    async def sweep():
+        ticks.append(clock.utcnow())
+
+    async def scenario():
+        manager.schedule_recurring_task("storage_sweep", 600, sweep)
+        await clock.advance(86400)
+        day_ticks = len(ticks)
+        # Bot suspendu une heure : une seule exécution de rattrapage
+        await clock.jump(3600)
+        after_jump = len(ticks)
+        assert manager.cancel_task("storage_sweep")
+        await clock.advance(86400)
+        return day_ticks, after_jump
+
+    day_ticks, after_jump = asyncio.run(scenario())
+    assert day_ticks == 144
+    assert ticks[0] == START + timedelta(seconds=600)
+    assert after_jump == day_ticks + 1
+    assert len(ticks) == after_jump
+
+
+def test_large_week_replay_keeps_order_and_catches_up():
+    clock, manager = _manager()
+    rng = random.Random(0)
+    run_dates = [START + timedelta(seconds=rng.randrange(7 * 86400)) for _ in range(REPLAY_POSTS)]
+    sent = []
+
+    async def scenario():
+        # Les posts sont créés dans un ordre quelconque par rapport à leur date
+        for post_id, run_date in enumerate(run_dates):
+            manager.schedule_task(f"post_{post_id}", run_date, sent.append, post_id)
+        executed = await clock.advance(3 * 86400)
+        executed += await clock.jump(OUTAGE)
+        executed += await clock.advance(4 * 86400 - OUTAGE)
+        return executed
+
+    assert asyncio.run(scenario()) == REPLAY_POSTS
+    assert sorted(sent) == list(range(REPLAY_POSTS))
+    executions = clock.executions
+    assert [e['run_date'] for e in executions] == sorted(run_dates)
+    outage_end = START + timedelta(seconds=3 * 86400 + OUTAGE)
+    for execution in executions:
+        if START + timedelta(days=3) < execution['run_date'] <= outage_end:
+            # Rattrapage : tout ce qui était dû pendant l'arrêt part à la reprise
+            assert execution['executed_at'] == outage_end
+        else:
+            assert execution['lag'] == 0
+
+
+def test_validators_read_the_active_clock():
+    # mon_bot_telegram/utils.py est masqué par le paquet utils/ : chargé par son chemin
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mon_bot_telegram", "utils.py")
+    spec = importlib.util.spec_from_file_location("mon_bot_telegram_utils_module", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    previous = set_clock(SimulatedClock(START))
+    try:
+        assert module.TimeUtils.validate_scheduled_time(START + timedelta(minutes=1))
+        assert not module.TimeUtils.validate_scheduled_time(START)
+        local_now = START.astimezone(pytz.timezone("Europe/Paris"))
+        validate = module.TimezoneManager.validate_future_time
+        assert validate(local_now + timedelta(seconds=1), "Europe/Paris") == (True, "")
+        assert validate(local_now, "Europe/Paris") == (False, "Cette heure est déjà passée")
+    finally:
+        set_clock(previous)
@@ -0,0 +1,53 @@
+"""
+Admission des transferts et notification de la position dans la file.
+"""
+import asyncio
+
+from mon_bot_telegram.utils.transfer_governor import TransferGovernor
+
+
+def test_waiting_transfer_is_told_when_admitted():
+    governor = TransferGovernor(max_bytes_in_flight=100, max_disk_bytes=100)
+    notifications = []
+
+    async def on_wait(position):
+        notifications.append(position)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def first():
+            async with governor.admit("a", 100):
+                await release.wait()
+
+        async def second():
+            async with governor.admit("b", 100, on_wait=on_wait):
+                notifications.append("admis")
+
+        task = asyncio.ensure_future(first())
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(second())
+        await asyncio.sleep(0)
+        assert notifications == [1]
+        release.set()
+        await asyncio.gather(task, waiting)
+
+    asyncio.run(scenario())
+    # Le message de file est retiré avant le début du transfert
+    assert notifications == [1, None, "admis"]
+
+
+def test_immediate_admission_sends_no_notification():
+    governor = TransferGovernor(max_bytes_in_flight=100, max_disk_bytes=100)
+    notifications = []
+
+    async def on_wait(position):
+        notifications.append(position)
+
+    async def scenario():
+        async with governor.admit("a", 10, on_wait=on_wait):
+            pass
+
+    asyncio.run(scenario())
+    assert notifications == []
+    assert governor.bytes_in_flight == 0
@@ -0,0 +1,88 @@
+"""
+Charge sur le traitement concurrent des updates : ordre par utilisateur,
+latence p99 et isolement d'un utilisateur lent, en temps simulé.
+"""
+import asyncio
+import random
+from datetime import datetime
+
+from telegram import Chat, Message, Update, User
+
+from mon_bot_telegram.utils.clock import SimulatedClock
+from mon_bot_telegram.utils.update_processor import PerUserUpdateProcessor
+
+USERS = 200
+UPDATES_PER_USER = 10
+HANDLER_TIME = 0.002  # Traitement simulé d'une update (secondes)
+SLOW_HANDLER_TIME = 1.0
+SLOW_USER_BACKLOG = 100  # Updates envoyées par l'utilisateur lent derrière son update lente
+
+
+def _message(update_id, user_id):
+    chat = Chat(user_id, Chat.PRIVATE)
+    message = Message(update_id, datetime(2026, 1, 5), chat, from_user=User(user_id, f"u{user_id}", False), text="x")
+    return Update(update_id, message=message)
+
+
+def _percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+async def _run_until_done(clock, tasks, step):
+    """Avance l'horloge d'un pas à la fois en laissant les updates réveillées s'enchaîner"""
+    while not all(task.done() for task in tasks):
+        for _ in range(50):
+            await asyncio.sleep(0)
+        await clock.advance(step)
+
+
+def test_many_users_keep_order_and_a_slow_user_blocks_no_one():
+    clock = SimulatedClock()
+    processor = PerUserUpdateProcessor(64)
+    handled = {}
+    latencies = []
+
+    async def handle(user_id, seq, received_at, duration):
+        await clock.sleep(duration)
+        handled.setdefault(user_id, []).append(seq)
+        if user_id != 0:
+            latencies.append(clock.monotonic() - received_at)
+
+    async def scenario():
+        rng = random.Random(0)
+        # L'utilisateur 0 envoie d'abord une update très lente (gros fichier),
+        # puis plus d'updates qu'il n'y a de places de traitement
+        arrivals = [(0, 0, SLOW_HANDLER_TIME)] + [
+            (0, seq, HANDLER_TIME) for seq in range(1, SLOW_USER_BACKLOG + 1)
+        ] + [
+            (user_id, seq, HANDLER_TIME)
+            for seq in range(UPDATES_PER_USER)
+            for user_id in rng.sample(range(1, USERS + 1), USERS)
+        ]
+        tasks = []
+        for update_id, (user_id, seq, duration) in enumerate(arrivals):
+            coroutine = handle(user_id, seq, clock.monotonic(), duration)
+            # Même ordonnancement que l'Application : une tâche par update, dans l'ordre d'arrivée
+            tasks.append(asyncio.ensure_future(
+                processor.process_update(_message(update_id, user_id), coroutine)
+            ))
+            if update_id % 50 == 0:
+                await asyncio.sleep(0)
+        started = clock.monotonic()
+        await _run_until_done(clock, tasks[SLOW_USER_BACKLOG + 1:], HANDLER_TIME)
+        others_done = clock.monotonic() - started
+        await _run_until_done(clock, tasks, HANDLER_TIME)
+        return others_done
+
+    others_done = asyncio.run(scenario())
+
+    for user_id in range(1, USERS + 1):
+        assert handled[user_id] == list(range(UPDATES_PER_USER))
+    assert handled[0] == list(range(SLOW_USER_BACKLOG + 1))
+    # Latence des autres utilisateurs (celles de l'utilisateur lent attendent son update lente)
+    # 63 places pour 2000 updates de 2 ms : environ 32 vagues, quelle que soit
+    # la machine. Les autres utilisateurs n'attendent pas la fin de l'update lente
+    assert others_done < SLOW_HANDLER_TIME / 10
+    assert _percentile(latencies, 0.99) < SLOW_HANDLER_TIME / 10
+    assert len(processor) == 0
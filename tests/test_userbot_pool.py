@@ -0,0 +1,70 @@
+"""
+Disponibilité des sessions du pool userbot.
+"""
+import asyncio
+
+import pytest
+
+from mon_bot_telegram.utils.clock import SimulatedClock, set_clock
+from mon_bot_telegram.utils.userbot_pool import NoUserbotAvailable, UserbotPool
+
+
+class FakeClient:
+    def __init__(self):
+        self.connected = True
+
+    async def connect(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def is_user_authorized(self):
+        return True
+
+
+@pytest.fixture
+def clock():
+    clock = SimulatedClock()
+    previous = set_clock(clock)
+    yield clock
+    set_clock(previous)
+
+
+def _pool(*names):
+    pool = UserbotPool()
+    for name in names:
+        pool.add(name, FakeClient())
+    return pool
+
+
+def test_failed_client_waits_for_the_supervisor(clock):
+    pool = _pool("a")
+
+    async def scenario():
+        await pool._connect(pool.clients[0])
+        with pytest.raises(ConnectionError):
+            async with pool.lease():
+                raise ConnectionError("connexion perdue")
+
+        # Le temps seul ne rend pas le client au pool
+        await clock.advance(3600)
+        with pytest.raises(NoUserbotAvailable):
+            pool.pick()
+
+        await pool._connect(pool.clients[0])
+        assert pool.pick() is pool.clients[0]
+
+    asyncio.run(scenario())
+
+
+def test_disconnected_client_is_not_picked(clock):
+    pool = _pool("a", "b")
+
+    async def scenario():
+        for entry in pool.clients:
+            await pool._connect(entry)
+        pool.clients[0].client.connected = False
+        assert pool.pick() is pool.clients[1]
+
+    asyncio.run(scenario())